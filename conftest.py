@@ -0,0 +1,25 @@
+"""pytest yalnızca Odoo'suz testleri çalıştırır (ör. ``guven_fatura_analiz/lib/tests``).
+
+Addon paketleri import edildiğinde Odoo'yu yükler; pytest'in paket
+``__init__.py``'lerini import etmemesi için addon dizinleri düz dizin olarak
+toplanır. Addon'ların ``tests/`` paketleri (TransactionCase) Odoo'nun kendi
+test koşucusuyla çalışır: ``odoo-bin -i <addon> --test-tags /<addon>``.
+"""
+import pytest
+
+
+def _in_addon(path):
+    return any((parent / '__manifest__.py').exists() for parent in (path, *path.parents))
+
+
+def pytest_ignore_collect(collection_path, config):
+    path = collection_path
+    if path.name == 'tests' and (path / '__init__.py').exists() and _in_addon(path):
+        return True  # Odoo test paketi
+    return None
+
+
+def pytest_collect_directory(path, parent):
+    if _in_addon(path):
+        return pytest.Dir.from_parent(parent, path=path)
+    return None
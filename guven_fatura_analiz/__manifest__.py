@@ -32,6 +32,7 @@
         'views/guven_qnb_import_wizard_views.xml',
         'views/guven_mukellef_update_wizard_views.xml',
         'views/guven_vergi_analiz_views.xml',
+        'views/guven_tax_scheme_map_views.xml',
         'views/menus.xml',
         'data/cron_data.xml',
     ],
@@ -0,0 +1 @@
+"""ORM'den bağımsız yardımcılar (izibiz SOAP yanıtları, UBL işleme)."""
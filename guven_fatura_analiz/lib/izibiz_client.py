@@ -0,0 +1,107 @@
+"""zeep client yardımcıları (zeep opsiyonel bağımlılık — lazy import).
+
+WSDL/XSD indirme ve derleme her çağrıda tekrarlanmasın diye parse edilmiş
+client'lar process seviyesinde WSDL URL'ine göre cache'lenir. Ayrıca zeep'in
+SqliteCache'i ile indirilen WSDL/XSD dokümanları diskte TTL ile saklanır;
+yeni başlayan worker'lar da ağdan tekrar indirmez.
+"""
+import logging
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_logger = logging.getLogger(__name__)
+
+# Diskteki WSDL/XSD cache'inin geçerlilik süresi (saniye)
+WSDL_CACHE_TTL = 24 * 3600
+
+# HTTP connection pool boyutu; paralel detay indirmede worker sayısının üst sınırı
+HTTP_POOL_SIZE = 10
+
+_STREAMING_TRANSPORT_CLS = None
+
+_CLIENT_CACHE = {}
+_CLIENT_CACHE_LOCK = threading.Lock()
+
+
+def streaming_transport_class():
+    """``stream=True`` ile POST atan zeep Transport alt sınıfını döndür.
+
+    ``raw_response=True`` ile yapılan çağrılarda yanıt gövdesi belleğe
+    alınmadan döner; çağıran ``izibiz_xml.open_response_stream`` ile
+    soketten okur. Normal (parse edilen) çağrılarda zeep ``content``'i
+    kendisi okuduğu için davranış değişmez.
+    """
+    global _STREAMING_TRANSPORT_CLS
+    if _STREAMING_TRANSPORT_CLS is None:
+        from zeep.transports import Transport
+
+        class StreamingTransport(Transport):
+            def post(self, address, message, headers):
+                return self.session.post(
+                    address, data=message, headers=headers,
+                    timeout=self.operation_timeout, stream=True,
+                )
+
+        _STREAMING_TRANSPORT_CLS = StreamingTransport
+    return _STREAMING_TRANSPORT_CLS
+
+
+def build_http_session():
+    """Retry'lı, connection pool'lu requests.Session oluştur."""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=5, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session.mount('https://', adapter)
+    return session
+
+
+def _wsdl_disk_cache(cache_dir):
+    """zeep SqliteCache (TTL'li) döndür; dizin yazılamıyorsa None."""
+    if not cache_dir:
+        return None
+    from zeep.cache import SqliteCache
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        return SqliteCache(
+            path=os.path.join(cache_dir, 'zeep_wsdl.sqlite'),
+            timeout=WSDL_CACHE_TTL,
+        )
+    except OSError as e:
+        _logger.warning("[GUVEN-SOAP] WSDL disk cache kullanılamıyor (%s): %s", cache_dir, e)
+        return None
+
+
+def get_zeep_client(wsdl_url, cache_dir=None):
+    """WSDL URL'ine göre process seviyesinde cache'lenmiş zeep client döndür.
+
+    İlk çağrıda WSDL disk cache'ten (yoksa ağdan) yüklenip derlenir, sonraki
+    çağrılar aynı client'ı kullanır. zeep'in ``client.settings(...)``
+    override'ları thread-local olduğu için client thread'ler arasında
+    paylaşılabilir.
+    """
+    client = _CLIENT_CACHE.get(wsdl_url)
+    if client is not None:
+        return client
+
+    with _CLIENT_CACHE_LOCK:
+        client = _CLIENT_CACHE.get(wsdl_url)
+        if client is None:
+            from zeep import Client
+            from zeep import Settings
+
+            transport = streaming_transport_class()(
+                cache=_wsdl_disk_cache(cache_dir),
+                session=build_http_session(),
+                timeout=90,
+            )
+            settings = Settings(strict=False, xml_huge_tree=True)
+            client = Client(wsdl_url, transport=transport, settings=settings)
+            _CLIENT_CACHE[wsdl_url] = client
+            _logger.info("[GUVEN-SOAP] zeep client oluşturuldu ve cache'lendi: %s", wsdl_url)
+    return client
+
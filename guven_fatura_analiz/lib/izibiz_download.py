@@ -0,0 +1,223 @@
+"""izibiz'den UBL XML indirme (ORM'siz — worker thread'lerinde çalışabilir).
+
+Detay cron'larında ağ beklemesi toplam sürenin büyük kısmıdır. Buradaki
+fonksiyonlar yalnızca paylaşılan ``IzibizSession`` ve düz değerlerle
+(UUID, yön) çalışır; Odoo env/cursor'a dokunmaz. Böylece indirme + base64/ZIP
+çözme bir thread havuzunda paralel yapılırken parse ve DB yazma cursor'ın
+sahibi olan tek thread'de kalır.
+
+Header sync'te de aynı ayrım geçerlidir: liste yanıtları (``fetch_*_headers``)
+worker thread'inde geçici dosyaya indirilir, upsert cursor thread'inde
+yapılır.
+"""
+import shutil
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .izibiz_xml import (
+    decode_content,
+    extract_content,
+    iter_status_entries,
+    open_response_stream,
+    read_ubl_payload,
+)
+
+# Header listesi yanıtı bu boyuta kadar bellekte, üstünde diskte tutulur
+SPOOL_MAX_MEMORY = 32 * 1024 * 1024
+
+
+class ContentError(Exception):
+    """SOAP yanıtından kullanılabilir UBL içeriği çıkarılamadı."""
+
+
+def extract_ubl(content_text, session=None):
+    """CONTENT metni → UBL bytes.
+
+    ``session`` verilirse CONTENT/UBL boyutları oturumun aktarım
+    sayaçlarına eklenir (bkz. ``IzibizSession.note_content``).
+
+    Raises:
+        ContentError: içerik yok/çok kısa ya da ZIP içinde XML yok
+    """
+    if not content_text or len(content_text) < 100:
+        raise ContentError("XML içeriği alınamadı")
+    try:
+        ubl_bytes = decode_content(content_text)
+    except ValueError:
+        raise ContentError("ZIP içinde XML bulunamadı")
+    if session is not None:
+        session.note_content(len(content_text) * 3 // 4, len(ubl_bytes))
+    return ubl_bytes
+
+
+def read_response_ubl(raw, session=None):
+    """Tek faturalık SOAP yanıtı → UBL bytes (tek geçiş, yanıtı kapatır).
+
+    CONTENT ağaç kurulmadan streaming okunur ve parça parça base64
+    çözülür; bellekte yalnızca çözülmüş CONTENT ve UBL'in kendisi kalır.
+    ``session`` verilirse boyutlar oturumun aktarım sayaçlarına eklenir.
+
+    Raises:
+        ContentError: SOAP hata kodu, içerik yok/çok kısa, base64 bozuk ya da
+            ZIP içinde XML yok
+    """
+    try:
+        payload = extract_content(open_response_stream(raw))
+    except ValueError as e:
+        raise ContentError(f"CONTENT base64 çözülemedi: {e}")
+    finally:
+        raw.close()
+    try:
+        if payload.error_code:
+            raise ContentError(f"SOAP hatası: [{payload.error_code}] {payload.error_message}")
+        if payload.file is None or payload.size < 100:
+            raise ContentError("XML içeriği alınamadı")
+        try:
+            ubl_bytes = read_ubl_payload(payload.file)
+        except ValueError:
+            raise ContentError("ZIP içinde XML bulunamadı")
+        if session is not None:
+            session.note_content(payload.nbytes, len(ubl_bytes))
+        return ubl_bytes
+    finally:
+        payload.close()
+
+
+def download_efatura_ubl(session, uuid, direction):
+    """GetInvoice (LIMIT=1, HEADER_ONLY=N) ile tek e-faturanın UBL'ini indir."""
+    raw = session.call(
+        'GetInvoice',
+        content=True,
+        INVOICE_SEARCH_KEY={
+            'LIMIT': 1,
+            'UUID': uuid,
+            'DIRECTION': direction,
+            'READ_INCLUDED': 'true',
+        },
+        HEADER_ONLY='N',
+    )
+    return read_response_ubl(raw, session)
+
+
+def download_earsiv_ubl(session, uuid):
+    """ReadFromArchive (PROFILE=XML) ile tek e-arşiv faturasının UBL'ini indir."""
+    raw = session.call(
+        'ReadFromArchive',
+        earsiv=True,
+        content=True,
+        INVOICEID=uuid,
+        PORTAL_DIRECTION='OUT',
+        PROFILE='XML',
+    )
+    return read_response_ubl(raw, session)
+
+
+def spool_response(raw):
+    """SOAP yanıt gövdesini ``SpooledTemporaryFile``'a kopyala ve yanıtı kapat.
+
+    Returns:
+        SpooledTemporaryFile: başa sarılmış, okunmaya hazır (çağıran kapatır)
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    try:
+        shutil.copyfileobj(open_response_stream(raw), spool, 1 << 16)
+    except BaseException:
+        spool.close()
+        raise
+    finally:
+        raw.close()
+    spool.seek(0)
+    return spool
+
+
+def fetch_efatura_headers(session, direction, start_dt, end_dt, limit):
+    """GetInvoice (HEADER_ONLY=Y) yanıtını indir → spool dosyası."""
+    return spool_response(session.call(
+        'GetInvoice',
+        INVOICE_SEARCH_KEY={
+            'LIMIT': limit,
+            'START_DATE': start_dt,
+            'END_DATE': end_dt,
+            'READ_INCLUDED': 'true',
+            'DIRECTION': direction,
+        },
+        HEADER_ONLY='Y',
+    ))
+
+
+def fetch_earsiv_headers(session, start_dt, end_dt, limit):
+    """GetEArchiveInvoiceList (HEADER_ONLY=Y) yanıtını indir → spool dosyası."""
+    return spool_response(session.call(
+        'GetEArchiveInvoiceList',
+        earsiv=True,
+        LIMIT=limit,
+        START_DATE=start_dt,
+        END_DATE=end_dt,
+        HEADER_ONLY='Y',
+        READ_INCLUDED='true',
+    ))
+
+
+def fetch_efatura_statuses(session, uuids):
+    """GetInvoiceStatusAll ile UUID listesinin güncel durumlarını sorgula.
+
+    Returns:
+        list: [(uuid, durum kodu, açıklama)]
+    """
+    raw = session.call('GetInvoiceStatusAll', UUID=list(uuids))
+    try:
+        return list(iter_status_entries(open_response_stream(raw)))
+    finally:
+        raw.close()
+
+
+def fetch_earsiv_statuses(session, uuids):
+    """GetEArchiveInvoiceStatus ile UUID listesinin güncel durumlarını sorgula.
+
+    Returns:
+        list: [(uuid, durum kodu, açıklama)]
+    """
+    raw = session.call('GetEArchiveInvoiceStatus', earsiv=True, UUID=list(uuids))
+    try:
+        return list(iter_status_entries(open_response_stream(raw)))
+    finally:
+        raw.close()
+
+
+def iter_concurrent(fn, jobs, max_workers):
+    """``fn(*args)`` çağrılarını sınırlı bir thread havuzunda çalıştır.
+
+    Args:
+        fn: ORM'siz callable (worker thread'inde çalışır)
+        jobs: (anahtar, args tuple) iterable'ı
+        max_workers: eşzamanlı çağrı sayısı
+
+    Yields:
+        tuple: (anahtar, sonuç, exception) — tamamlanma sırasıyla. Aynı anda
+        en fazla ``2 * max_workers`` iş kuyrukta/çalışmada olur; böylece
+        indirilen ama henüz tüketilmemiş payload'lar belleği şişirmez.
+    """
+    max_workers = max(1, max_workers)
+    jobs = iter(jobs)
+    in_flight = {}
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='guven-izibiz')
+
+    def submit_next():
+        for key, args in jobs:
+            in_flight[pool.submit(fn, *args)] = key
+            return True
+        return False
+
+    try:
+        for _i in range(2 * max_workers):
+            if not submit_next():
+                break
+        while in_flight:
+            done, _pending = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = in_flight.pop(future)
+                exc = future.exception()
+                yield key, (None if exc else future.result()), exc
+                submit_next()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
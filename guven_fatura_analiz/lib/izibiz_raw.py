@@ -0,0 +1,551 @@
+"""zeep'siz, şablonlu izibiz SOAP transport'u (zeep opsiyonel yedek).
+
+Tüm çağrılar zaten ``raw_response=True`` ile yapılıp yanıt elle parse
+edildiğinden zeep yalnızca zarf (envelope) üretmek için kullanılıyordu; bunun
+bedeli ise her worker'da ağır import ve tam WSDL/XSD derlemesiydi. Burada
+kullandığımız birkaç operasyonun zarfı şablondan üretilir ve havuzlu bir
+``requests.Session`` ile ``stream=True`` POST edilir; yanıt aynı streaming
+parser'lara gider.
+
+Zarf için gereken az bilgi (endpoint, SOAPAction, istek elementinin
+namespace'i, alt elementlerin nitelendirilmesi ve tarih tipleri) WSDL/XSD'den
+ElementTree ile taranır — şema derlenmez — ve data_dir'de JSON olarak
+saklanır. Soğuk başlayan bir worker yalnızca bu dosyayı okur.
+
+Şablonu olmayan veya taranan şemadan güvenle üretilemeyen operasyonlar ile
+ham zarfı servis tarafından reddedilen (şema/unmarshalling fault'u alan,
+zeep ile başarılı olan) operasyonlar zeep client'ına düşer. izibiz'in iş
+hataları (fatura bulunamadı vb.) da HTTP 500 + SOAP fault döner; bunlar
+olduğu gibi çağırana iletilir.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+from urllib.parse import urljoin
+from xml.etree import ElementTree as ET
+
+from .izibiz_client import WSDL_CACHE_TTL, build_http_session, get_zeep_client
+from .izibiz_xml import local_name
+
+_logger = logging.getLogger(__name__)
+
+WSDL_NS = 'http://schemas.xmlsoap.org/wsdl/'
+XSD_NS = 'http://www.w3.org/2001/XMLSchema'
+SOAP11_NS = 'http://schemas.xmlsoap.org/wsdl/soap/'
+SOAP12_NS = 'http://schemas.xmlsoap.org/wsdl/soap12/'
+SOAP11_ENV = 'http://schemas.xmlsoap.org/soap/envelope/'
+SOAP12_ENV = 'http://www.w3.org/2003/05/soap-envelope'
+
+# Şablonlar: operasyon → istek elementinin alt elementleri (şema sırası).
+# İç içe dict'ler (REQUEST_HEADER, INVOICE_SEARCH_KEY) verildiği sırayla,
+# listeler tekrarlanan element olarak yazılır.
+TEMPLATES = {
+    'Login': ('REQUEST_HEADER', 'USER_NAME', 'PASSWORD'),
+    'Logout': ('REQUEST_HEADER',),
+    'GetInvoice': ('REQUEST_HEADER', 'INVOICE_SEARCH_KEY', 'HEADER_ONLY'),
+    'GetEArchiveInvoiceList': (
+        'REQUEST_HEADER', 'LIMIT', 'START_DATE', 'END_DATE', 'HEADER_ONLY', 'READ_INCLUDED',
+    ),
+    'ReadFromArchive': ('REQUEST_HEADER', 'INVOICEID', 'PORTAL_DIRECTION', 'PROFILE'),
+    'GetInvoiceStatusAll': ('REQUEST_HEADER', 'UUID'),
+    'GetEArchiveInvoiceStatus': ('REQUEST_HEADER', 'UUID'),
+}
+
+HTTP_TIMEOUT = 90
+# WSDL taranamadıysa (ağ hatası vb.) bu süre zeep ile devam edilip yeniden denenir
+PLAN_RETRY_INTERVAL = 5 * 60
+
+# Ham zarfın kendisinin reddedildiğini gösteren fault metinleri (JAX-WS/CXF)
+_ENVELOPE_FAULT_HINTS = (
+    'unmarshal', 'unexpected element', 'cvc-', 'cannot find dispatch',
+    'no such operation', 'unexpected wrapper element',
+)
+
+_PLAN_VERSION = 1
+_HTTP_SESSION = None
+_HTTP_LOCK = threading.Lock()
+_TRANSPORTS = {}
+_TRANSPORTS_LOCK = threading.Lock()
+
+
+class UnsupportedOperation(Exception):
+    """Operasyon şablonla güvenle üretilemiyor; zeep kullanılmalı."""
+
+
+def is_envelope_fault(content):
+    """SOAP fault, izibiz iş hatası değil de zarfın reddi (şema/unmarshalling) mı?
+
+    izibiz iş hataları ``ERROR_CODE`` taşır; bunlar zarf hatası sayılmaz.
+    """
+    try:
+        root = ET.fromstring(content)
+    except ET.ParseError:
+        return False
+    text = ''
+    for elem in root.iter():
+        tag = local_name(elem.tag)
+        if tag == 'ERROR_CODE':
+            return False
+        if tag in ('faultstring', 'Text') and not text:
+            text = (elem.text or '').strip().lower()
+    return any(hint in text for hint in _ENVELOPE_FAULT_HINTS)
+
+
+class ZeepUnavailable(RuntimeError):
+    """Çağrı zeep'e düşmesi gerekti ama zeep kurulu değil."""
+
+    def __init__(self):
+        super().__init__(
+            "zeep kütüphanesi yüklü değil. Lütfen 'pip install zeep' komutuyla yükleyin."
+        )
+
+
+class LoginFailed(Exception):
+    """Login yanıtında SESSION_ID yok."""
+
+    def __init__(self, code='', description=''):
+        super().__init__(f"kod: {code}, {description}")
+        self.code = code
+        self.description = description
+
+
+def _http_session():
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None:
+        with _HTTP_LOCK:
+            if _HTTP_SESSION is None:
+                _HTTP_SESSION = build_http_session()
+    return _HTTP_SESSION
+
+
+# ----------------------------------------------------------------------
+# WSDL / XSD tarama
+# ----------------------------------------------------------------------
+
+def _parse_with_prefixes(data):
+    """XML bytes → (kök element, {prefix: namespace})."""
+    prefixes = {}
+    root = None
+    for event, item in ET.iterparse(io.BytesIO(data), events=('start-ns', 'start')):
+        if event == 'start-ns':
+            prefixes.setdefault(item[0], item[1])
+        elif root is None:
+            root = item
+    return root, prefixes
+
+
+def _qname(value, prefixes):
+    """'tns:Foo' → (namespace, 'Foo')."""
+    if ':' in value:
+        prefix, name = value.split(':', 1)
+    else:
+        prefix, name = '', value
+    return prefixes.get(prefix, ''), name
+
+
+class _Scanner:
+    """WSDL + import edilen XSD'lerden zarf planını çıkarır (derleme yapmaz)."""
+
+    def __init__(self, http):
+        self.http = http
+        self.seen = set()
+        self.messages = {}    # mesaj adı → (ns, element adı)
+        self.port_ops = {}    # operasyon → giriş mesaj adı
+        self.actions = {}     # operasyon → SOAPAction
+        self.endpoint = None
+        self.soap_version = '1.1'
+        self.top_level = {}   # element adı → {(ns, tip)}
+        self.elements = {}    # element adı → {(ns, tip)} (yerel tanımlar dahil)
+        self.refs = {}        # element adı → {ns} (ref ile kullanılanlar)
+
+    def fetch(self, url):
+        response = self.http.get(url, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        return response.content
+
+    def scan_wsdl(self, url):
+        if url in self.seen:
+            return
+        self.seen.add(url)
+        root, prefixes = _parse_with_prefixes(self.fetch(url))
+
+        for elem in root:
+            tag = local_name(elem.tag)
+            if tag == 'import' and elem.get('location'):
+                self.scan_wsdl(urljoin(url, elem.get('location')))
+            elif tag == 'types':
+                for schema in elem:
+                    if local_name(schema.tag) == 'schema':
+                        self.scan_schema(schema, prefixes, url)
+            elif tag == 'message':
+                for part in elem:
+                    if local_name(part.tag) == 'part' and part.get('element'):
+                        self.messages[elem.get('name')] = _qname(part.get('element'), prefixes)
+            elif tag == 'portType':
+                for op in elem:
+                    for msg in op:
+                        if local_name(msg.tag) == 'input' and msg.get('message'):
+                            self.port_ops[op.get('name')] = _qname(msg.get('message'), prefixes)[1]
+            elif tag == 'binding':
+                for op in elem:
+                    if local_name(op.tag) != 'operation':
+                        continue
+                    for child in op:
+                        if local_name(child.tag) == 'operation':
+                            self.actions[op.get('name')] = child.get('soapAction') or ''
+            elif tag == 'service' and self.endpoint is None:
+                for port in elem:
+                    for address in port:
+                        if local_name(address.tag) == 'address' and address.get('location'):
+                            self.endpoint = address.get('location')
+                            if address.tag.startswith('{%s}' % SOAP12_NS):
+                                self.soap_version = '1.2'
+                            break
+
+    def scan_schema(self, schema, prefixes, base_url):
+        tns = schema.get('targetNamespace', '')
+        qualified = schema.get('elementFormDefault') == 'qualified'
+
+        for child in schema:
+            if local_name(child.tag) in ('import', 'include') and child.get('schemaLocation'):
+                url = urljoin(base_url, child.get('schemaLocation'))
+                if url not in self.seen:
+                    self.seen.add(url)
+                    sub_root, sub_prefixes = _parse_with_prefixes(self.fetch(url))
+                    self.scan_schema(sub_root, sub_prefixes, url)
+
+        def walk(node, top):
+            for child in node:
+                if child.tag == '{%s}element' % XSD_NS:
+                    if child.get('ref'):
+                        ns, name = _qname(child.get('ref'), prefixes)
+                        self.refs.setdefault(name, set()).add(ns)
+                    elif child.get('name'):
+                        name = child.get('name')
+                        form = child.get('form')
+                        is_qualified = top or form == 'qualified' or (qualified and form != 'unqualified')
+                        type_name = _qname(child.get('type', ''), prefixes)[1]
+                        entry = (tns if is_qualified else '', type_name)
+                        self.elements.setdefault(name, set()).add(entry)
+                        if top:
+                            self.top_level.setdefault(name, set()).add(entry)
+                walk(child, False)
+
+        walk(schema, True)
+
+    def plan(self):
+        operations = {}
+        for op, message in self.port_ops.items():
+            if op in TEMPLATES and message in self.messages:
+                operations[op] = {
+                    'element': list(self.messages[message]),
+                    'action': self.actions.get(op, ''),
+                }
+
+        # ref ile kullanılan elementler tepe tanımın namespace/tipini alır
+        for name, namespaces in self.refs.items():
+            for entry in self.top_level.get(name, ()):
+                if entry[0] in namespaces:
+                    self.elements.setdefault(name, set()).add(entry)
+
+        # Yalnızca tek anlamlı tanımlar saklanır; belirsizler null
+        elements = {
+            name: (list(next(iter(entries))) if len(entries) == 1 else None)
+            for name, entries in self.elements.items()
+        }
+        return {
+            'version': _PLAN_VERSION,
+            'endpoint': self.endpoint,
+            'soap_version': self.soap_version,
+            'operations': operations,
+            'elements': elements,
+        }
+
+
+def load_plan(wsdl_url, cache_dir=None, http=None):
+    """WSDL'in zarf planını döndür (data_dir'deki JSON cache'ten, TTL'li).
+
+    Returns:
+        dict | None: plan; WSDL taranamazsa None (çağıran zeep kullanır)
+    """
+    path = None
+    if cache_dir:
+        digest = hashlib.sha1(wsdl_url.encode()).hexdigest()[:16]
+        path = os.path.join(cache_dir, f'izibiz_soap_plan_{digest}.json')
+        try:
+            if time.time() - os.path.getmtime(path) < WSDL_CACHE_TTL:
+                with open(path, encoding='utf-8') as f:
+                    plan = json.load(f)
+                if plan.get('version') == _PLAN_VERSION:
+                    return plan
+        except (OSError, ValueError):
+            pass
+
+    try:
+        scanner = _Scanner(http or _http_session())
+        scanner.scan_wsdl(wsdl_url)
+        plan = scanner.plan()
+    except Exception as e:
+        _logger.warning("[GUVEN-SOAP] WSDL taranamadı, zeep kullanılacak (%s): %s", wsdl_url, e)
+        return None
+    if not plan['endpoint'] or not plan['operations']:
+        _logger.warning("[GUVEN-SOAP] WSDL'de endpoint/operasyon bulunamadı, zeep kullanılacak: %s", wsdl_url)
+        return None
+
+    if path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(plan, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            _logger.warning("[GUVEN-SOAP] SOAP planı diske yazılamadı (%s): %s", path, e)
+    return plan
+
+
+# ----------------------------------------------------------------------
+# Zarf üretimi
+# ----------------------------------------------------------------------
+
+def _format_value(value, type_name):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, datetime):
+        if type_name == 'date':
+            return value.date().isoformat()
+        if type_name != 'dateTime':
+            raise UnsupportedOperation("tarih alanının şema tipi bilinmiyor")
+        return value.isoformat()
+    if isinstance(value, date):
+        if type_name == 'dateTime':
+            return datetime.combine(value, datetime.min.time()).isoformat()
+        if type_name != 'date':
+            raise UnsupportedOperation("tarih alanının şema tipi bilinmiyor")
+        return value.isoformat()
+    return str(value)
+
+
+def build_envelope(plan, operation, kwargs):
+    """Şablon + plan → SOAP zarfı (bytes).
+
+    Raises:
+        UnsupportedOperation: şablon/plan yok ya da bir alan belirsiz
+    """
+    template = TEMPLATES.get(operation)
+    op_plan = plan['operations'].get(operation)
+    if template is None or op_plan is None:
+        raise UnsupportedOperation(operation)
+    unknown = set(kwargs) - set(template)
+    if unknown:
+        raise UnsupportedOperation(f"{operation}: şablonda olmayan alan {sorted(unknown)}")
+
+    elements = plan['elements']
+
+    def add(parent, name, value):
+        if value is None:
+            return
+        if name in elements and elements[name] is None:
+            raise UnsupportedOperation(f"{operation}: {name} şemada belirsiz")
+        ns, type_name = elements.get(name) or ('', '')
+        for item in (value if isinstance(value, (list, tuple)) else (value,)):
+            node = ET.SubElement(parent, f'{{{ns}}}{name}' if ns else name)
+            if isinstance(item, dict):
+                for child_name, child_value in item.items():
+                    add(node, child_name, child_value)
+            else:
+                node.text = _format_value(item, type_name)
+
+    env_ns = SOAP12_ENV if plan['soap_version'] == '1.2' else SOAP11_ENV
+    envelope = ET.Element(f'{{{env_ns}}}Envelope')
+    body = ET.SubElement(envelope, f'{{{env_ns}}}Body')
+    ns, name = op_plan['element']
+    request = ET.SubElement(body, f'{{{ns}}}{name}' if ns else name)
+    for field in template:
+        if field in kwargs:
+            add(request, field, kwargs[field])
+    return ET.tostring(envelope, encoding='utf-8', xml_declaration=True)
+
+
+# ----------------------------------------------------------------------
+# Transport
+# ----------------------------------------------------------------------
+
+class IzibizTransport:
+    """Tek WSDL için SOAP çağrıları: önce şablonlu ham istek, gerekirse zeep.
+
+    Thread-safe; process seviyesinde WSDL URL'ine göre paylaşılır (bkz.
+    ``get_transport``). ``call`` her iki yolda da ``requests.Response``
+    döndürür (gövde henüz okunmamış olabilir).
+    """
+
+    def __init__(self, wsdl_url, cache_dir=None, raw=True):
+        self.wsdl_url = wsdl_url
+        self.cache_dir = cache_dir
+        self.raw = raw
+        self._plan = None
+        self._plan_retry_at = 0.0
+        self._plan_lock = threading.Lock()
+        # Ham zarfı reddedilip zeep ile başarılı olan operasyonlar
+        self._zeep_only = set()
+
+    @property
+    def plan(self):
+        """Zarf planı; yoksa (zeep modu / tarama hatası) None.
+
+        Tarama başarısız olduysa ``PLAN_RETRY_INTERVAL`` sonra yeniden
+        denenir; tek bir ağ hatası ham yolu process ömrü boyunca kapatmaz.
+        """
+        if self._plan is None and self.raw and time.time() >= self._plan_retry_at:
+            with self._plan_lock:
+                if self._plan is None and time.time() >= self._plan_retry_at:
+                    self._plan = load_plan(self.wsdl_url, self.cache_dir)
+                    if self._plan is None:
+                        self._plan_retry_at = time.time() + PLAN_RETRY_INTERVAL
+        return self._plan
+
+    def field_type(self, name):
+        """Elementin şemadaki tipi (ör. ``'date'`` / ``'dateTime'``).
+
+        Plan yoksa (zeep modu / tarama hatası) veya element belirsizse None.
+        """
+        plan = self.plan
+        entry = plan['elements'].get(name) if plan else None
+        return entry[1] if entry else None
+
+    @property
+    def zeep_client(self):
+        """Yedek zeep client'ı (ilk gerektiğinde import edilir).
+
+        Raises:
+            ZeepUnavailable: zeep kurulu değilse
+        """
+        try:
+            return get_zeep_client(self.wsdl_url, cache_dir=self.cache_dir)
+        except ImportError:
+            raise ZeepUnavailable()
+
+    def _post_raw(self, plan, operation, kwargs):
+        envelope = build_envelope(plan, operation, kwargs)
+        action = plan['operations'][operation]['action']
+        if plan['soap_version'] == '1.2':
+            content_type = 'application/soap+xml; charset=utf-8'
+            if action:
+                content_type += f'; action="{action}"'
+            headers = {'Content-Type': content_type}
+        else:
+            headers = {'Content-Type': 'text/xml; charset=utf-8', 'SOAPAction': f'"{action}"'}
+        return _http_session().post(
+            plan['endpoint'], data=envelope, headers=headers,
+            timeout=HTTP_TIMEOUT, stream=True,
+        )
+
+    def _call_zeep(self, operation, kwargs):
+        client = self.zeep_client
+        with client.settings(raw_response=True):
+            return getattr(client.service, operation)(**kwargs)
+
+    def call(self, operation, **kwargs):
+        """Operasyonu çağır → ``requests.Response``.
+
+        Ham zarf servis tarafından reddedilirse (bkz. ``is_envelope_fault``)
+        aynı çağrı zeep ile tekrarlanır; zeep başarılıysa operasyon bu
+        process'te kalıcı olarak zeep'e geçer. Diğer fault'lar (oturum ve
+        iş hataları) olduğu gibi döner.
+        """
+        plan = self.plan
+        if plan is None or operation in self._zeep_only:
+            return self._call_zeep(operation, kwargs)
+        try:
+            response = self._post_raw(plan, operation, kwargs)
+        except UnsupportedOperation as e:
+            _logger.debug("[GUVEN-SOAP] %s şablonla üretilemedi (%s), zeep kullanılıyor", operation, e)
+            return self._call_zeep(operation, kwargs)
+
+        if response.status_code < 500 or not is_envelope_fault(response.content):
+            return response
+
+        fallback = self._call_zeep(operation, kwargs)
+        if fallback.status_code < 500:
+            _logger.warning(
+                "[GUVEN-SOAP] %s: ham SOAP zarfı reddedildi, zeep ile başarılı; "
+                "bu operasyon için zeep kullanılacak (%s)", operation, self.wsdl_url,
+            )
+            self._zeep_only.add(operation)
+            response.close()
+            return fallback
+        fallback.close()
+        return response
+
+    def login(self, request_header, username, password):
+        """Login → SESSION_ID.
+
+        Raises:
+            LoginFailed: yanıtta SESSION_ID yoksa (ERROR_TYPE kod/açıklamasıyla)
+        """
+        plan = self.plan
+        if plan is None or 'Login' not in plan['operations'] or 'Login' in self._zeep_only:
+            resp = self.zeep_client.service.Login(
+                REQUEST_HEADER=request_header, USER_NAME=username, PASSWORD=password,
+            )
+            # SESSION_ID attribute var ama None olabilir (login başarısız)
+            session_id = getattr(resp, 'SESSION_ID', None)
+            if not session_id:
+                error_type = getattr(resp, 'ERROR_TYPE', None)
+                raise LoginFailed(
+                    getattr(error_type, 'ERROR_CODE', '') if error_type else '',
+                    getattr(error_type, 'ERROR_SHORT_DES', '') if error_type else '',
+                )
+            return session_id
+
+        response = self.call(
+            'Login', REQUEST_HEADER=request_header, USER_NAME=username, PASSWORD=password,
+        )
+        try:
+            root = ET.fromstring(response.content)
+        finally:
+            response.close()
+        found = {}
+        for elem in root.iter():
+            tag = local_name(elem.tag)
+            if tag in ('SESSION_ID', 'ERROR_CODE', 'ERROR_SHORT_DES', 'faultstring') \
+                    and elem.text and tag not in found:
+                found[tag] = elem.text.strip()
+        if not found.get('SESSION_ID'):
+            raise LoginFailed(
+                found.get('ERROR_CODE', ''),
+                found.get('ERROR_SHORT_DES') or found.get('faultstring', ''),
+            )
+        return found['SESSION_ID']
+
+    def logout(self, request_header):
+        """Logout (hata fırlatmaz)."""
+        try:
+            plan = self.plan
+            if plan is None or 'Logout' not in plan['operations']:
+                self.zeep_client.service.Logout(REQUEST_HEADER=request_header)
+            else:
+                self.call('Logout', REQUEST_HEADER=request_header).close()
+        except Exception:
+            pass
+
+
+def get_transport(wsdl_url, cache_dir=None, raw=True):
+    """WSDL URL'i için process seviyesinde paylaşılan ``IzibizTransport``.
+
+    ORM'siz; worker thread'lerinden de çağrılabilir. WSDL ilk çağrıda taranır.
+    """
+    key = (wsdl_url, raw)
+    transport = _TRANSPORTS.get(key)
+    if transport is None:
+        with _TRANSPORTS_LOCK:
+            transport = _TRANSPORTS.get(key)
+            if transport is None:
+                transport = IzibizTransport(wsdl_url, cache_dir=cache_dir, raw=raw)
+                _TRANSPORTS[key] = transport
+    return transport
@@ -0,0 +1,181 @@
+"""izibiz oturum (SESSION_ID) havuzu.
+
+Her işlem için Login/Logout yapmak yerine şirket başına tek bir oturum
+process seviyesinde saklanır ve TTL dolana ya da izibiz oturum hatası
+dönene kadar tekrar kullanılır. Süre dolduğunda veya oturum hatasında
+şeffaf şekilde yeniden login olunur.
+"""
+import logging
+import re
+import threading
+import time
+from xml.etree import ElementTree as ET
+
+from .izibiz_raw import LoginFailed
+from .izibiz_xml import local_name
+
+_logger = logging.getLogger(__name__)
+
+APPLICATION_NAME = 'guven_fatura_analiz'
+
+# Fault / ERROR_SHORT_DES metninde oturum hatasını işaret eden ifadeler
+_SESSION_ERROR_RE = re.compile(r'SESSION|OTURUM', re.IGNORECASE)
+
+_POOL = {}
+_POOL_LOCK = threading.Lock()
+
+
+class IzibizError(Exception):
+    """izibiz login / oturum hatası."""
+
+
+def is_session_error(content):
+    """SOAP fault gövdesi oturum geçersiz/süresi dolmuş hatası mı?"""
+    try:
+        root = ET.fromstring(content)
+    except ET.ParseError:
+        return False
+    texts = [
+        elem.text for elem in root.iter()
+        if local_name(elem.tag) in ('faultstring', 'ERROR_SHORT_DES', 'ERROR_LONG_DES')
+        and elem.text
+    ]
+    return any(_SESSION_ERROR_RE.search(t) for t in texts)
+
+
+class IzibizSession:
+    """Şirket başına paylaşılan, TTL'li izibiz oturumu.
+
+    Login her zaman e-fatura WSDL'i üzerinden yapılır; aynı SESSION_ID
+    e-arşiv servisinde de geçerlidir. Thread-safe: yeniden login bir
+    lock altında yapılır. SOAP çağrıları ``lib.izibiz_raw.IzibizTransport``
+    üzerinden yapılır (şablonlu ham istek, gerekirse zeep).
+    """
+
+    def __init__(self, efatura_transport, earsiv_transport_factory,
+                 username, password, ttl, compressed=False):
+        self.efatura_transport = efatura_transport
+        self._earsiv_transport_factory = earsiv_transport_factory
+        self._earsiv_transport = None
+        self.username = username
+        self.password = password
+        self.ttl = ttl
+        self.compressed = compressed
+        self.session_id = None
+        self.expires_at = 0.0
+        self._lock = threading.Lock()
+        # İndirilen CONTENT (base64 çözülmüş) ve açılmış UBL bayt sayaçları
+        self._content_bytes = 0
+        self._ubl_bytes = 0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def earsiv_transport(self):
+        if self._earsiv_transport is None:
+            self._earsiv_transport = self._earsiv_transport_factory()
+        return self._earsiv_transport
+
+    def request_header(self, content=False):
+        """REQUEST_HEADER.
+
+        ``COMPRESSED=Y`` yalnızca CONTENT indiren çağrılarda (``content``)
+        ve şirkette açıksa gönderilir; header/durum listelerinde
+        sıkıştırılacak içerik yoktur.
+        """
+        return {
+            'SESSION_ID': self.session_id,
+            'APPLICATION_NAME': APPLICATION_NAME,
+            'COMPRESSED': 'Y' if content and self.compressed else 'N',
+        }
+
+    def field_type(self, name, earsiv=False):
+        """İlgili servisin şemasında elementin tipi (bkz. ``IzibizTransport.field_type``)."""
+        transport = self.earsiv_transport if earsiv else self.efatura_transport
+        return transport.field_type(name)
+
+    def note_content(self, content_bytes, ubl_bytes):
+        """İndirilen bir CONTENT'in boyutunu ve açılmış UBL boyutunu say."""
+        with self._stats_lock:
+            self._content_bytes += content_bytes
+            self._ubl_bytes += ubl_bytes
+
+    def transfer_totals(self):
+        """Oturum açıldığından beri (CONTENT baytı, UBL baytı)."""
+        with self._stats_lock:
+            return self._content_bytes, self._ubl_bytes
+
+    def is_valid(self):
+        return bool(self.session_id) and time.monotonic() < self.expires_at
+
+    def ensure(self):
+        """Geçerli oturum yoksa login ol."""
+        if self.is_valid():
+            return
+        with self._lock:
+            if not self.is_valid():
+                self._login()
+
+    def _login(self):
+        try:
+            session_id = self.efatura_transport.login(
+                {'SESSION_ID': '-1', 'APPLICATION_NAME': APPLICATION_NAME},
+                self.username, self.password,
+            )
+        except LoginFailed as e:
+            error_msg = f" (kod: {e.code}, {e.description})" if (e.code or e.description) else ''
+            raise IzibizError(f"izibiz login başarısız: SESSION_ID alınamadı.{error_msg}")
+
+        self.session_id = session_id
+        self.expires_at = time.monotonic() + self.ttl
+        _logger.info("[GUVEN-SOAP] izibiz login (%s), TTL %d sn", self.username, self.ttl)
+
+    def invalidate(self, logout=True):
+        """Oturumu geçersiz kıl; istenirse izibiz tarafında da kapat."""
+        with self._lock:
+            session_id, self.session_id = self.session_id, None
+            self.expires_at = 0.0
+        if logout and session_id:
+            self.efatura_transport.logout({
+                'SESSION_ID': session_id, 'APPLICATION_NAME': APPLICATION_NAME,
+            })
+
+    def call(self, operation, earsiv=False, content=False, **kwargs):
+        """SOAP operasyonunu çağır, requests.Response döndür (gövde okunmamış olabilir).
+
+        ``content``: çağrı fatura CONTENT'i indiriyor (GetInvoice
+        HEADER_ONLY=N, ReadFromArchive); sıkıştırma yalnızca bunlarda
+        istenir. izibiz oturum hatası dönerse bir kez yeniden login olup
+        tekrar dener.
+        """
+        transport = self.earsiv_transport if earsiv else self.efatura_transport
+        for attempt in (1, 2):
+            self.ensure()
+            response = transport.call(
+                operation, REQUEST_HEADER=self.request_header(content), **kwargs,
+            )
+            if (attempt == 1 and response.status_code >= 500
+                    and is_session_error(response.content)):
+                _logger.info(
+                    "[GUVEN-SOAP] %s: oturum geçersiz, yeniden login olunuyor",
+                    operation,
+                )
+                self.invalidate(logout=False)
+                continue
+            return response
+
+
+def get_session(key, fingerprint, factory):
+    """Havuzdan ``key`` (örn. db + şirket) için oturumu döndür.
+
+    ``fingerprint`` kimlik bilgilerini (WSDL, kullanıcı adı, şifre) temsil
+    eder; değişmişse eski oturum bırakılır ve ``factory()`` ile yenisi
+    oluşturulur.
+    """
+    entry = _POOL.get(key)
+    if entry is None or entry[0] != fingerprint:
+        with _POOL_LOCK:
+            entry = _POOL.get(key)
+            if entry is None or entry[0] != fingerprint:
+                entry = (fingerprint, factory())
+                _POOL[key] = entry
+    return entry[1]
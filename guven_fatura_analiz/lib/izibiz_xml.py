@@ -0,0 +1,355 @@
+"""izibiz SOAP yanıtları için streaming XML yardımcıları.
+
+Büyük GetInvoice / GetEArchiveInvoiceList yanıtları (LIMIT=25000) tek seferde
+ağaç olarak yüklenmez; ``iterparse`` ile okunur ve her INVOICE elementi
+tüketildikten sonra ağaçtan koparılır. Böylece worker belleği yanıt
+boyutundan bağımsız kalır.
+
+Tek faturalık yanıtlarda (GetInvoice LIMIT=1, ReadFromArchive) CONTENT ise
+``extract_content`` ile hiç ağaç kurulmadan okunur: base64 metni parça parça
+çözülerek geçici dosyaya yazılır, ZIP üyesi oradan açılır.
+"""
+import base64
+import binascii
+import io
+import shutil
+import tempfile
+import zipfile
+from xml.etree import ElementTree as ET
+from xml.parsers import expat
+
+# UBL içeriğini taşıyabilen etiketler (en uzun text'li olan seçilir)
+CONTENT_TAGS = ('CONTENT', 'INVOICE', 'HTML_CONTENT', 'INVOICE_CONTENT', 'DATA')
+_CONTENT_TAG_SET = frozenset(CONTENT_TAGS)
+
+# Çözülmüş (ZIP'li) CONTENT bu boyuta kadar bellekte, üstünde diskte tutulur
+CONTENT_SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+_READ_CHUNK = 1 << 16
+
+# base64 alfabesi dışındaki baytlar (b64decode(validate=False) gibi atlanır)
+_B64_JUNK = bytes(
+    set(range(256)) - set(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=')
+)
+
+
+def local_name(tag):
+    """'{ns}TAG' → 'TAG' (namespace-agnostic karşılaştırma için)."""
+    return tag.rsplit('}', 1)[-1] if '}' in tag else tag
+
+
+def open_response_stream(response):
+    """requests.Response → okunabilir byte stream.
+
+    Transport ``stream=True`` ile istek attıysa gövde henüz okunmamıştır;
+    bu durumda soket stream'i doğrudan döner (gzip/deflate çözülerek).
+    Aksi halde zaten bellekte olan içerik BytesIO ile sarılır.
+    """
+    raw = getattr(response, 'raw', None)
+    if raw is not None and not getattr(response, '_content_consumed', True):
+        raw.decode_content = True
+        return raw
+    return io.BytesIO(response.content)
+
+
+def iter_invoice_elements(source):
+    """SOAP yanıtındaki her INVOICE elementini streaming olarak üret.
+
+    Element, tüketici bir sonrakini isteyene kadar tam halidir (HEADER,
+    CONTENT vb. alt elementleriyle); ardından temizlenir ve parent'ından
+    çıkarılır. Bellekte aynı anda en fazla bir INVOICE alt ağacı bulunur.
+    """
+    stack = []
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        if local_name(elem.tag) != 'INVOICE':
+            continue
+
+        yield elem
+
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
+
+
+def header_dict(inv_elem):
+    """INVOICE/HEADER alt etiketleri → {etiket: text}."""
+    header = next(
+        (e for e in inv_elem.iter() if local_name(e.tag) == 'HEADER'), None,
+    )
+    h = {}
+    if header is not None:
+        for child in header:
+            h[local_name(child.tag)] = child.text
+    return h
+
+
+def iter_invoice_headers(source):
+    """SOAP yanıtındaki her INVOICE elementi için (attrib, header) üret.
+
+    Args:
+        source: dosya benzeri byte stream (bkz. ``open_response_stream``)
+
+    Yields:
+        tuple: (INVOICE attribute dict'i, {HEADER alt etiketi: text})
+    """
+    for elem in iter_invoice_elements(source):
+        yield dict(elem.attrib), header_dict(elem)
+
+
+# Durum yanıtlarında fatura başına bilgiyi taşıyan elementler
+STATUS_CONTAINER_TAGS = frozenset(('INVOICE', 'INVOICE_STATUS'))
+
+
+def iter_status_entries(source):
+    """Durum sorgusu yanıtından (uuid, durum kodu, açıklama) üret.
+
+    Yanıt yapısı operasyona göre değiştiği için (INVOICE/HEADER/STATUS veya
+    INVOICE_STATUS/STATUS_CODE) her kapsayıcı elementin alt ağacında UUID ve
+    durum aranır; header sync'teki gibi STATUS_CODE, yoksa STATUS kullanılır.
+    Bilgisi tam olan kapsayıcı tüketildikten sonra temizlenir.
+    """
+    stack = []
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        if local_name(elem.tag) not in STATUS_CONTAINER_TAGS:
+            continue
+
+        found = {}
+        for child in elem.iter():
+            tag = local_name(child.tag)
+            if tag in ('UUID', 'STATUS_CODE', 'STATUS', 'STATUS_DESCRIPTION') \
+                    and child.text and tag not in found:
+                found[tag] = child.text.strip()
+        uuid = elem.get('UUID') or found.get('UUID')
+        status = found.get('STATUS_CODE') or found.get('STATUS')
+        if not (uuid and status):
+            # Bilgi dış kapsayıcıda tamamlanabilir (örn. INVOICE > INVOICE_STATUS)
+            continue
+
+        yield uuid, status, found.get('STATUS_DESCRIPTION')
+
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
+
+
+def find_content_text(elem):
+    """Element altındaki UBL CONTENT metnini bul (en uzun text'li aday etiket).
+
+    Returns:
+        str | None: strip edilmiş base64 metni
+    """
+    best = None
+    for child in elem.iter():
+        text = child.text
+        if text and (best is None or len(text) > len(best)) \
+                and local_name(child.tag) in _CONTENT_TAG_SET:
+            best = text
+    # Yalnızca seçilen metin strip edilir (boşluk-only konteyner text'leri elenir)
+    return (best and best.strip()) or None
+
+
+def decode_content(content_text):
+    """Base64 CONTENT → UBL XML bytes (ZIP ise içindeki XML, NUL temizlenmiş).
+
+    Raises:
+        ValueError: base64 bozuksa (binascii.Error) veya ZIP içinde XML yoksa
+    """
+    return read_ubl_payload(io.BytesIO(base64.b64decode(content_text)))
+
+
+def read_ubl_payload(fileobj):
+    """Çözülmüş CONTENT dosyası → UBL XML bytes.
+
+    ZIP ise yalnızca XML üyesi açılıp okunur (arşivin tamamı ayrıca
+    kopyalanmaz); değilse dosya olduğu gibi okunur. NUL karakterleri
+    temizlenir.
+
+    Raises:
+        ValueError: ZIP içinde XML yoksa
+    """
+    magic = fileobj.read(4)
+    fileobj.seek(0)
+
+    # ZIP kontrolü
+    if magic == b'PK\x03\x04':
+        with zipfile.ZipFile(fileobj, 'r') as zf:
+            names = zf.namelist()
+            xml_name = next(
+                (n for n in names if n.endswith('.xml') and not n.startswith('__')),
+                names[0] if names else None,
+            )
+            if not xml_name:
+                raise ValueError("ZIP içinde XML bulunamadı")
+            # Parça parça açılır; ZipFile.read'in birleştirme kopyaları oluşmaz
+            out = io.BytesIO()
+            with zf.open(xml_name) as member:
+                shutil.copyfileobj(member, out, _READ_CHUNK)
+            ubl_bytes = out.getvalue()
+            out.close()
+    else:
+        ubl_bytes = fileobj.read()
+
+    # NUL karakterlerini temizle (yoksa kopya oluşmaz)
+    if b'\x00' in ubl_bytes:
+        ubl_bytes = ubl_bytes.replace(b'\x00', b'')
+    return ubl_bytes
+
+
+class _Base64Spool:
+    """Parça parça gelen base64 metnini çözerek geçici dosyaya yazar.
+
+    Çözme hatası hemen yükseltilmez, ``error``'a kaydedilir: aday etiketlerden
+    hangisinin CONTENT olduğu ancak eleman bitince (en uzun metin) belli olur;
+    seçilmeyen bozuk bir aday (ör. ``<DATA>a=bc</DATA>``) yanıtı düşürmemeli.
+    """
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=CONTENT_SPOOL_MAX_MEMORY)
+        self.size = 0  # alınan base64 karakteri (boşluksuz)
+        self.nbytes = 0  # çözülmüş bayt
+        self.error = None  # ilk çözme hatası (binascii.Error)
+        self._pending = b''
+
+    def _emit(self, data):
+        if self.error is not None:
+            return
+        try:
+            decoded = base64.b64decode(data)
+        except binascii.Error as e:
+            self.error = e
+            return
+        self.nbytes += len(decoded)
+        self.file.write(decoded)
+
+    def write(self, text):
+        data = self._pending + text.encode('ascii', 'ignore').translate(None, _B64_JUNK)
+        self.size += len(data) - len(self._pending)
+        cut = len(data) - len(data) % 4
+        if cut:
+            self._emit(data[:cut])
+        self._pending = data[cut:]
+
+    def finish(self):
+        if self._pending:
+            self._emit(self._pending)
+            self._pending = b''
+        self.file.seek(0)
+        return self.file
+
+    def close(self):
+        self.file.close()
+
+
+class ContentPayload:
+    """``extract_content`` sonucu.
+
+    Attributes:
+        file: çözülmüş CONTENT (başa sarılmış; çağıran kapatır) veya None
+        size: CONTENT'in base64 uzunluğu (karakter)
+        nbytes: çözülmüş CONTENT'in bayt sayısı (ZIP ise sıkıştırılmış hali)
+        error_code / error_message: yanıttaki ilk sıfırdan farklı
+            ERROR_CODE ve ona ait ERROR_SHORT_DES
+    """
+
+    __slots__ = ('file', 'size', 'nbytes', 'error_code', 'error_message')
+
+    def __init__(self):
+        self.file = None
+        self.size = 0
+        self.nbytes = 0
+        self.error_code = None
+        self.error_message = None
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def extract_content(source):
+    """Tek faturalık SOAP yanıtından CONTENT'i tek streaming geçişte çıkar.
+
+    ``find_content_text`` ile aynı seçimi yapar (aday etiketler arasında en
+    uzun metinli olan) ama ağaç kurmaz ve metni bütün halinde tutmaz:
+    expat'in karakter parçaları doğrudan base64 çözücüye akar. Bellekte
+    aynı anda en fazla bir okuma parçası ve çözülmüş CONTENT bulunur.
+
+    Args:
+        source: dosya benzeri byte stream (bkz. ``open_response_stream``)
+
+    Returns:
+        ContentPayload
+
+    Raises:
+        ValueError: seçilen CONTENT'in base64'ü bozuksa (binascii.Error);
+            seçilmeyen adaylardaki çözme hataları yok sayılır
+    """
+    payload = ContentPayload()
+    stack = []  # [(etiket, _Base64Spool | list | None)]
+    errors = {}
+
+    def start(name, _attrs):
+        tag = local_name(name)
+        if tag in _CONTENT_TAG_SET:
+            stack.append((tag, _Base64Spool()))
+        elif tag in ('ERROR_CODE', 'ERROR_SHORT_DES'):
+            stack.append((tag, []))
+        else:
+            stack.append((tag, None))
+
+    def end(_name):
+        tag, sink = stack.pop()
+        if isinstance(sink, _Base64Spool):
+            if sink.size > payload.size:
+                payload.close()
+                payload.file, payload.size = sink.finish(), sink.size
+                payload.nbytes = sink.nbytes
+                errors['decode'] = sink.error
+            else:
+                sink.close()
+        elif sink is not None:
+            text = ''.join(sink).strip()
+            if tag == 'ERROR_CODE':
+                errors['code'] = text
+            elif text and errors.get('code') not in (None, '', '0') \
+                    and payload.error_code is None:
+                payload.error_code, payload.error_message = errors['code'], text
+
+    def data(text):
+        sink = stack[-1][1] if stack else None
+        if isinstance(sink, _Base64Spool):
+            sink.write(text)
+        elif sink is not None:
+            sink.append(text)
+
+    parser = expat.ParserCreate(namespace_separator='}')
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = data
+    try:
+        while True:
+            chunk = source.read(_READ_CHUNK)
+            if not chunk:
+                break
+            parser.Parse(chunk, False)
+        parser.Parse(b'', True)
+    except BaseException:
+        payload.close()
+        for _tag, sink in stack:
+            if isinstance(sink, _Base64Spool):
+                sink.close()
+        raise
+    if errors.get('decode') is not None:
+        payload.close()
+        raise errors['decode']
+    return payload
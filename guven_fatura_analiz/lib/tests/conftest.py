@@ -0,0 +1,15 @@
+"""``lib/`` testleri Odoo'suz çalışır (``python -m pytest guven_fatura_analiz/lib/tests``).
+
+``lib`` paketi, addon paketi (ve dolayısıyla Odoo) import edilmeden
+``guven_lib`` adıyla yüklenir; ``scripts/bench_ubl_parser.py`` ile aynı yöntem.
+"""
+import os
+import sys
+import types
+
+LIB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'guven_lib' not in sys.modules:
+    _pkg = types.ModuleType('guven_lib')
+    _pkg.__path__ = [LIB_DIR]
+    sys.modules['guven_lib'] = _pkg
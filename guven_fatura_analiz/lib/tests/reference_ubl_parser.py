@@ -0,0 +1,242 @@
+"""Referans UBL parser: dataclass'lı tek geçişlik yeniden yazımdan önceki sürüm.
+
+Model tarafındaki ilk parse mantığının ORM'siz birebir karşılığıdır
+(``.//cbc:X`` aramaları, düz dict çıktı). Yalnızca ``test_ubl_parser``'da
+``lib.ubl_parser.parse_ubl`` çıktısıyla karşılaştırmak için tutulur;
+scheme haritaları canlı modülden alınır.
+"""
+import re
+from xml.etree import ElementTree as ET
+
+from guven_lib.izibiz_xml import local_name
+from guven_lib.ubl_parser import SCHEME_ID_MAP, SCHEME_NAME_MAP
+
+NS = {
+    'cac': 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2',
+    'cbc': 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2',
+}
+
+
+def parse_float(value):
+    """Finansal string → float. Türkçe format desteği (1.234,56)."""
+    if not value:
+        return 0.0
+    s = str(value).strip()
+    if ',' in s and '.' in s:
+        s = s.replace('.', '').replace(',', '.')
+    elif ',' in s:
+        s = s.replace(',', '.')
+    s = s.replace('₺', '').replace('TL', '').replace('$', '').strip()
+    try:
+        return float(s)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def get_text(elem, xpath):
+    """Namespace-aware XPath, fallback to local name."""
+    if elem is None:
+        return ''
+    found = elem.find(xpath, NS)
+    if found is not None and found.text:
+        return found.text.strip()
+    # Fallback: local name search
+    local = xpath.split(':')[-1] if ':' in xpath else xpath.lstrip('./')
+    for child in elem.iter():
+        if local_name(child.tag) == local and child.text:
+            return child.text.strip()
+    return ''
+
+
+def find_elem(parent, name):
+    """İlk ``name`` adlı torun (parent dahil, derinlik öncelikli)."""
+    if parent is None:
+        return None
+    for child in parent.iter():
+        if local_name(child.tag) == name:
+            return child
+    return None
+
+
+def find_all_elems(parent, name):
+    """Doğrudan ``name`` adlı çocuklar."""
+    if parent is None:
+        return []
+    return [child for child in parent if local_name(child.tag) == name]
+
+
+def resolve_tax_type(subtotal_elem, unknown=None):
+    """TaxSubtotal → tax_type çözümleme (scheme ID + name fallback + fuzzy).
+
+    Eşlenemeyen (ID, Name) çiftleri ``unknown`` listesine eklenir.
+    """
+    # TaxScheme elementini bul
+    scheme = find_elem(subtotal_elem, 'TaxScheme')
+    if scheme is None:
+        return False
+
+    # Scheme ID: doğrudan children arasında 'ID' ara
+    scheme_id = ''
+    scheme_name = ''
+    for child in scheme:
+        child_tag = local_name(child.tag)
+        if child_tag == 'ID' and child.text:
+            scheme_id = child.text.strip()
+        elif child_tag == 'Name' and child.text:
+            scheme_name = child.text.strip().upper()
+
+    # 1. Scheme ID ile exact match
+    if scheme_id in SCHEME_ID_MAP:
+        return SCHEME_ID_MAP[scheme_id]
+    # 2. Scheme Name ile exact match
+    if scheme_name in SCHEME_NAME_MAP:
+        return SCHEME_NAME_MAP[scheme_name]
+    # 3. Parantez içeriğini kaldırıp tekrar dene
+    cleaned = re.sub(r'\s*\(.*?\)', '', scheme_name).strip()
+    if cleaned and cleaned in SCHEME_NAME_MAP:
+        return SCHEME_NAME_MAP[cleaned]
+    # 4. Oran bilgisini kaldırıp tekrar dene ("%20" gibi)
+    cleaned2 = re.sub(r'\s*%\d+', '', cleaned).strip()
+    if cleaned2 and cleaned2 in SCHEME_NAME_MAP:
+        return SCHEME_NAME_MAP[cleaned2]
+    # 5. İçinde KDV/KATMA geçiyorsa kdv kabul et
+    if 'KDV' in scheme_name or 'KATMA' in scheme_name:
+        return 'kdv'
+
+    if (scheme_id or scheme_name) and unknown is not None:
+        unknown.append((scheme_id, scheme_name))
+    return 'diger'
+
+
+def _subtotals(total_elem, tax_type=None, unknown=None):
+    """TaxTotal / WithholdingTaxTotal altındaki TaxSubtotal'lar → dict listesi.
+
+    ``tax_type`` verilirse (örn. withholding) scheme çözümlemesi yapılmaz.
+    """
+    result = []
+    for subtotal in find_all_elems(total_elem, 'TaxSubtotal'):
+        result.append({
+            'tax_type': tax_type or resolve_tax_type(subtotal, unknown),
+            'taxable_amount': parse_float(get_text(subtotal, './/cbc:TaxableAmount')),
+            'tax_amount': parse_float(get_text(subtotal, './/cbc:TaxAmount')),
+            'percent': parse_float(get_text(subtotal, './/cbc:Percent')),
+        })
+    return result
+
+
+def parse_ubl(ubl_xml_bytes):
+    """UBL XML bytes → düz dict.
+
+    Returns:
+        dict: {
+            'header': {issue_time, currency_code, exchange_rate,
+                       tax_exclusive_amount, ...} (yalnızca XML'de olanlar),
+            'notes': [{note_type, value, sequence}],
+            'lines': [{line_no, item_name, quantity, line_extension_amount,
+                       allowance_amount, taxes: [...], withholdings: [...]}],
+            'taxes': [belge seviyesi TaxTotal subtotal'ları],
+            'withholdings': [belge seviyesi WithholdingTaxTotal subtotal'ları],
+            'unknown_schemes': [(scheme_id, scheme_name)],
+        }
+    """
+    root = ET.fromstring(ubl_xml_bytes)
+    unknown = []
+    header = {}
+
+    # --- Issue Time ---
+    issue_time = get_text(root, './/cbc:IssueTime')
+    if issue_time:
+        header['issue_time'] = issue_time[:8]  # HH:MM:SS
+
+    # --- Currency ---
+    currency = get_text(root, './/cbc:DocumentCurrencyCode')
+    if currency:
+        header['currency_code'] = currency
+
+    # --- Exchange Rate (PricingExchangeRate) ---
+    pricing_er = find_elem(root, 'PricingExchangeRate')
+    if pricing_er is not None:
+        rate_text = get_text(pricing_er, './/cbc:CalculationRate')
+        if rate_text:
+            exchange_rate = parse_float(rate_text)
+            if exchange_rate > 0:
+                header['exchange_rate'] = exchange_rate
+
+    # --- Toplam Tutarlar ---
+    legal_total = find_elem(root, 'LegalMonetaryTotal')
+    if legal_total is not None:
+        for xml_f, odoo_f in (
+            ('TaxExclusiveAmount', 'tax_exclusive_amount'),
+            ('TaxInclusiveAmount', 'tax_inclusive_amount'),
+            ('PayableAmount', 'payable_amount'),
+            ('AllowanceTotalAmount', 'allowance_total_amount'),
+        ):
+            v = get_text(legal_total, f'.//cbc:{xml_f}')
+            if v:
+                header[odoo_f] = parse_float(v)
+
+    # --- Notlar ---
+    notes = []
+    for seq, note_elem in enumerate(find_all_elems(root, 'Note'), 1):
+        text = note_elem.text.strip() if note_elem.text else ''
+        if text:
+            notes.append({
+                'note_type': 'hashtag' if text.startswith('#') else 'free_text',
+                'value': text,
+                'sequence': seq * 10,
+            })
+
+    # --- Fatura Kalemleri ---
+    lines = []
+    for line_no, line_elem in enumerate(find_all_elems(root, 'InvoiceLine'), 1):
+        item = find_elem(line_elem, 'Item')
+        item_name = get_text(item, './/cbc:Name') if item is not None else ''
+        if not item_name and item is not None:
+            item_name = get_text(item, './/cbc:Description')
+
+        qty_elem = find_elem(line_elem, 'InvoicedQuantity')
+        quantity = parse_float(qty_elem.text) if qty_elem is not None and qty_elem.text else 1.0
+
+        # Satır indirimi (AllowanceCharge)
+        allowance = 0.0
+        ac = find_elem(line_elem, 'AllowanceCharge')
+        if ac is not None:
+            allowance = parse_float(get_text(ac, './/cbc:Amount'))
+
+        tax_total = find_elem(line_elem, 'TaxTotal')
+        wh_tax_total = find_elem(line_elem, 'WithholdingTaxTotal')
+        lines.append({
+            'line_no': line_no,
+            'item_name': item_name,
+            'quantity': quantity,
+            'line_extension_amount': parse_float(
+                get_text(line_elem, './/cbc:LineExtensionAmount')
+            ),
+            'allowance_amount': allowance,
+            'taxes': (
+                _subtotals(tax_total, unknown=unknown)
+                if tax_total is not None else []
+            ),
+            'withholdings': (
+                _subtotals(wh_tax_total, tax_type='withholding')
+                if wh_tax_total is not None else []
+            ),
+        })
+
+    # --- Fatura Seviyesi Vergiler / Tevkifat ---
+    # Hangisinin kullanılacağına (satır vergisi yoksa) model karar verir.
+    taxes = []
+    for tax_total in find_all_elems(root, 'TaxTotal'):
+        taxes.extend(_subtotals(tax_total, unknown=unknown))
+    withholdings = []
+    for wh_total in find_all_elems(root, 'WithholdingTaxTotal'):
+        withholdings.extend(_subtotals(wh_total, tax_type='withholding'))
+
+    return {
+        'header': header,
+        'notes': notes,
+        'lines': lines,
+        'taxes': taxes,
+        'withholdings': withholdings,
+        'unknown_schemes': unknown,
+    }
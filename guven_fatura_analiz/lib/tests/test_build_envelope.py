@@ -0,0 +1,107 @@
+"""``lib.izibiz_raw.build_envelope`` ve zarf fault tespiti."""
+from datetime import date, datetime
+from xml.etree import ElementTree as ET
+
+import pytest
+
+pytest.importorskip('requests')
+
+from guven_lib import izibiz_raw  # noqa: E402
+
+SERVICE_NS = 'http://schemas.i2i.com/ei/wsdl'
+ENTITY_NS = 'http://schemas.i2i.com/ei/entity'
+
+PLAN = {
+    'version': 1,
+    'endpoint': 'https://efaturatest.izibiz.com.tr/EInvoiceWS',
+    'soap_version': '1.1',
+    'operations': {
+        'GetInvoice': {'element': [SERVICE_NS, 'GetInvoiceRequest'], 'action': ''},
+        'GetEArchiveInvoiceList': {'element': [SERVICE_NS, 'GetEArchiveInvoiceListRequest'], 'action': ''},
+        'Logout': {'element': [SERVICE_NS, 'LogoutRequest'], 'action': ''},
+    },
+    'elements': {
+        'REQUEST_HEADER': ['', 'REQUEST_HEADERType'],
+        'SESSION_ID': ['', 'string'],
+        'INVOICE_SEARCH_KEY': ['', ''],
+        'LIMIT': ['', 'int'],
+        'START_DATE': ['', 'dateTime'],
+        'END_DATE': ['', 'date'],
+        'DIRECTION': ['', 'string'],
+        'HEADER_ONLY': ['', 'string'],
+        'READ_INCLUDED': ['', 'boolean'],
+        'CREATE_START_DATE': [ENTITY_NS, 'dateTime'],
+        'PROFILE': None,
+    },
+}
+
+
+def _request(envelope):
+    root = ET.fromstring(envelope)
+    assert root.tag == f'{{{izibiz_raw.SOAP11_ENV}}}Envelope'
+    body = root.find(f'{{{izibiz_raw.SOAP11_ENV}}}Body')
+    return body[0]
+
+
+def test_template_order_and_nesting():
+    request = _request(izibiz_raw.build_envelope(PLAN, 'GetInvoice', {
+        'HEADER_ONLY': 'Y',
+        'INVOICE_SEARCH_KEY': {'LIMIT': 5, 'DIRECTION': 'IN'},
+        'REQUEST_HEADER': {'SESSION_ID': 'abc'},
+    }))
+    assert request.tag == f'{{{SERVICE_NS}}}GetInvoiceRequest'
+    assert [child.tag for child in request] == ['REQUEST_HEADER', 'INVOICE_SEARCH_KEY', 'HEADER_ONLY']
+    assert request.findtext('REQUEST_HEADER/SESSION_ID') == 'abc'
+    assert request.findtext('INVOICE_SEARCH_KEY/LIMIT') == '5'
+
+
+def test_dates_follow_schema_type_and_namespace():
+    request = _request(izibiz_raw.build_envelope(PLAN, 'GetEArchiveInvoiceList', {
+        'REQUEST_HEADER': {'SESSION_ID': 'abc'},
+        'START_DATE': date(2025, 3, 1),
+        'END_DATE': datetime(2025, 3, 31, 23, 59, 59),
+        'READ_INCLUDED': True,
+        'LIMIT': None,
+    }))
+    assert request.findtext('START_DATE') == '2025-03-01T00:00:00'
+    assert request.findtext('END_DATE') == '2025-03-31'
+    assert request.findtext('READ_INCLUDED') == 'true'
+    assert request.find('LIMIT') is None
+
+    request = _request(izibiz_raw.build_envelope(PLAN, 'GetInvoice', {
+        'INVOICE_SEARCH_KEY': {'CREATE_START_DATE': datetime(2025, 3, 1, 12, 30)},
+    }))
+    assert request.findtext(f'INVOICE_SEARCH_KEY/{{{ENTITY_NS}}}CREATE_START_DATE') == '2025-03-01T12:30:00'
+
+
+@pytest.mark.parametrize('operation, kwargs', [
+    ('ReadFromArchive', {'INVOICEID': 'x'}),          # planda yok
+    ('GetTurnoverReport', {}),                        # şablonda yok
+    ('Logout', {'USER_NAME': 'x'}),                   # şablonda olmayan alan
+    ('GetInvoice', {'INVOICE_SEARCH_KEY': {'PROFILE': 'x'}}),          # belirsiz element
+    ('GetInvoice', {'INVOICE_SEARCH_KEY': {'UNKNOWN_DATE': date.today()}}),  # tipi bilinmeyen tarih
+])
+def test_unsupported(operation, kwargs):
+    with pytest.raises(izibiz_raw.UnsupportedOperation):
+        izibiz_raw.build_envelope(PLAN, operation, kwargs)
+
+
+def test_soap12_envelope():
+    plan = dict(PLAN, soap_version='1.2')
+    root = ET.fromstring(izibiz_raw.build_envelope(plan, 'Logout', {'REQUEST_HEADER': {'SESSION_ID': 'x'}}))
+    assert root.tag == f'{{{izibiz_raw.SOAP12_ENV}}}Envelope'
+
+
+def _fault(body):
+    return f'<Envelope><Body><Fault>{body}</Fault></Body></Envelope>'.encode()
+
+
+@pytest.mark.parametrize('content, expected', [
+    (_fault('<faultstring>Unmarshalling Error: unexpected element (uri:"", local:"X")</faultstring>'), True),
+    (_fault('<faultstring>cvc-complex-type.2.4.a: Invalid content</faultstring>'), True),
+    (_fault('<faultstring>Unmarshalling Error</faultstring><detail><ERROR_CODE>10005</ERROR_CODE></detail>'), False),
+    (_fault('<faultstring>Fatura bulunamadi</faultstring>'), False),
+    (b'<html>502 Bad Gateway', False),
+])
+def test_is_envelope_fault(content, expected):
+    assert izibiz_raw.is_envelope_fault(content) is expected
@@ -0,0 +1,98 @@
+"""``extract_content`` (streaming) ↔ ``find_content_text`` + ``decode_content`` eşitliği."""
+import base64
+import io
+import zipfile
+from xml.etree import ElementTree as ET
+
+import pytest
+
+from guven_lib.izibiz_xml import decode_content, extract_content, find_content_text, read_ubl_payload
+from ubl_samples import SAMPLES
+
+UBL = SAMPLES['temel_try']()
+
+
+def _zipped(data, name='fatura.xml'):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('__MACOSX/._fatura.xml', b'junk')
+        zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def _b64(data, wrap=None):
+    text = base64.b64encode(data).decode()
+    if wrap:
+        text = '\n'.join(text[i:i + wrap] for i in range(0, len(text), wrap))
+    return text
+
+
+def _response(body):
+    return (
+        '<S:Envelope xmlns:S="http://schemas.xmlsoap.org/soap/envelope/"><S:Body>'
+        f'<ns2:GetInvoiceResponse xmlns:ns2="http://schemas.i2i.com/ei/wsdl">{body}'
+        '</ns2:GetInvoiceResponse></S:Body></S:Envelope>'
+    ).encode()
+
+
+def _streaming(response):
+    payload = extract_content(io.BytesIO(response))
+    try:
+        return read_ubl_payload(payload.file) if payload.file else None
+    finally:
+        payload.close()
+
+
+def _tree(response):
+    text = find_content_text(ET.fromstring(response))
+    return decode_content(text) if text else None
+
+
+CASES = {
+    'zip': _response(f'<INVOICE ID="1"><HEADER/><CONTENT>{_b64(_zipped(UBL))}</CONTENT></INVOICE>'),
+    'satir_kirilimli': _response(f'<INVOICE><CONTENT>\n{_b64(UBL, wrap=76)}\n</CONTENT></INVOICE>'),
+    'nul_karakterli': _response('<CONTENT>%s</CONTENT>' % _b64(UBL + bytes(2))),
+    'bozuk_kisa_aday': _response(
+        f'<INVOICE><DATA>a=bc</DATA><CONTENT>{_b64(_zipped(UBL))}</CONTENT></INVOICE>'
+    ),
+    'bozuk_aday_sonda': _response(
+        f'<INVOICE><CONTENT>{_b64(UBL)}</CONTENT><HTML_CONTENT>QQ=</HTML_CONTENT></INVOICE>'
+    ),
+    'icerik_yok': _response('<INVOICE><HEADER><UUID>x</UUID></HEADER></INVOICE>'),
+}
+
+
+@pytest.mark.parametrize('name', sorted(CASES))
+def test_parity_with_tree_path(name):
+    response = CASES[name]
+    assert _streaming(response) == _tree(response)
+
+
+def test_valid_payload_is_decoded():
+    assert _streaming(CASES['zip']) == UBL
+    assert _streaming(CASES['bozuk_kisa_aday']) == UBL
+
+
+@pytest.mark.parametrize('broken', [_b64(UBL) + 'A', 'QUJD' * 40 + 'a=bc'])
+def test_broken_winner_raises_like_tree_path(broken):
+    response = _response(f'<INVOICE><DATA>QUJD</DATA><CONTENT>{broken}</CONTENT></INVOICE>')
+    with pytest.raises(ValueError):
+        _tree(response)
+    with pytest.raises(ValueError):
+        _streaming(response)
+
+
+def test_longer_valid_candidate_replaces_broken_one():
+    response = _response(
+        f'<INVOICE><DATA>{"QUJD" * 3}a=bc</DATA><CONTENT>{_b64(UBL)}</CONTENT></INVOICE>'
+    )
+    assert _streaming(response) == _tree(response) == UBL
+
+
+def test_soap_error_code():
+    response = _response(
+        '<ERROR_TYPE><ERROR_CODE>10001</ERROR_CODE>'
+        '<ERROR_SHORT_DES>Fatura bulunamadi</ERROR_SHORT_DES></ERROR_TYPE>'
+    )
+    payload = extract_content(io.BytesIO(response))
+    assert (payload.error_code, payload.error_message, payload.file) == ('10001', 'Fatura bulunamadi', None)
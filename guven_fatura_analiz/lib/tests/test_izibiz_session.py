@@ -0,0 +1,50 @@
+"""``lib.izibiz_session.IzibizSession``: REQUEST_HEADER ve oturum yenileme."""
+import pytest
+
+pytest.importorskip('requests')
+
+from guven_lib.izibiz_session import IzibizSession  # noqa: E402
+
+
+class FakeResponse:
+
+    def __init__(self, status_code=200, content=b'<ok/>'):
+        self.status_code = status_code
+        self.content = content
+
+
+class FakeTransport:
+
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.calls = []
+        self.logins = 0
+
+    def login(self, request_header, username, password):
+        self.logins += 1
+        return f'session-{self.logins}'
+
+    def call(self, operation, **kwargs):
+        self.calls.append((operation, kwargs['REQUEST_HEADER']))
+        return self.responses.pop(0) if self.responses else FakeResponse()
+
+
+def _session(transport, compressed=True):
+    return IzibizSession(transport, lambda: transport, 'kullanici', 'sifre', 3600, compressed=compressed)
+
+
+@pytest.mark.parametrize('compressed, content, expected', [
+    (True, True, 'Y'), (True, False, 'N'), (False, True, 'N'),
+])
+def test_compressed_only_for_content_downloads(compressed, content, expected):
+    transport = FakeTransport()
+    _session(transport, compressed).call('GetInvoice', content=content, HEADER_ONLY='N')
+    assert transport.calls[0][1]['COMPRESSED'] == expected
+
+
+def test_session_error_relogins_once():
+    fault = FakeResponse(500, b'<Fault><faultstring>Gecersiz SESSION</faultstring></Fault>')
+    transport = FakeTransport([fault, FakeResponse()])
+    response = _session(transport).call('GetInvoiceStatusAll', UUID=['x'])
+    assert response.status_code == 200
+    assert [header['SESSION_ID'] for _op, header in transport.calls] == ['session-1', 'session-2']
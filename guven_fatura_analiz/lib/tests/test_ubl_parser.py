@@ -0,0 +1,99 @@
+"""``lib.ubl_parser.parse_ubl`` ↔ referans parser eşitliği ve uç durumlar."""
+import dataclasses
+import gzip
+
+import pytest
+
+import reference_ubl_parser
+from guven_lib import ubl_parser
+from ubl_samples import SAMPLES, _invoice, _line, _subtotal, _tax_total
+
+
+def _tax(tax):
+    # scheme_id / scheme_name referansta yok (öğrenilmiş eşleştirme için eklendi)
+    return {
+        'tax_type': tax.tax_type,
+        'taxable_amount': tax.taxable_amount,
+        'tax_amount': tax.tax_amount,
+        'percent': tax.percent,
+    }
+
+
+def as_reference(parsed):
+    """``ParsedInvoice`` → referans parser'ın dict biçimi."""
+    return {
+        'header': parsed.header.as_vals(),
+        'notes': [dataclasses.asdict(note) for note in parsed.notes],
+        'lines': [{
+            'line_no': line.line_no,
+            'item_name': line.item_name,
+            'quantity': line.quantity,
+            'line_extension_amount': line.line_extension_amount,
+            'allowance_amount': line.allowance_amount,
+            'taxes': [_tax(tax) for tax in line.taxes],
+            'withholdings': [_tax(tax) for tax in line.withholdings],
+        } for line in parsed.lines],
+        'taxes': [_tax(tax) for tax in parsed.taxes],
+        'withholdings': [_tax(tax) for tax in parsed.withholdings],
+        'unknown_schemes': list(parsed.unknown_schemes),
+    }
+
+
+@pytest.mark.parametrize('name', sorted(SAMPLES))
+def test_parity_with_reference(name):
+    data = SAMPLES[name]()
+    assert as_reference(ubl_parser.parse_ubl(data)) == reference_ubl_parser.parse_ubl(data)
+
+
+def test_sample_values():
+    parsed = ubl_parser.parse_ubl(SAMPLES['doviz_kur']())
+    assert parsed.header.currency_code == 'USD'
+    assert parsed.header.exchange_rate == pytest.approx(36.4512)
+    assert parsed.header.tax_exclusive_amount == pytest.approx(1234.56)
+    assert parsed.lines[0].quantity == pytest.approx(1.5)
+    assert [t.tax_type for t in parsed.lines[0].taxes] == ['kdv']
+    assert [t.tax_type for t in parsed.lines[0].withholdings] == ['withholding']
+
+
+def test_unknown_schemes_and_missing_scheme():
+    parsed = ubl_parser.parse_ubl(SAMPLES['bilinmeyen_scheme']())
+    types = [[t.tax_type for t in line.taxes] for line in parsed.lines]
+    assert types == [['kdv', 'diger', 'kdv'], ['kdv', False, 'diger']]
+    assert parsed.unknown_schemes == [('9077', 'ÖTV 1.LİSTE'), ('XYZ', 'YEREL HARÇ')]
+    # Öğrenilmiş eşleştirme için scheme bilgisi taşınır
+    assert (parsed.lines[0].taxes[1].scheme_id, parsed.lines[0].taxes[1].scheme_name) == \
+        ('9077', 'ÖTV 1.LİSTE')
+
+
+def test_scheme_name_whitespace_is_normalized():
+    # Bilinçli fark: referans yalnızca strip().upper() yapıyordu
+    data = _invoice(_line(1, name='X', taxes=_tax_total(
+        _subtotal('10', '1', 10, None, '  yerel   harç '),
+    )))
+    assert ubl_parser.parse_ubl(data).unknown_schemes == [('', 'YEREL HARÇ')]
+
+
+def test_missing_fields_defaults():
+    parsed = ubl_parser.parse_ubl(SAMPLES['eksik_alanlar']())
+    assert parsed.header.as_vals() == {}
+    assert [(l.item_name, l.quantity, l.line_extension_amount) for l in parsed.lines] == [
+        ('Yalnızca açıklama', 1.0, 10.0), ('', 1.0, 0.0),
+    ]
+
+
+def test_parse_ubl_gz():
+    data = SAMPLES['temel_try']()
+    key, parsed, error = ubl_parser.parse_ubl_gz((7, gzip.compress(data)))
+    assert (key, error) == (7, None)
+    assert as_reference(parsed) == reference_ubl_parser.parse_ubl(data)
+
+    key, parsed, error = ubl_parser.parse_ubl_gz((8, b'not gzip'))
+    assert key == 8 and parsed is None and error
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1.234,56', 1234.56), ('1234.56', 1234.56), ('12,5', 12.5),
+    ('100 TL', 100.0), ('₺7', 7.0), ('', 0.0), (None, 0.0), ('abc', 0.0),
+])
+def test_parse_float(value, expected):
+    assert ubl_parser.parse_float(value) == pytest.approx(expected)
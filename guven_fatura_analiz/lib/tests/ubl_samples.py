@@ -0,0 +1,178 @@
+"""Parser testleri için sentetik UBL-TR örnekleri.
+
+Her örnek, canlıda karşılaşılan bir yapıyı (döviz + kur, yalnızca belge
+seviyesi vergi, bilinmeyen scheme, eksik alanlar, çok satırlı eczane
+faturası) küçük bir belgeyle temsil eder.
+"""
+import importlib.util
+import os
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+INVOICE_NS = 'urn:oasis:names:specification:ubl:schema:xsd:Invoice-2'
+CAC = 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2'
+CBC = 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2'
+
+
+def _invoice(*parts):
+    return (
+        f'<Invoice xmlns="{INVOICE_NS}" xmlns:cac="{CAC}" xmlns:cbc="{CBC}">'
+        + ''.join(parts)
+        + '</Invoice>'
+    ).encode('utf-8')
+
+
+def _subtotal(taxable, amount, percent=None, scheme_id=None, scheme_name=None, scheme=True):
+    percent_xml = f'<cbc:Percent>{percent}</cbc:Percent>' if percent is not None else ''
+    scheme_xml = ''
+    if scheme:
+        scheme_xml = (
+            '<cac:TaxCategory><cac:TaxScheme>'
+            + (f'<cbc:ID>{scheme_id}</cbc:ID>' if scheme_id else '')
+            + (f'<cbc:Name>{scheme_name}</cbc:Name>' if scheme_name else '')
+            + '</cac:TaxScheme></cac:TaxCategory>'
+        )
+    return (
+        f'<cac:TaxSubtotal><cbc:TaxableAmount currencyID="TRY">{taxable}</cbc:TaxableAmount>'
+        f'<cbc:TaxAmount currencyID="TRY">{amount}</cbc:TaxAmount>{percent_xml}{scheme_xml}'
+        f'</cac:TaxSubtotal>'
+    )
+
+
+def _tax_total(*subtotals, tag='TaxTotal'):
+    return f'<cac:{tag}><cbc:TaxAmount>0</cbc:TaxAmount>{"".join(subtotals)}</cac:{tag}>'
+
+
+def _line(line_id, name='', description='', quantity='1', amount='100.00',
+          allowance=None, taxes='', withholdings=''):
+    qty_xml = f'<cbc:InvoicedQuantity unitCode="C62">{quantity}</cbc:InvoicedQuantity>' \
+        if quantity is not None else ''
+    allowance_xml = (
+        '<cac:AllowanceCharge><cbc:ChargeIndicator>false</cbc:ChargeIndicator>'
+        f'<cbc:Amount>{allowance}</cbc:Amount></cac:AllowanceCharge>'
+        if allowance is not None else ''
+    )
+    item_xml = (
+        '<cac:Item>'
+        + (f'<cbc:Description>{description}</cbc:Description>' if description else '')
+        + (f'<cbc:Name>{name}</cbc:Name>' if name else '')
+        + '</cac:Item>'
+    )
+    return (
+        f'<cac:InvoiceLine><cbc:ID>{line_id}</cbc:ID>{qty_xml}'
+        f'<cbc:LineExtensionAmount currencyID="TRY">{amount}</cbc:LineExtensionAmount>'
+        f'{allowance_xml}{taxes}{withholdings}{item_xml}</cac:InvoiceLine>'
+    )
+
+
+def _legal_total(exclusive, inclusive, payable, allowance=None):
+    return (
+        '<cac:LegalMonetaryTotal>'
+        f'<cbc:TaxExclusiveAmount>{exclusive}</cbc:TaxExclusiveAmount>'
+        f'<cbc:TaxInclusiveAmount>{inclusive}</cbc:TaxInclusiveAmount>'
+        + (f'<cbc:AllowanceTotalAmount>{allowance}</cbc:AllowanceTotalAmount>'
+           if allowance is not None else '')
+        + f'<cbc:PayableAmount>{payable}</cbc:PayableAmount>'
+        '</cac:LegalMonetaryTotal>'
+    )
+
+
+def temel_try():
+    """TRY, satır seviyesi KDV, satır iskontosu, hashtag + serbest not."""
+    return _invoice(
+        '<cbc:ProfileID>TEMELFATURA</cbc:ProfileID>',
+        '<cbc:IssueDate>2025-03-01</cbc:IssueDate>',
+        '<cbc:IssueTime>09:15:42.0000000+03:00</cbc:IssueTime>',
+        '<cbc:Note>#SIPARIS-42</cbc:Note>',
+        '<cbc:Note>  </cbc:Note>',
+        '<cbc:Note>Yalnız iki yüz yirmi Türk Lirası</cbc:Note>',
+        '<cbc:DocumentCurrencyCode>TRY</cbc:DocumentCurrencyCode>',
+        _tax_total(_subtotal('200.00', '20.00', 10, '0015', 'KDV')),
+        _legal_total('200.00', '220.00', '220.00', allowance='5.00'),
+        _line(1, name='Kalem A', quantity='2', amount='100.00', allowance='5.00',
+              taxes=_tax_total(_subtotal('100.00', '10.00', 10, '0015', 'KDV'))),
+        _line(2, name='Kalem B', quantity='1', amount='100.00',
+              taxes=_tax_total(_subtotal('100.00', '10.00', 10, '0015', 'KDV'))),
+    )
+
+
+def doviz_kur():
+    """USD, PricingExchangeRate, Türkçe sayı biçimi, satır tevkifatı."""
+    return _invoice(
+        '<cbc:ProfileID>TICARIFATURA</cbc:ProfileID>',
+        '<cbc:IssueTime>23:59:59</cbc:IssueTime>',
+        '<cbc:DocumentCurrencyCode>USD</cbc:DocumentCurrencyCode>',
+        '<cac:PricingExchangeRate><cbc:SourceCurrencyCode>USD</cbc:SourceCurrencyCode>'
+        '<cbc:CalculationRate>36,4512</cbc:CalculationRate></cac:PricingExchangeRate>',
+        _legal_total('1.234,56', '1.481,47', '1.407,40'),
+        _line(1, name='Danışmanlık', quantity='1,5', amount='1.234,56',
+              taxes=_tax_total(_subtotal('1.234,56', '246,91', 20, None, 'kdv hesaplanan')),
+              withholdings=_tax_total(
+                  _subtotal('246,91', '74,07', 30, None, 'KDV TEVKİFAT'),
+                  tag='WithholdingTaxTotal',
+              )),
+    )
+
+
+def belge_seviyesi_vergi():
+    """Satırlarda vergi yok; vergi ve tevkifat yalnızca belge seviyesinde."""
+    return _invoice(
+        '<cbc:DocumentCurrencyCode>TRY</cbc:DocumentCurrencyCode>',
+        _tax_total(
+            _subtotal('1000.00', '200.00', 20, '0015', 'KDV'),
+            _subtotal('1000.00', '50.00', 5, None, 'BSMV'),
+            _subtotal('1000.00', '1.00', None, None, 'Damga Vergisi'),
+        ),
+        _tax_total(
+            _subtotal('200.00', '40.00', 20, '9015', 'TEVKIFAT'),
+            tag='WithholdingTaxTotal',
+        ),
+        _legal_total('1000.00', '1251.00', '1211.00'),
+        _line(1, name='Hizmet', amount='600.00'),
+        _line(2, name='Hizmet 2', amount='400.00'),
+    )
+
+
+def bilinmeyen_scheme():
+    """Eşlenemeyen scheme'ler, parantez/oranlı adlar, TaxScheme'siz subtotal."""
+    return _invoice(
+        '<cbc:DocumentCurrencyCode>TRY</cbc:DocumentCurrencyCode>',
+        _line(1, name='Yakıt', amount='500.00', taxes=_tax_total(
+            _subtotal('500.00', '100.00', 20, None, 'KDV (%20)'),
+            _subtotal('500.00', '25.00', 5, '9077', 'ÖTV 1.LİSTE'),
+            _subtotal('500.00', '3.00', 0.6, None, 'Katma Değer Vergisi %1'),
+        )),
+        _line(2, name='Kira', amount='300.00', taxes=_tax_total(
+            _subtotal('300.00', '60.00', 20, '0015', None),
+            _subtotal('300.00', '9.00', 3, None, None, scheme=False),
+            _subtotal('300.00', '1.00', 1, 'XYZ', 'Yerel Harç'),
+        )),
+    )
+
+
+def eksik_alanlar():
+    """Name'siz (Description'lı) kalem, miktarsız satır, toplam/kur/saat yok."""
+    return _invoice(
+        _line(1, description='Yalnızca açıklama', quantity=None, amount='10'),
+        _line(2, name='', description='', quantity='', amount=''),
+        '<cbc:Note>#SON</cbc:Note>',
+    )
+
+
+def eczane(n_lines=60):
+    """``scripts/bench_ubl_parser.py``'deki çok satırlı eczane faturası."""
+    path = os.path.join(ADDON_DIR, 'scripts', 'bench_ubl_parser.py')
+    spec = importlib.util.spec_from_file_location('_guven_bench_script', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.build_pharmacy_invoice(n_lines)
+
+
+SAMPLES = {
+    'temel_try': temel_try,
+    'doviz_kur': doviz_kur,
+    'belge_seviyesi_vergi': belge_seviyesi_vergi,
+    'bilinmeyen_scheme': bilinmeyen_scheme,
+    'eksik_alanlar': eksik_alanlar,
+    'eczane': eczane,
+}
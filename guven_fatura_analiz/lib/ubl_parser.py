@@ -0,0 +1,470 @@
+"""UBL-TR fatura XML parser (saf Python — ORM'siz).
+
+``parse_ubl`` yalnızca XML bytes alır ve ``__slots__``'lu dataclass'lardan
+oluşan bir ``ParsedInvoice`` döndürür; Odoo env'e dokunmadığı için process
+havuzunda (toplu yeniden parse), benchmark'ta ve doğrulama scriptinde
+aynen kullanılabilir. Döviz → TRY çevrimi ve kayıt oluşturma model
+tarafında yapılır (bkz. ``guven.fatura._apply_parsed_ubl``).
+"""
+import functools
+import gzip
+import itertools
+import re
+from dataclasses import dataclass, field
+from xml.etree import ElementTree as ET
+
+from .izibiz_xml import local_name
+
+NS = {
+    'cac': 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2',
+    'cbc': 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2',
+}
+
+# TaxScheme ID → tax_type mapping
+SCHEME_ID_MAP = {
+    '0015': 'kdv',
+    '0003': 'kdv',       # Bazı implementasyonlarda kullanılır
+    '9015': 'withholding',
+    '4071': 'bsmv',
+    '0059': 'konaklama',
+    '0071': 'tuketim',
+}
+# TaxScheme Name fallback → tax_type
+SCHEME_NAME_MAP = {
+    # KDV varyasyonları
+    'KDV': 'kdv',
+    'KDV HESAPLANAN': 'kdv',
+    'KATMA DEGER VERGISI': 'kdv',
+    'KATMA DEĞER VERGISI': 'kdv',
+    'KATMA DEĞER VERGİSİ': 'kdv',
+    'GERÇEK USULDE KATMA DEĞER VERGİSİ': 'kdv',
+    'KDV-SATIŞLAR': 'kdv',
+    'KDV GERÇEK': 'kdv',
+    'KDV GERCEK': 'kdv',
+    'KDV VERGISI': 'kdv',
+    'KDV VERGİSİ': 'kdv',
+    'HESAPLANAN KDV': 'kdv',
+    'SATIŞ VERGISI': 'kdv',
+    'SATIŞ VERGİSİ': 'kdv',
+    'SATIŞ KDV': 'kdv',
+    # Tevkifat
+    'TEVKIFAT': 'withholding',
+    'KDV TEVKİFAT': 'withholding',
+    # BSMV
+    'BSMV': 'bsmv',
+    # Konaklama
+    'KONAKLAMA VERGISI': 'konaklama',
+    'KONAKLAMA VERGİSİ': 'konaklama',
+    # Tüketim
+    'ELK.HAVAGAZ.TÜK.VER.': 'tuketim',
+    'ELEKTRIK HAVAGAZI TUKETIM VERGISI': 'tuketim',
+    # Özel İletişim Vergisi (ÖİV)
+    'ÖZEL ILETISIM VERGISI': 'oiv',
+    'ÖZEL İLETİŞİM VERGİSİ': 'oiv',
+    'ÖİV': 'oiv',
+    'OIV': 'oiv',
+    'ÖZEL İLETIŞIM VERGISI': 'oiv',
+    'Ö.ILETISIM V': 'oiv',
+    # Damga Vergisi
+    'DAMGA VERGISI': 'damga',
+    'DAMGA VERGİSİ': 'damga',
+}
+
+# Scheme Name temizleme: parantez içi ve oran ("%20") ifadeleri
+_PAREN_RE = re.compile(r'\s*\(.*?\)')
+_PERCENT_RE = re.compile(r'\s*%\d+')
+
+# LegalMonetaryTotal etiketi → ParsedHeader alanı
+_LEGAL_TOTAL_FIELDS = (
+    ('TaxExclusiveAmount', 'tax_exclusive_amount'),
+    ('TaxInclusiveAmount', 'tax_inclusive_amount'),
+    ('PayableAmount', 'payable_amount'),
+    ('AllowanceTotalAmount', 'allowance_total_amount'),
+)
+
+
+@dataclass(slots=True)
+class ParsedHeader:
+    """Belge seviyesi değerler; XML'de olmayanlar None."""
+    issue_time: str = None
+    currency_code: str = None
+    exchange_rate: float = None
+    tax_exclusive_amount: float = None
+    tax_inclusive_amount: float = None
+    payable_amount: float = None
+    allowance_total_amount: float = None
+
+    def as_vals(self):
+        """None olmayan alanlar → write() vals dict'i."""
+        return {
+            name: getattr(self, name) for name in self.__slots__
+            if getattr(self, name) is not None
+        }
+
+
+@dataclass(slots=True)
+class ParsedTax:
+    """TaxSubtotal (vergi veya tevkifat)."""
+    tax_type: str
+    taxable_amount: float
+    tax_amount: float
+    percent: float
+    scheme_id: str = ''
+    scheme_name: str = ''
+
+
+@dataclass(slots=True)
+class ParsedLine:
+    """InvoiceLine ve satır seviyesi vergi/tevkifatları."""
+    line_no: int
+    item_name: str
+    quantity: float
+    line_extension_amount: float
+    allowance_amount: float
+    taxes: list = field(default_factory=list)
+    withholdings: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class ParsedNote:
+    note_type: str
+    value: str
+    sequence: int
+
+
+@dataclass(slots=True)
+class ParsedInvoice:
+    """``parse_ubl`` sonucu.
+
+    ``taxes`` / ``withholdings`` belge seviyesi (root TaxTotal /
+    WithholdingTaxTotal) subtotal'larıdır; satır seviyesinde vergi varsa
+    hangisinin kullanılacağına model karar verir. ``unknown_schemes``
+    eşlenemeyen (scheme_id, scheme_name) çiftleridir.
+    """
+    header: ParsedHeader
+    notes: list
+    lines: list
+    taxes: list
+    withholdings: list
+    unknown_schemes: list
+
+    @property
+    def line_taxes(self):
+        return [tax for line in self.lines for tax in line.taxes]
+
+
+def parse_float(value):
+    """Finansal string → float. Türkçe format desteği (1.234,56)."""
+    if not value:
+        return 0.0
+    s = str(value).strip()
+    if ',' in s and '.' in s:
+        s = s.replace('.', '').replace(',', '.')
+    elif ',' in s:
+        s = s.replace(',', '.')
+    s = s.replace('₺', '').replace('TL', '').replace('$', '').strip()
+    try:
+        return float(s)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+# '{ns}Tag' → 'Tag' önbelleği (belgede az sayıda farklı etiket var)
+_LOCAL_NAMES = {}
+
+
+def _local(tag):
+    name = _LOCAL_NAMES.get(tag)
+    if name is None:
+        name = _LOCAL_NAMES[tag] = local_name(tag) if isinstance(tag, str) else ''
+    return name
+
+
+class Subtree:
+    """Bir alt ağacın tek geçişlik özeti.
+
+    Alt ağaç bir kez gezilir ve her local name için ilk eleman, ilk cbc
+    ad alanlı torun ve ilk metinli eleman kaydedilir. Sonraki "ilk X" /
+    "X'in metni" sorguları sözlük erişimidir; eksik elemanlar için
+    (AllowanceCharge, WithholdingTaxTotal vb.) alt ağaç tekrar taranmaz.
+    Böylece her eleman sabit sayıda ziyaret edilir ve parse maliyeti belge
+    boyutuyla lineer kalır.
+    """
+    __slots__ = ('first', 'cbc', 'texted')
+
+    def __init__(self, root, skip=None):
+        """``skip``: bu local name'li doğrudan çocukların alt ağaçları atlanır."""
+        first = {}
+        cbc = {}
+        texted = {}
+        cbc_prefix = f"{{{NS['cbc']}}}"
+        names = _LOCAL_NAMES
+        if skip is None:
+            elems = root.iter()
+        else:
+            elems = itertools.chain((root,), *(
+                child.iter() for child in root if _local(child.tag) != skip
+            ))
+        for elem in elems:
+            tag = elem.tag
+            name = names.get(tag) or _local(tag)
+            if name not in first:
+                first[name] = elem
+            if name not in texted and elem.text:
+                texted[name] = elem
+            if (name not in cbc and elem is not root
+                    and isinstance(tag, str) and tag.startswith(cbc_prefix)):
+                cbc[name] = elem
+        self.first = first
+        self.cbc = cbc
+        self.texted = texted
+
+    def find(self, name):
+        """İlk ``name`` adlı eleman (kök dahil, pre-order)."""
+        return self.first.get(name)
+
+    def text(self, name):
+        """``.//cbc:name`` metni; boşsa ad alanından bağımsız ilk metinli ``name``."""
+        elem = self.cbc.get(name)
+        if elem is not None and elem.text:
+            return elem.text.strip()
+        elem = self.texted.get(name)
+        return elem.text.strip() if elem is not None else ''
+
+
+class SubtreeChain:
+    """Belge sırasıyla ardışık ``Subtree`` özetleri üzerinde aynı arayüz.
+
+    Belge kökü için kullanılır: InvoiceLine dışındaki kısım ve her satırın
+    özeti ayrı ayrı tutulur (satırlar zaten tek tek özetlendiği için kök
+    geçişinde tekrar gezilmez). UBL'de InvoiceLine son eleman dizisi
+    olduğundan ilk parça her zaman satırlardan önce gelir.
+    """
+    __slots__ = ('parts',)
+
+    def __init__(self, parts):
+        self.parts = parts
+
+    def _first(self, attr, name):
+        for part in self.parts:
+            elem = getattr(part, attr).get(name)
+            if elem is not None:
+                return elem
+        return None
+
+    def find(self, name):
+        return self._first('first', name)
+
+    def text(self, name):
+        elem = self._first('cbc', name)
+        if elem is not None and elem.text:
+            return elem.text.strip()
+        elem = self._first('texted', name)
+        return elem.text.strip() if elem is not None else ''
+
+
+def find_all_elems(parent, name):
+    """Doğrudan ``name`` adlı çocuklar."""
+    if parent is None:
+        return []
+    return [child for child in parent if _local(child.tag) == name]
+
+
+def read_tax_scheme(subtotal):
+    """TaxSubtotal ``Subtree``'si → (scheme_id, scheme_name) ya da TaxScheme yoksa None."""
+    scheme = subtotal.find('TaxScheme')
+    if scheme is None:
+        return None
+
+    # Scheme ID: doğrudan children arasında 'ID' ara
+    scheme_id = ''
+    scheme_name = ''
+    for child in scheme:
+        child_tag = _local(child.tag)
+        if child_tag == 'ID' and child.text:
+            scheme_id = child.text.strip()
+        elif child_tag == 'Name' and child.text:
+            scheme_name = normalize_scheme_name(child.text)
+    return scheme_id, scheme_name
+
+
+def normalize_scheme_name(name):
+    """TaxScheme Name'i eşleştirme anahtarına çevir (büyük harf, tek boşluk)."""
+    return ' '.join((name or '').split()).upper()
+
+
+@functools.lru_cache(maxsize=1024)
+def resolve_scheme(scheme_id, scheme_name):
+    """(scheme_id, normalize edilmiş scheme_name) → tax_type; eşlenemezse None.
+
+    Sonuç process başına memoize edilir (scheme çeşitliliği azdır, aynı
+    çiftler her faturada tekrar eder).
+
+    Sıra: ID exact → Name exact → parantezsiz Name → oransız Name →
+    içinde KDV/KATMA geçen Name.
+    """
+    # 1. Scheme ID ile exact match
+    if scheme_id in SCHEME_ID_MAP:
+        return SCHEME_ID_MAP[scheme_id]
+    # 2. Scheme Name ile exact match
+    if scheme_name in SCHEME_NAME_MAP:
+        return SCHEME_NAME_MAP[scheme_name]
+    # 3. Parantez içeriğini kaldırıp tekrar dene
+    cleaned = _PAREN_RE.sub('', scheme_name).strip()
+    if cleaned and cleaned in SCHEME_NAME_MAP:
+        return SCHEME_NAME_MAP[cleaned]
+    # 4. Oran bilgisini kaldırıp tekrar dene ("%20" gibi)
+    cleaned2 = _PERCENT_RE.sub('', cleaned).strip()
+    if cleaned2 and cleaned2 in SCHEME_NAME_MAP:
+        return SCHEME_NAME_MAP[cleaned2]
+    # 5. İçinde KDV/KATMA geçiyorsa kdv kabul et
+    if 'KDV' in scheme_name or 'KATMA' in scheme_name:
+        return 'kdv'
+    return None
+
+
+def _subtotals(total_elem, unknown, withholding=False):
+    """TaxTotal / WithholdingTaxTotal altındaki TaxSubtotal'lar → ParsedTax listesi.
+
+    Tevkifat subtotal'ları scheme'den bağımsız ``withholding`` tipindedir.
+    Eşlenemeyen scheme'ler ``diger`` olur ve ``unknown``'a eklenir.
+    """
+    result = []
+    for subtotal_elem in find_all_elems(total_elem, 'TaxSubtotal'):
+        subtotal = Subtree(subtotal_elem)
+        scheme = read_tax_scheme(subtotal)
+        scheme_id, scheme_name = scheme or ('', '')
+        if withholding:
+            tax_type = 'withholding'
+        elif scheme is None:
+            tax_type = False
+        else:
+            tax_type = resolve_scheme(scheme_id, scheme_name)
+            if tax_type is None:
+                if scheme_id or scheme_name:
+                    unknown.append((scheme_id, scheme_name))
+                tax_type = 'diger'
+        result.append(ParsedTax(
+            tax_type=tax_type,
+            taxable_amount=parse_float(subtotal.text('TaxableAmount')),
+            tax_amount=parse_float(subtotal.text('TaxAmount')),
+            percent=parse_float(subtotal.text('Percent')),
+            scheme_id=scheme_id,
+            scheme_name=scheme_name,
+        ))
+    return result
+
+
+def parse_ubl(ubl_xml_bytes):
+    """UBL XML bytes → ``ParsedInvoice``."""
+    root = ET.fromstring(ubl_xml_bytes)
+    unknown = []
+
+    # --- Fatura Kalemleri ---
+    lines = []
+    line_trees = []
+    for line_no, line_elem in enumerate(find_all_elems(root, 'InvoiceLine'), 1):
+        line_tree = Subtree(line_elem)
+        line_trees.append(line_tree)
+
+        item_name = ''
+        item = line_tree.find('Item')
+        if item is not None:
+            item = Subtree(item)
+            item_name = item.text('Name') or item.text('Description')
+
+        qty_elem = line_tree.find('InvoicedQuantity')
+        quantity = parse_float(qty_elem.text) if qty_elem is not None and qty_elem.text else 1.0
+
+        # Satır indirimi (AllowanceCharge)
+        allowance = 0.0
+        ac = line_tree.find('AllowanceCharge')
+        if ac is not None:
+            allowance = parse_float(Subtree(ac).text('Amount'))
+
+        line = ParsedLine(
+            line_no=line_no,
+            item_name=item_name,
+            quantity=quantity,
+            line_extension_amount=parse_float(line_tree.text('LineExtensionAmount')),
+            allowance_amount=allowance,
+        )
+        tax_total = line_tree.find('TaxTotal')
+        if tax_total is not None:
+            line.taxes = _subtotals(tax_total, unknown)
+        wh_tax_total = line_tree.find('WithholdingTaxTotal')
+        if wh_tax_total is not None:
+            line.withholdings = _subtotals(wh_tax_total, unknown, withholding=True)
+        lines.append(line)
+
+    # Belge seviyesi aramalar: satır dışı kısım + (bulunamazsa) satırlar
+    doc = SubtreeChain([Subtree(root, skip='InvoiceLine')] + line_trees)
+    header = ParsedHeader()
+
+    # --- Issue Time ---
+    issue_time = doc.text('IssueTime')
+    if issue_time:
+        header.issue_time = issue_time[:8]  # HH:MM:SS
+
+    # --- Currency ---
+    currency = doc.text('DocumentCurrencyCode')
+    if currency:
+        header.currency_code = currency
+
+    # --- Exchange Rate (PricingExchangeRate) ---
+    pricing_er = doc.find('PricingExchangeRate')
+    if pricing_er is not None:
+        rate_text = Subtree(pricing_er).text('CalculationRate')
+        if rate_text:
+            exchange_rate = parse_float(rate_text)
+            if exchange_rate > 0:
+                header.exchange_rate = exchange_rate
+
+    # --- Toplam Tutarlar ---
+    legal_total = doc.find('LegalMonetaryTotal')
+    if legal_total is not None:
+        legal_total = Subtree(legal_total)
+        for xml_f, attr in _LEGAL_TOTAL_FIELDS:
+            v = legal_total.text(xml_f)
+            if v:
+                setattr(header, attr, parse_float(v))
+
+    # --- Notlar ---
+    notes = []
+    for seq, note_elem in enumerate(find_all_elems(root, 'Note'), 1):
+        text = note_elem.text.strip() if note_elem.text else ''
+        if text:
+            notes.append(ParsedNote(
+                note_type='hashtag' if text.startswith('#') else 'free_text',
+                value=text,
+                sequence=seq * 10,
+            ))
+
+    # --- Fatura Seviyesi Vergiler / Tevkifat ---
+    taxes = []
+    for tax_total in find_all_elems(root, 'TaxTotal'):
+        taxes.extend(_subtotals(tax_total, unknown))
+    withholdings = []
+    for wh_total in find_all_elems(root, 'WithholdingTaxTotal'):
+        withholdings.extend(_subtotals(wh_total, unknown, withholding=True))
+
+    return ParsedInvoice(
+        header=header,
+        notes=notes,
+        lines=lines,
+        taxes=taxes,
+        withholdings=withholdings,
+        unknown_schemes=unknown,
+    )
+
+
+def parse_ubl_gz(item):
+    """(anahtar, gzip'li UBL) → (anahtar, parse sonucu, hata metni).
+
+    Process havuzu için pickle edilebilir giriş noktası; hata fırlatmaz.
+    """
+    key, gz_bytes = item
+    try:
+        return key, parse_ubl(gzip.decompress(gz_bytes)), None
+    except Exception as e:
+        return key, None, f"{type(e).__name__}: {e}"
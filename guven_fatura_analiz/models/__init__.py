@@ -7,3 +7,4 @@ from . import guven_logo_donem
 from . import guven_logo_fatura
 from . import guven_gib_mukellef
 from . import guven_vergi_analiz
+from . import guven_tax_scheme_map
@@ -1,23 +1,52 @@
-import base64
-import io
+import contextlib
+import functools
+import gzip
+import hashlib
+import json
 import logging
-import re
+import multiprocessing
+import os
+import threading
 import time
-import zipfile
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from xml.etree import ElementTree as ET
-
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
 from markupsafe import Markup
 
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import UserError
 
+from ..lib.izibiz_client import HTTP_POOL_SIZE
+from ..lib.izibiz_raw import get_transport
+from ..lib.izibiz_download import (
+    ContentError,
+    download_earsiv_ubl,
+    download_efatura_ubl,
+    extract_ubl,
+    fetch_earsiv_headers,
+    fetch_earsiv_statuses,
+    fetch_efatura_headers,
+    fetch_efatura_statuses,
+    iter_concurrent,
+)
+from ..lib.izibiz_session import IzibizError, IzibizSession, get_session
+from ..lib.izibiz_xml import (
+    find_content_text,
+    header_dict,
+    iter_invoice_elements,
+    iter_invoice_headers,
+    open_response_stream,
+)
+from ..lib.ubl_parser import parse_float, parse_ubl, parse_ubl_gz
+
 _logger = logging.getLogger(__name__)
 
+# Bir detay/yeniden parse çalışması boyunca bilinmeyen TaxScheme sayacı
+# (thread başına; bkz. GuvenFatura._unknown_scheme_run)
+_parse_run = threading.local()
+
 
 PROFILE_ID_SELECTION = [
     ('TEMELFATURA', 'Temel Fatura'),
@@ -148,6 +177,43 @@ class GuvenFatura(models.Model):
         string='Detaylar Alındı', default=False, index=True,
         help='HEADER_ONLY=N ile XML detayları çekilip parse edildi mi?',
     )
+    ubl_sha256 = fields.Char(
+        string='UBL SHA-256', index=True, readonly=True, copy=False,
+        help='Arşivlenen UBL XML belgesinin SHA-256 özeti.',
+    )
+    ubl_attachment_id = fields.Many2one(
+        'ir.attachment', string='UBL Arşivi', readonly=True, copy=False,
+        ondelete='set null',
+        help='gzip sıkıştırılmış UBL XML (içerik adresli; aynı belge tek kez saklanır).',
+    )
+    header_hash = fields.Char(
+        string='Header Özeti', index=True, readonly=True, copy=False,
+        help='Son uygulanan SOAP header değerlerinin (normalize edilmiş) özeti. '
+             'Sync\'te özet aynıysa alan alan karşılaştırma yapılmaz.',
+    )
+    detail_lease_until = fields.Datetime(
+        string='Detay Kiralama Bitişi', readonly=True, copy=False,
+        help='Detay cron worker\'ı bu kaydı bu zamana kadar sahiplendi; '
+             'süre dolarsa başka bir worker alabilir.',
+    )
+    detail_attempts = fields.Integer(
+        string='Detay Deneme Sayısı', readonly=True, copy=False,
+        help='XML detayı art arda kaç kez indirilemedi/parse edilemedi.',
+    )
+    detail_next_try = fields.Datetime(
+        string='Sonraki Detay Denemesi', readonly=True, copy=False,
+        help='Başarısız denemeden sonra detay cron\'u bu kaydı bu zamandan '
+             'önce tekrar denemez (üstel bekleme).',
+    )
+    detail_dead = fields.Boolean(
+        string='Detay Alınamadı', readonly=True, copy=False, index=True,
+        help='Azami deneme sayısına ulaşıldı; detay cron\'u bu kaydı artık '
+             'denemez. Header değişirse veya "Detayı Yeniden Dene" ile tekrar '
+             'kuyruğa alınır.',
+    )
+    detail_last_error = fields.Char(
+        string='Son Detay Hatası', readonly=True, copy=False,
+    )
     harici_iptal = fields.Boolean(string='Harici İptal', default=False)
     is_locked = fields.Boolean(string='Kilitli', default=False)
     locked_by_id = fields.Many2one(
@@ -219,7 +285,14 @@ class GuvenFatura(models.Model):
     # --- Write Override (Kilit Koruması) ---
 
     def write(self, vals):
-        lock_fields = {'is_locked', 'locked_by_id', 'locked_date', 'lock_reason'}
+        # Kilit alanları, UBL arşiv referansı ve detay cron'larının
+        # kiralama/deneme kayıtları kilitli kayıtta da yazılabilir
+        lock_fields = {
+            'is_locked', 'locked_by_id', 'locked_date', 'lock_reason',
+            'ubl_sha256', 'ubl_attachment_id',
+            'detail_lease_until', 'detail_attempts', 'detail_next_try',
+            'detail_dead', 'detail_last_error',
+        }
         if not set(vals.keys()).issubset(lock_fields):
             locked = self.filtered('is_locked')
             if locked:
@@ -231,6 +304,20 @@ class GuvenFatura(models.Model):
                 )
         return super().write(vals)
 
+    def unlink(self):
+        # Paylaşılan UBL arşivi silinen faturaya bağlıysa (res_id) ORM onu da
+        # siler; eki hâlâ kullanan başka bir fatura varsa ona devredilir.
+        owned = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name), ('res_id', 'in', self.ids),
+        ])
+        for attachment in owned:
+            heir = self.sudo().search([
+                ('ubl_attachment_id', '=', attachment.id), ('id', 'not in', self.ids),
+            ], limit=1)
+            if heir:
+                attachment.write({'res_id': heir.id})
+        return super().unlink()
+
     # --- Kilitleme Aksiyonları ---
 
     def action_lock(self):
@@ -398,90 +485,78 @@ class GuvenFatura(models.Model):
     # SOAP HELPERS
     # ==================================================================
 
-    @api.model
-    def _get_soap_client_and_login(self, company=None):
-        """izibiz SOAP client oluştur ve login ol.
-
-        Returns:
-            tuple: (zeep_client, session_id, request_header_dict)
-        """
-        company = company or self.env.company
-        if not company.has_efatura_credentials():
-            raise UserError(
-                _("%s için E-Fatura kullanıcı bilgileri tanımlanmamış.") % company.name
-            )
-
-        from zeep import Client
-        from zeep.transports import Transport
-        from zeep import Settings
+    # 'raw' (varsayılan): şablonlu ham SOAP, zeep yalnızca yedek; 'zeep': her
+    # çağrı zeep ile (sistem parametresi)
+    _SOAP_TRANSPORT_PARAM = 'guven_fatura_analiz.soap_transport'
 
-        creds = company.get_efatura_credentials()
-
-        session = requests.Session()
-        retry = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
-        adapter = HTTPAdapter(pool_connections=5, pool_maxsize=5, max_retries=retry)
-        session.mount('https://', adapter)
-
-        transport = Transport(session=session, timeout=90)
-        settings = Settings(strict=False, xml_huge_tree=True)
-        client = Client(creds['ws_url'], transport=transport, settings=settings)
-
-        login_resp = client.service.Login(
-            REQUEST_HEADER={'SESSION_ID': '-1', 'APPLICATION_NAME': 'guven_fatura_analiz'},
-            USER_NAME=creds['username'],
-            PASSWORD=creds['password'],
-        )
-
-        # SESSION_ID attribute var ama None olabilir (login başarısız)
-        session_id = getattr(login_resp, 'SESSION_ID', None)
-        if not session_id:
-            error_msg = ''
-            error_type = getattr(login_resp, 'ERROR_TYPE', None)
-            if error_type:
-                error_code = getattr(error_type, 'ERROR_CODE', '')
-                error_desc = getattr(error_type, 'ERROR_SHORT_DES', '')
-                error_msg = f" (kod: {error_code}, {error_desc})"
-            raise UserError(
-                _("%s için izibiz login başarısız: SESSION_ID alınamadı.%s")
-                % (company.name, error_msg)
-            )
+    @api.model
+    def _wsdl_cache_dir(self):
+        """zeep WSDL/XSD ve ham SOAP planı disk cache dizini (data_dir altında)."""
+        return os.path.join(tools.config['data_dir'], 'guven_fatura_analiz')
 
-        request_header = {
-            'SESSION_ID': session_id,
-            'APPLICATION_NAME': 'guven_fatura_analiz',
-            'COMPRESSED': 'N',
+    @api.model
+    def _soap_transport_options(self):
+        """``get_transport`` seçenekleri (ORM'den bir kez okunur, düz değerler)."""
+        return {
+            'cache_dir': self._wsdl_cache_dir(),
+            'raw': self.env['ir.config_parameter'].sudo().get_param(
+                self._SOAP_TRANSPORT_PARAM, 'raw',
+            ) != 'zeep',
         }
 
-        return client, session_id, request_header
+    @api.model
+    def _get_soap_transport(self, wsdl_url):
+        """WSDL URL'i için process seviyesinde paylaşılan SOAP transport'u.
+
+        Varsayılan ham (şablonlu) transport WSDL'i derlemez; soğuk başlayan
+        worker yalnızca data_dir'deki planı okur. Şablonu olmayan çağrılarda
+        zeep client'ı gerektiğinde yüklenir.
+        """
+        return get_transport(wsdl_url, **self._soap_transport_options())
 
     @api.model
-    def _get_earsiv_soap_client(self, company=None):
-        """E-Arşiv SOAP client oluştur (login e-fatura WSDL üzerinden).
+    def _get_izibiz_session(self, company=None):
+        """Şirketin paylaşılan izibiz oturumunu döndür (gerekirse login olur).
+
+        Oturum process seviyesindeki havuzdan gelir ve şirketin
+        ``efatura_session_ttl`` süresi dolana ya da izibiz oturum hatası
+        dönene kadar tekrar kullanılır. Çağıranlar Logout yapmamalıdır.
 
         Returns:
-            tuple: (efatura_client, earsiv_client, session_id, request_header)
+            IzibizSession: ``call(operation, earsiv=False, **kwargs)`` ile
+            raw_response SOAP çağrısı yapar.
         """
         company = company or self.env.company
-        efatura_client, session_id, request_header = self._get_soap_client_and_login(company)
-
-        from zeep import Client
-        from zeep.transports import Transport
-        from zeep import Settings
+        if not company.has_efatura_credentials():
+            raise UserError(
+                _("%s için E-Fatura kullanıcı bilgileri tanımlanmamış.") % company.name
+            )
 
         creds = company.get_efatura_credentials()
         earsiv_ws = creds.get('earsiv_ws_url') or \
             'https://earsivws.izibiz.com.tr/EIArchiveWS/EFaturaArchive?wsdl'
-
-        session = requests.Session()
-        retry = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
-        adapter = HTTPAdapter(pool_connections=5, pool_maxsize=5, max_retries=retry)
-        session.mount('https://', adapter)
-
-        transport = Transport(session=session, timeout=90)
-        settings = Settings(strict=False, xml_huge_tree=True)
-        earsiv_client = Client(earsiv_ws, transport=transport, settings=settings)
-
-        return efatura_client, earsiv_client, session_id, request_header
+        ttl = (company.efatura_session_ttl or 20) * 60
+        # Oturum process havuzunda yaşar ve e-arşiv transport'u ilk kullanımda
+        # (başka bir istekte ya da worker thread'inde) kurulur: fabrika
+        # env/cursor taşımamalı, seçenekler burada okunur.
+        options = self._soap_transport_options()
+
+        session = get_session(
+            (self.env.cr.dbname, company.id),
+            (creds['ws_url'], earsiv_ws, creds['username'], creds['password'], ttl,
+             company.efatura_compressed, options['raw']),
+            lambda: IzibizSession(
+                get_transport(creds['ws_url'], **options),
+                functools.partial(get_transport, earsiv_ws, **options),
+                creds['username'], creds['password'], ttl,
+                compressed=company.efatura_compressed,
+            ),
+        )
+        try:
+            session.ensure()
+        except IzibizError as e:
+            raise UserError(_("%s için %s") % (company.name, e))
+        return session
 
     # ==================================================================
     # PARSE HELPERS
@@ -519,37 +594,72 @@ class GuvenFatura(models.Model):
         _logger.warning("[GUVEN-PARSE] Tarih parse edilemedi: %s", date_string)
         return None
 
-    @staticmethod
-    def _parse_float(value):
-        """Finansal string → float. Türkçe format desteği (1.234,56)."""
-        if not value:
-            return 0.0
-        s = str(value).strip()
-        if ',' in s and '.' in s:
-            s = s.replace('.', '').replace(',', '.')
-        elif ',' in s:
-            s = s.replace(',', '.')
-        s = s.replace('₺', '').replace('TL', '').replace('$', '').strip()
-        try:
-            return float(s)
-        except (ValueError, TypeError):
-            return 0.0
+    # Finansal string → float (Türkçe format desteği, bkz. lib.ubl_parser)
+    _parse_float = staticmethod(parse_float)
 
     # ==================================================================
     # HEADER COMPARE & UPDATE
     # ==================================================================
 
-    def _compare_and_update_header(self, existing, vals):
-        """Compare SOAP vals with existing record. Write only changed fields.
+    # Toplu upsert'te mevcut kayıtları yüklerken kullanılan UUID chunk boyutu
+    # (tek `uuid IN (...)` sorgusunun parametre sayısını sınırlar).
+    _UPSERT_CHUNK_SIZE = 5000
+
+    # Kimlik alanları: karşılaştırmaya ve header özetine girmez
+    _HEADER_IDENTITY_FIELDS = frozenset({'company_id', 'kaynak', 'direction', 'uuid'})
+
+    @api.model
+    def _header_hash(self, vals):
+        """SOAP header vals → normalize edilmiş değerlerin SHA-1 özeti.
+
+        None/boş string → False ve tarih → ISO normalizasyonu
+        ``_diff_header``'dakiyle aynıdır. Float'lar yuvarlanmaz: özet farklı
+        çıkıp tolerans içinde kalan değişiklikleri ``_diff_header`` eler,
+        ama gerçek bir değişiklik hiçbir zaman aynı özete düşmez.
+        """
+        from datetime import date as date_type
 
-        If any header field changed, also resets details_received so
-        the cron re-fetches and re-parses the full XML.
-        Caller must check is_locked before calling this method.
-        Returns True if the record was updated, False if nothing changed.
+        items = []
+        for key in sorted(vals):
+            if key in self._HEADER_IDENTITY_FIELDS:
+                continue
+            val = vals[key]
+            if val is None or val == '':
+                val = False
+            elif isinstance(val, float):
+                val = repr(val)
+            elif isinstance(val, date_type):
+                val = val.isoformat()
+            elif isinstance(val, str):
+                try:
+                    val = date_type.fromisoformat(val).isoformat()
+                except ValueError:
+                    pass
+            items.append((key, val))
+        return hashlib.sha1(
+            json.dumps(items, ensure_ascii=False, default=str).encode(),
+        ).hexdigest()
+
+    def _store_header_hashes(self, hashes):
+        """{id: özet} → tek UPDATE (yalnızca özet değişen kayıtlar için)."""
+        if not hashes:
+            return
+        self.env.cr.execute("""
+            UPDATE guven_fatura AS f SET header_hash = v.hash
+              FROM unnest(%s::int[], %s::varchar[]) AS v(id, hash)
+             WHERE f.id = v.id
+        """, (list(hashes), list(hashes.values())))
+        self.browse(list(hashes)).invalidate_recordset(['header_hash'])
+
+    def _diff_header(self, existing, vals):
+        """Compare SOAP vals with existing record, return only changed fields.
+
+        Normalizes None/empty strings, date strings and floats (0.005
+        tolerance) before comparing. Does not write anything.
         """
         from datetime import date as date_type
 
-        skip = {'company_id', 'kaynak', 'direction', 'uuid'}
+        skip = self._HEADER_IDENTITY_FIELDS
         changed = {}
 
         for key, new_val in vals.items():
@@ -590,142 +700,430 @@ class GuvenFatura(models.Model):
             if old_val != new_val:
                 changed[key] = new_val
 
-        if not changed:
-            return False
+        return changed
 
-        _logger.info(
-            "[GUVEN-SYNC] %s değişen alanlar: %s",
-            existing.invoice_id,
-            {k: (existing[k], v) for k, v in changed.items()},
-        )
+    @contextlib.contextmanager
+    def _unknown_scheme_run(self):
+        """Çalışma boyunca bilinmeyen TaxScheme'leri tek sayaçta topla.
+
+        Fatura başına uyarı yerine çalışma sonunda tek log satırı yazılır ve
+        sayaçlar ``guven.tax.scheme.map``'e işlenir. İç içe çağrılarda
+        dıştaki çalışmanın sayacı kullanılır.
+        """
+        counter = getattr(_parse_run, 'unknown', None)
+        if counter is not None:
+            yield counter
+            return
+        counter = _parse_run.unknown = Counter()
+        try:
+            yield counter
+        finally:
+            _parse_run.unknown = None
+            if counter:
+                try:
+                    self.env['guven.tax.scheme.map']._record_unknown(counter)
+                except Exception as e:
+                    _logger.warning(
+                        "[GUVEN-PARSE] Bilinmeyen scheme sayaçları kaydedilemedi: %s (%s)",
+                        e, dict(counter),
+                    )
+
+    @api.model
+    def _sync_children(self, records, vals_list, key_fields):
+        """Child kayıtlarını (line/tax/note) fark bazlı ``vals_list``e eşitle.
+
+        Mevcut kayıtlar ile yeni vals ``key_fields`` üzerinden eşleşir (aynı
+        anahtar birden fazla kez geçerse sırayla eşlenir). Eşleşen kayıtlarda
+        yalnızca değişen alanlar yazılır (``_diff_header`` normalizasyonu,
+        aynı değişiklik setleri tek ``write``), eşleşmeyen vals tek
+        ``create(vals_list)`` ile eklenir, artan kayıtlar silinir. Değişiklik
+        yoksa hiçbir yazma yapılmaz; id'ler korunur.
+
+        Returns:
+            tuple: (``vals_list`` sırasıyla kayıtlar recordset, istatistik dict)
+        """
+        def key(get):
+            parts = []
+            for fname in key_fields:
+                value = get(fname)
+                if isinstance(value, models.BaseModel):
+                    value = value.id
+                elif isinstance(value, float):
+                    value = round(value, 2)
+                parts.append(value or False)
+            return tuple(parts)
+
+        pool = {}
+        for rec in records:
+            pool.setdefault(key(rec.__getitem__), []).append(rec)
+
+        result = [None] * len(vals_list)
+        to_create = []
+        groups = {}
+        for i, vals in enumerate(vals_list):
+            candidates = pool.get(key(lambda f: vals.get(f, False)))
+            if not candidates:
+                to_create.append(i)
+                continue
+            rec = result[i] = candidates.pop(0)
+            changed = self._diff_header(rec, vals)
+            if changed:
+                groups.setdefault(tuple(sorted(changed.items())), []).append(rec.id)
+
+        stale = records.browse([rec.id for recs in pool.values() for rec in recs])
+        if stale:
+            stale.unlink()
+        for changed_items, ids in groups.items():
+            records.browse(ids).write(dict(changed_items))
+        if to_create:
+            created = records.create([vals_list[i] for i in to_create])
+            for i, rec in zip(to_create, created):
+                result[i] = rec
+
+        stats = {
+            'created': len(to_create),
+            'updated': sum(len(ids) for ids in groups.values()),
+            'deleted': len(stale),
+        }
+        return records.browse([rec.id for rec in result]), stats
+
+    @api.model
+    def _load_existing_by_uuid(self, uuids, kaynak, company):
+        """UUID seti için mevcut kayıtları chunk'lı sorgularla yükle.
+
+        Aynı sorguda yalnızca sync kararı için gereken alanlar (header
+        özeti, kilit, iptal) okunur; özeti değişmeyen kayıtların diğer
+        alanları hiç yüklenmez.
+
+        Returns:
+            dict: {uuid: guven.fatura record}
+        """
+        uuids = list(uuids)
+        existing_map = {}
+        for i in range(0, len(uuids), self._UPSERT_CHUNK_SIZE):
+            chunk = uuids[i:i + self._UPSERT_CHUNK_SIZE]
+            for rec in self.search_fetch([
+                ('uuid', 'in', chunk),
+                ('kaynak', '=', kaynak),
+                ('company_id', '=', company.id),
+            ], ['uuid', 'header_hash', 'is_locked', 'is_cancellation']):
+                existing_map[rec.uuid] = rec
+        return existing_map
+
+    @api.model
+    def _upsert_headers(self, vals_list, kaynak, company, skip_cancellations=False):
+        """SOAP header vals listesini toplu upsert et.
+
+        Mevcut kayıtlar tek (chunk'lı) sorguyla yüklenir, yeni kayıtlar tek
+        ``create(vals_list)`` ile oluşturulur, değişen kayıtlar aynı değişiklik
+        setine göre gruplanıp tek ``write`` ile güncellenir. Kilitli kayıtlar
+        atlanır. ``header_hash``'i gelen header'ınkiyle aynı olan kayıtlar
+        alan alan karşılaştırılmaz.
+
+        Args:
+            skip_cancellations: True ise mevcut iptal kayıtları güncellenmez
+                (e-arşiv normal flow — iptal flow authoritative).
+
+        Returns:
+            tuple: (yeni kayıtlar recordset, güncellenen adet, {uuid: record})
+        """
+        # Aynı UUID yanıtta birden fazla geçerse sonuncusu geçerli
+        by_uuid = {}
+        for vals in vals_list:
+            by_uuid[vals['uuid']] = vals
+
+        existing_map = self._load_existing_by_uuid(by_uuid, kaynak, company)
+
+        to_create = []
+        groups = {}
+        hashes = {}
+        updated = 0
+        for uuid, vals in by_uuid.items():
+            header_hash = self._header_hash(vals)
+            existing = existing_map.get(uuid)
+            if not existing:
+                to_create.append(dict(vals, details_received=False, header_hash=header_hash))
+                continue
+            if existing.is_locked:
+                continue
+            if skip_cancellations and existing.is_cancellation:
+                continue
+            if existing.header_hash == header_hash:
+                continue
 
-        # Header changed → reset details_received so XML gets re-parsed
-        if existing.details_received:
-            changed['details_received'] = False
-        existing.write(changed)
-        return True
+            hashes[existing.id] = header_hash
+            changed = self._diff_header(existing, vals)
+            if not changed:
+                continue
+            _logger.info(
+                "[GUVEN-SYNC] %s değişen alanlar: %s",
+                existing.invoice_id,
+                {k: (existing[k], v) for k, v in changed.items()},
+            )
+            # Header changed → reset details_received so XML gets re-parsed
+            if existing.details_received:
+                changed['details_received'] = False
+            if existing.detail_attempts:
+                changed.update(self._DETAIL_RETRY_RESET)
+            groups.setdefault(tuple(sorted(changed.items())), []).append(existing.id)
+            updated += 1
+
+        created = self.create(to_create) if to_create else self.browse()
+        for changed_items, ids in groups.items():
+            self.browse(ids).write(dict(changed_items))
+        # Özet ayrı yazılır: kayda özgü olduğu için write gruplarını bölmesin
+        self._store_header_hashes(hashes)
+
+        return created, updated, existing_map
 
     # ==================================================================
     # HEADER SYNC (SOAP HEADER_ONLY=Y)
     # ==================================================================
 
+    # izibiz liste çağrılarında tek yanıttaki azami fatura sayısı
+    _HEADER_SYNC_LIMIT = 25000
+    # LIMIT'e ulaşan pencere bundan kısaysa daha fazla bölünmez (yalnızca
+    # START_DATE/END_DATE dateTime ise; aksi halde en küçük pencere bir gündür)
+    _HEADER_SYNC_MIN_WINDOW = timedelta(minutes=1)
+
     @api.model
-    def _sync_efatura_headers(self, start_date, end_date, direction, company=None):
-        """HEADER_ONLY=Y ile e-fatura header'larını çek ve DB'ye kaydet."""
-        company = company or self.env.company
-        client, session_id, request_header = self._get_soap_client_and_login(company)
+    def _sub_day_windows(self, session, earsiv=False):
+        """START_DATE/END_DATE şemada ``dateTime`` mı?
 
-        try:
-            search_key = {
-                'LIMIT': 25000,
-                'START_DATE': datetime.combine(start_date, datetime.min.time()),
-                'END_DATE': datetime.combine(end_date, datetime.max.time()),
-                'READ_INCLUDED': 'true',
-                'DIRECTION': direction,
-            }
+        ``date`` ise saat izibiz'e hiç gitmez (gün altı pencere aynı günü
+        yeniden sorgular). Tip bilinmiyorsa (zeep modu, belirsiz element)
+        gün hassasiyeti varsayılır.
+        """
+        return all(
+            session.field_type(name, earsiv=earsiv) == 'dateTime'
+            for name in ('START_DATE', 'END_DATE')
+        )
 
-            with client.settings(raw_response=True):
-                raw = client.service.GetInvoice(
-                    REQUEST_HEADER=request_header,
-                    INVOICE_SEARCH_KEY=search_key,
-                    HEADER_ONLY='Y',
-                )
+    @api.model
+    def _split_window(self, start_dt, end_dt, sub_day, min_window):
+        """Pencereyi örtüşmeyen iki yarıya böl; bölünemiyorsa None.
 
-            root = ET.fromstring(raw.content)
+        ``sub_day`` False ise pencere tam günlere bölünür (tek gün
+        bölünemez); True ise ``min_window``'a kadar saniye sınırından
+        bölünür, ilk yarı ortadan 1 µs önce biter.
 
-            # INVOICE elementlerini bul (namespace-agnostic)
-            invoice_elems = root.findall('.//INVOICE')
-            if not invoice_elems:
-                invoice_elems = [e for e in root.iter() if e.tag.endswith('INVOICE')]
+        Returns:
+            tuple | None: ((start, end), (start, end))
+        """
+        if sub_day:
+            if end_dt - start_dt <= min_window:
+                return None
+            mid = (start_dt + (end_dt - start_dt) / 2).replace(microsecond=0)
+            return (start_dt, mid - timedelta(microseconds=1)), (mid, end_dt)
+        days = (end_dt.date() - start_dt.date()).days + 1
+        if days < 2:
+            return None
+        mid = start_dt.date() + timedelta(days=days // 2)
+        return (
+            (start_dt, datetime.combine(mid - timedelta(days=1), datetime.max.time())),
+            (datetime.combine(mid, datetime.min.time()), end_dt),
+        )
 
-            created = updated = 0
-            for inv_elem in invoice_elems:
-                header = inv_elem.find('HEADER')
-                if header is None:
-                    header = next(
-                        (e for e in inv_elem.iter() if e.tag.endswith('HEADER')), None
-                    )
+    @api.model
+    def _sync_headers_bisect(self, fetch, apply, start_dt, end_dt, log_tag,
+                             source=None, sub_day=False):
+        """``apply(fetch(start_dt, end_dt))``'ı LIMIT'e takılmayacak şekilde çalıştır.
 
-                h = {}
-                if header is not None:
-                    for child in header:
-                        tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                        h[tag] = child.text
+        Yanıt tam ``_HEADER_SYNC_LIMIT`` kayıt dönerse pencerede daha fazlası
+        olabilir: pencere örtüşmeyen iki yarıya bölünüp (bkz.
+        ``_split_window``) her yarı özyinelemeli olarak yeniden sorgulanır.
+        Dolu yanıttaki kayıtlar zaten upsert edilmiştir; alt pencerelerde
+        tekrar gelmeleri değişiklik yoksa yazma üretmez.
 
-                uuid = inv_elem.get('UUID') or h.get('UUID')
-                if not uuid:
-                    continue
+        Args:
+            fetch: (start_dt, end_dt) → yanıt dosyası (ORM'siz)
+            apply: yanıt dosyası → {'created', 'updated', 'soap_count'}
+            source: tam pencere için önceden indirilmiş yanıt (varsa)
+            sub_day: START_DATE/END_DATE dateTime ise True (bkz.
+                ``_sub_day_windows``); False ise gün altına bölünmez
 
-                raw_profile = h.get('PROFILEID')
-                raw_type = h.get('INVOICE_TYPE_CODE')
-                if raw_profile and raw_profile not in _VALID_PROFILE_IDS:
-                    _logger.warning(
-                        "[GUVEN-EFATURA] Bilinmeyen profile_id: %r (fatura: %s)", raw_profile, uuid,
-                    )
-                if raw_type and raw_type not in _VALID_INVOICE_TYPE_CODES:
-                    _logger.warning(
-                        "[GUVEN-EFATURA] Bilinmeyen invoice_type_code: %r (fatura: %s)", raw_type, uuid,
-                    )
+        Returns:
+            dict: {'created', 'updated', 'soap_count'} — soap_count yalnızca
+            LIMIT altında kalan (tam) yanıtların toplamıdır.
+        """
+        if source is None:
+            source = fetch(start_dt, end_dt)
+        try:
+            result = apply(source)
+        finally:
+            source.close()
+        if result['soap_count'] < self._HEADER_SYNC_LIMIT:
+            return result
 
-                vals = {
-                    'invoice_id': inv_elem.get('ID') or h.get('ID', ''),
-                    'uuid': uuid,
-                    'sender': h.get('SENDER'),
-                    'sender_name': h.get('SUPPLIER'),
-                    'receiver': h.get('RECEIVER'),
-                    'receiver_name': h.get('CUSTOMER'),
-                    'profile_id': raw_profile if raw_profile in _VALID_PROFILE_IDS else False,
-                    'invoice_type_code': raw_type if raw_type in _VALID_INVOICE_TYPE_CODES else False,
-                    'status_code': h.get('STATUS_CODE') or h.get('STATUS'),
-                    'status_description': h.get('STATUS_DESCRIPTION'),
-                    'response_code': h.get('RESPONSE_CODE'),
-                    'direction': direction,
-                    'kaynak': 'e-fatura-izibiz',
-                    'company_id': company.id,
-                }
-
-                # SOAP'tan currency geliyorsa ekle (HEADER_ONLY boş dönebilir)
-                soap_currency = h.get('CURRENCY_CODE')
-                if soap_currency:
-                    vals['currency_code'] = soap_currency
-
-                # Tarih
-                if h.get('ISSUE_DATE'):
-                    vals['issue_date'] = self._parse_date_field(h['ISSUE_DATE'])
-
-                # Finansal alanlar
-                for soap_f, odoo_f in (
-                    ('PAYABLE_AMOUNT', 'payable_amount'),
-                    ('TAX_EXCLUSIVE_TOTAL_AMOUNT', 'tax_exclusive_amount'),
-                    ('TAX_INCLUSIVE_TOTAL_AMOUNT', 'tax_inclusive_amount'),
-                    ('ALLOWANCE_TOTAL_AMOUNT', 'allowance_total_amount'),
-                ):
-                    if h.get(soap_f):
-                        vals[odoo_f] = self._parse_float(h[soap_f])
-
-                # Upsert
-                existing = self.search([
-                    ('uuid', '=', uuid),
-                    ('kaynak', '=', 'e-fatura-izibiz'),
-                    ('company_id', '=', company.id),
-                ], limit=1)
-                if existing:
-                    if existing.is_locked:
-                        continue
-                    if self._compare_and_update_header(existing, vals):
-                        updated += 1
-                else:
-                    vals['details_received'] = False
-                    self.create(vals)
-                    created += 1
+        halves = self._split_window(start_dt, end_dt, sub_day, self._HEADER_SYNC_MIN_WINDOW)
+        if halves is None:
+            _logger.warning(
+                "[%s] %s – %s penceresi LIMIT'e (%d) ulaştı ve daha fazla "
+                "bölünemiyor (%s); fazla kayıtlar eksik kalabilir.",
+                log_tag, start_dt, end_dt, self._HEADER_SYNC_LIMIT,
+                'en küçük pencere' if sub_day else 'tarih alanları gün hassasiyetinde',
+            )
+            return result
 
-            return {'created': created, 'updated': updated, 'soap_count': len(invoice_elems)}
+        _logger.info(
+            "[%s] %s – %s penceresi LIMIT'e (%d) ulaştı, ikiye bölünüyor.",
+            log_tag, start_dt, end_dt, self._HEADER_SYNC_LIMIT,
+        )
+        total = {'created': result['created'], 'updated': result['updated'], 'soap_count': 0}
+        for sub_start, sub_end in halves:
+            sub = self._sync_headers_bisect(
+                fetch, apply, sub_start, sub_end, log_tag, sub_day=sub_day,
+            )
+            for key in total:
+                total[key] += sub[key]
+        return total
 
-        finally:
+    @api.model
+    def _header_sync_plan(self, session, company):
+        """Header sync türleri: {anahtar: (fetch, apply, log etiketi)}.
+
+        Sıra IN, OUT, e-arşiv'dir (sıralı çalışmada bu sırayla işlenir).
+        """
+        limit = self._HEADER_SYNC_LIMIT
+        plan = {}
+        for direction in ('IN', 'OUT'):
+            plan[direction] = (
+                functools.partial(fetch_efatura_headers, session, direction, limit=limit),
+                functools.partial(self._apply_efatura_headers, direction=direction, company=company),
+                'GUVEN-EFATURA',
+            )
+        plan['earsiv'] = (
+            functools.partial(fetch_earsiv_headers, session, limit=limit),
+            functools.partial(self._apply_earsiv_headers, company=company),
+            'GUVEN-EARSIV',
+        )
+        return plan
+
+    @api.model
+    def _sync_company_block(self, company, start_date, end_date):
+        """Bir şirketin IN / OUT / e-arşiv header'larını tek blokta senkronize et.
+
+        Üç liste yanıtı aynı izibiz oturumuyla eşzamanlı indirilir (worker
+        thread'leri, geçici dosyaya); upsert'ler bu thread'de, indirme
+        tamamlandıkça sırayla yapılır. LIMIT'e ulaşan yanıtın alt pencereleri
+        sıralı çekilir.
+
+        Returns:
+            dict: {'IN': sonuç, 'OUT': sonuç, 'earsiv': sonuç} — her sonuç
+            {'created', 'updated', 'soap_count'}
+        """
+        session = self._get_izibiz_session(company)
+        plan = self._header_sync_plan(session, company)
+        start_dt = datetime.combine(start_date, datetime.min.time())
+        end_dt = datetime.combine(end_date, datetime.max.time())
+
+        def download(key):
+            return plan[key][0](start_dt, end_dt)
+
+        results = {}
+        first_exc = None
+        jobs = [(key, (key,)) for key in plan]
+        for key, source, exc in iter_concurrent(download, jobs, len(jobs)):
+            # Hata sonrası gelen yanıtlar işlenmez, yalnızca kapatılır
+            if exc is not None or first_exc is not None:
+                if source is not None:
+                    source.close()
+                first_exc = first_exc or exc
+                continue
+            fetch, apply, log_tag = plan[key]
             try:
-                client.service.Logout(REQUEST_HEADER=request_header)
-            except Exception:
-                pass
+                results[key] = self._sync_headers_bisect(
+                    fetch, apply, start_dt, end_dt, log_tag, source=source,
+                    sub_day=self._sub_day_windows(session, earsiv=key == 'earsiv'),
+                )
+            except Exception as e:
+                first_exc = e
+        if first_exc is not None:
+            raise first_exc
+        return results
+
+    @api.model
+    def _apply_efatura_headers(self, source, direction, company):
+        """İndirilmiş GetInvoice (HEADER_ONLY=Y) yanıtındaki header'ları upsert et.
+
+        Args:
+            source: yanıt gövdesi (dosya benzeri byte stream)
+        """
+        # Yanıt streaming okunur; INVOICE'lar chunk'lar halinde upsert edilir
+        # (bellekte tüm ağaç / tüm vals listesi tutulmaz).
+        soap_count = created = updated = 0
+        vals_list = []
+        for attrs, h in iter_invoice_headers(source):
+            soap_count += 1
+            uuid = attrs.get('UUID') or h.get('UUID')
+            if not uuid:
+                continue
+
+            raw_profile = h.get('PROFILEID')
+            raw_type = h.get('INVOICE_TYPE_CODE')
+            if raw_profile and raw_profile not in _VALID_PROFILE_IDS:
+                _logger.warning(
+                    "[GUVEN-EFATURA] Bilinmeyen profile_id: %r (fatura: %s)", raw_profile, uuid,
+                )
+            if raw_type and raw_type not in _VALID_INVOICE_TYPE_CODES:
+                _logger.warning(
+                    "[GUVEN-EFATURA] Bilinmeyen invoice_type_code: %r (fatura: %s)", raw_type, uuid,
+                )
+
+            vals = {
+                'invoice_id': attrs.get('ID') or h.get('ID', ''),
+                'uuid': uuid,
+                'sender': h.get('SENDER'),
+                'sender_name': h.get('SUPPLIER'),
+                'receiver': h.get('RECEIVER'),
+                'receiver_name': h.get('CUSTOMER'),
+                'profile_id': raw_profile if raw_profile in _VALID_PROFILE_IDS else False,
+                'invoice_type_code': raw_type if raw_type in _VALID_INVOICE_TYPE_CODES else False,
+                'status_code': h.get('STATUS_CODE') or h.get('STATUS'),
+                'status_description': h.get('STATUS_DESCRIPTION'),
+                'response_code': h.get('RESPONSE_CODE'),
+                'direction': direction,
+                'kaynak': 'e-fatura-izibiz',
+                'company_id': company.id,
+            }
+
+            # SOAP'tan currency geliyorsa ekle (HEADER_ONLY boş dönebilir)
+            soap_currency = h.get('CURRENCY_CODE')
+            if soap_currency:
+                vals['currency_code'] = soap_currency
+
+            # Tarih
+            if h.get('ISSUE_DATE'):
+                vals['issue_date'] = self._parse_date_field(h['ISSUE_DATE'])
+
+            # Finansal alanlar
+            for soap_f, odoo_f in (
+                ('PAYABLE_AMOUNT', 'payable_amount'),
+                ('TAX_EXCLUSIVE_TOTAL_AMOUNT', 'tax_exclusive_amount'),
+                ('TAX_INCLUSIVE_TOTAL_AMOUNT', 'tax_inclusive_amount'),
+                ('ALLOWANCE_TOTAL_AMOUNT', 'allowance_total_amount'),
+            ):
+                if h.get(soap_f):
+                    vals[odoo_f] = self._parse_float(h[soap_f])
+
+            vals_list.append(vals)
+            if len(vals_list) >= self._UPSERT_CHUNK_SIZE:
+                new_recs, upd, _existing = self._upsert_headers(
+                    vals_list, 'e-fatura-izibiz', company,
+                )
+                created += len(new_recs)
+                updated += upd
+                vals_list = []
+
+        # Kalan chunk (tek sorgu ile mevcutlar, tek create ile yeniler)
+        if vals_list:
+            new_recs, upd, _existing = self._upsert_headers(
+                vals_list, 'e-fatura-izibiz', company,
+            )
+            created += len(new_recs)
+            updated += upd
+
+        return {'created': created, 'updated': updated, 'soap_count': soap_count}
 
     # ==================================================================
     # E-ARŞİV HEADER SYNC
@@ -758,186 +1156,115 @@ class GuvenFatura(models.Model):
             _logger.debug("[GUVEN-EARSIV] E-Arşiv iptal: asıl fatura bulunamadı: %s", invoice_id)
 
     @api.model
-    def _sync_earsiv_headers(self, start_date, end_date, company=None):
-        """HEADER_ONLY=Y ile e-arşiv header'larını çek ve DB'ye kaydet."""
-        company = company or self.env.company
-        efatura_client, earsiv_client, session_id, request_header = \
-            self._get_earsiv_soap_client(company)
-
-        try:
-            with earsiv_client.settings(raw_response=True):
-                raw = earsiv_client.service.GetEArchiveInvoiceList(
-                    REQUEST_HEADER=request_header,
-                    LIMIT=25000,
-                    START_DATE=datetime.combine(start_date, datetime.min.time()),
-                    END_DATE=datetime.combine(end_date, datetime.max.time()),
-                    HEADER_ONLY='Y',
-                    READ_INCLUDED='true',
-                )
+    def _apply_earsiv_headers(self, source, company):
+        """İndirilmiş GetEArchiveInvoiceList (HEADER_ONLY=Y) yanıtındaki header'ları upsert et.
 
-            root = ET.fromstring(raw.content)
+        Args:
+            source: yanıt gövdesi (dosya benzeri byte stream)
+        """
+        # Yanıt streaming okunur; normal kayıtlar chunk'lar halinde upsert
+        # edilir. İptal kayıtları (az sayıda) sona bırakılır.
+        soap_count = created_count = updated = 0
+        vals_list = []
+        cancel_vals_list = []
+
+        for attrs, h in iter_invoice_headers(source):
+            soap_count += 1
+            uuid = attrs.get('UUID') or h.get('UUID')
+            if not uuid:
+                continue
 
-            # INVOICE elementlerini bul (namespace-agnostic)
-            invoice_elems = root.findall('.//INVOICE')
-            if not invoice_elems:
-                invoice_elems = [e for e in root.iter() if e.tag.endswith('INVOICE')]
+            raw_profile = h.get('PROFILE_ID') or h.get('PROFILEID') or h.get('PROFILE')
+            raw_type = h.get('INVOICE_TYPE') or h.get('INVOICE_TYPE_CODE')
 
-            created = updated = 0
-            cancellation_list = []
+            validated_profile = raw_profile if raw_profile in _VALID_PROFILE_IDS else False
+            validated_type = raw_type if raw_type in _VALID_INVOICE_TYPE_CODES else False
 
-            for inv_elem in invoice_elems:
-                header = inv_elem.find('HEADER')
-                if header is None:
-                    header = next(
-                        (e for e in inv_elem.iter() if e.tag.endswith('HEADER')), None
-                    )
+            if raw_profile and raw_profile not in _VALID_PROFILE_IDS:
+                _logger.warning(
+                    "[GUVEN-EARSIV] Bilinmeyen profile_id: %r (fatura: %s)", raw_profile, uuid,
+                )
+            if raw_type and raw_type not in _VALID_INVOICE_TYPE_CODES:
+                _logger.warning(
+                    "[GUVEN-EARSIV] Bilinmeyen invoice_type_code: %r (fatura: %s)", raw_type, uuid,
+                )
 
-                h = {}
-                if header is not None:
-                    for child in header:
-                        tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                        h[tag] = child.text
+            is_cancellation = validated_profile == 'IPTAL'
+            vals = {
+                'invoice_id': attrs.get('ID') or h.get('INVOICE_ID', ''),
+                'uuid': uuid,
+                'sender': h.get('SENDER_IDENTIFIER'),
+                'sender_name': h.get('SENDER_NAME'),
+                'receiver': h.get('CUSTOMER_IDENTIFIER'),
+                'receiver_name': h.get('CUSTOMER_NAME'),
+                'profile_id': validated_profile,
+                'invoice_type_code': validated_type,
+                'status_code': h.get('STATUS_CODE') or h.get('STATUS'),
+                'direction': 'OUT',
+                'kaynak': 'e-arsiv-izibiz',
+                'company_id': company.id,
+                'is_cancellation': is_cancellation,
+            }
 
-                uuid = inv_elem.get('UUID') or h.get('UUID')
-                if not uuid:
-                    continue
+            # SOAP'tan currency geliyorsa ekle (HEADER_ONLY boş dönebilir)
+            soap_currency = h.get('CURRENCY_CODE')
+            if soap_currency:
+                vals['currency_code'] = soap_currency
 
-                raw_profile = h.get('PROFILE_ID') or h.get('PROFILEID') or h.get('PROFILE')
-                raw_type = h.get('INVOICE_TYPE') or h.get('INVOICE_TYPE_CODE')
+            # Tarih
+            if h.get('ISSUE_DATE'):
+                vals['issue_date'] = self._parse_date_field(h['ISSUE_DATE'])
 
-                validated_profile = raw_profile if raw_profile in _VALID_PROFILE_IDS else False
-                validated_type = raw_type if raw_type in _VALID_INVOICE_TYPE_CODES else False
+            # Finansal alanlar
+            # NOT: E-arşiv SOAP TAXABLE_AMOUNT aslında vergi tutarını döner,
+            # matrah (tax_exclusive_amount) değil. Doğru matrah UBL XML parse'tan gelir.
+            if h.get('PAYABLE_AMOUNT'):
+                vals['payable_amount'] = self._parse_float(h['PAYABLE_AMOUNT'])
 
-                if raw_profile and raw_profile not in _VALID_PROFILE_IDS:
-                    _logger.warning(
-                        "[GUVEN-EARSIV] Bilinmeyen profile_id: %r (fatura: %s)", raw_profile, uuid,
-                    )
-                if raw_type and raw_type not in _VALID_INVOICE_TYPE_CODES:
-                    _logger.warning(
-                        "[GUVEN-EARSIV] Bilinmeyen invoice_type_code: %r (fatura: %s)", raw_type, uuid,
-                    )
+            # İptal kayıtlarını ayrı listede topla (normal kayıtlardan sonra işlenecek)
+            if is_cancellation:
+                cancel_vals_list.append(vals)
+                continue
 
-                # İptal kayıtlarını ayrı listede topla (normal kayıtlardan sonra işlenecek)
-                if validated_profile == 'IPTAL':
-                    cancellation_list.append((inv_elem, h, uuid))
-                    continue
+            vals_list.append(vals)
+            if len(vals_list) >= self._UPSERT_CHUNK_SIZE:
+                new_recs, upd, _existing = self._upsert_headers(
+                    vals_list, 'e-arsiv-izibiz', company, skip_cancellations=True,
+                )
+                created_count += len(new_recs)
+                updated += upd
+                vals_list = []
+
+        # Upsert — iptal edilmiş kayıtları normal flow'da güncelleme.
+        # Aynı UUID hem EARSIVFATURA hem IPTAL olarak gelir; iptal flow
+        # authoritative (ping-pong önleme).
+        if vals_list:
+            new_recs, upd, _existing = self._upsert_headers(
+                vals_list, 'e-arsiv-izibiz', company, skip_cancellations=True,
+            )
+            created_count += len(new_recs)
+            updated += upd
 
-                vals = {
-                    'invoice_id': inv_elem.get('ID') or h.get('INVOICE_ID', ''),
-                    'uuid': uuid,
-                    'sender': h.get('SENDER_IDENTIFIER'),
-                    'sender_name': h.get('SENDER_NAME'),
-                    'receiver': h.get('CUSTOMER_IDENTIFIER'),
-                    'receiver_name': h.get('CUSTOMER_NAME'),
-                    'profile_id': validated_profile,
-                    'invoice_type_code': validated_type,
-                    'status_code': h.get('STATUS_CODE') or h.get('STATUS'),
-                    'direction': 'OUT',
-                    'kaynak': 'e-arsiv-izibiz',
-                    'company_id': company.id,
-                    'is_cancellation': False,
-                }
-
-                # SOAP'tan currency geliyorsa ekle (HEADER_ONLY boş dönebilir)
-                soap_currency = h.get('CURRENCY_CODE')
-                if soap_currency:
-                    vals['currency_code'] = soap_currency
-
-                # Tarih
-                if h.get('ISSUE_DATE'):
-                    vals['issue_date'] = self._parse_date_field(h['ISSUE_DATE'])
-
-                # Finansal alanlar
-                # NOT: E-arşiv SOAP TAXABLE_AMOUNT aslında vergi tutarını döner,
-                # matrah (tax_exclusive_amount) değil. Doğru matrah UBL XML parse'tan gelir.
-                if h.get('PAYABLE_AMOUNT'):
-                    vals['payable_amount'] = self._parse_float(h['PAYABLE_AMOUNT'])
-
-                # Upsert — iptal edilmiş kayıtları normal flow'da güncelleme
-                existing = self.search([
-                    ('uuid', '=', uuid),
-                    ('kaynak', '=', 'e-arsiv-izibiz'),
-                    ('company_id', '=', company.id),
-                ], limit=1)
-                if existing:
-                    if existing.is_locked:
-                        continue
-                    # İptal edilmiş kayıtları normal flow'da güncelleme (ping-pong önleme)
-                    # Aynı UUID hem EARSIVFATURA hem IPTAL olarak gelir; iptal flow authoritative
-                    if existing.is_cancellation:
-                        continue
-                    if self._compare_and_update_header(existing, vals):
-                        updated += 1
-                else:
-                    vals['details_received'] = False
-                    self.create(vals)
-                    created += 1
-
-            # --- İptal kayıtlarını işle (normal kayıtlardan sonra) ---
-            for inv_elem, h, uuid in cancellation_list:
-                cancel_invoice_id = inv_elem.get('ID') or h.get('INVOICE_ID', '')
-
-                raw_type = h.get('INVOICE_TYPE') or h.get('INVOICE_TYPE_CODE')
-                validated_type = raw_type if raw_type in _VALID_INVOICE_TYPE_CODES else False
-
-                cancel_vals = {
-                    'invoice_id': cancel_invoice_id,
-                    'uuid': uuid,
-                    'sender': h.get('SENDER_IDENTIFIER'),
-                    'sender_name': h.get('SENDER_NAME'),
-                    'receiver': h.get('CUSTOMER_IDENTIFIER'),
-                    'receiver_name': h.get('CUSTOMER_NAME'),
-                    'profile_id': 'IPTAL',
-                    'invoice_type_code': validated_type,
-                    'status_code': h.get('STATUS_CODE') or h.get('STATUS'),
-                    'direction': 'OUT',
-                    'kaynak': 'e-arsiv-izibiz',
-                    'company_id': company.id,
-                    'is_cancellation': True,
-                }
-
-                # SOAP'tan currency geliyorsa ekle (HEADER_ONLY boş dönebilir)
-                soap_currency = h.get('CURRENCY_CODE')
-                if soap_currency:
-                    cancel_vals['currency_code'] = soap_currency
-
-                if h.get('ISSUE_DATE'):
-                    cancel_vals['issue_date'] = self._parse_date_field(h['ISSUE_DATE'])
-
-                # NOT: E-arşiv SOAP TAXABLE_AMOUNT = vergi tutarı, matrah değil
-                if h.get('PAYABLE_AMOUNT'):
-                    cancel_vals['payable_amount'] = self._parse_float(h['PAYABLE_AMOUNT'])
-
-                existing_cancel = self.search([
-                    ('uuid', '=', uuid),
-                    ('kaynak', '=', 'e-arsiv-izibiz'),
-                    ('company_id', '=', company.id),
-                ], limit=1)
-
-                if existing_cancel:
-                    if existing_cancel.is_locked:
-                        continue
-                    if self._compare_and_update_header(existing_cancel, cancel_vals):
-                        updated += 1
-                    if not existing_cancel.cancelled_invoice_id:
-                        self._link_cancellation_to_original(
-                            existing_cancel, cancel_invoice_id, company,
-                        )
-                else:
-                    cancel_vals['details_received'] = False
-                    new_cancel = self.create(cancel_vals)
-                    self._link_cancellation_to_original(
-                        new_cancel, cancel_invoice_id, company,
-                    )
-                    created += 1
+        # --- İptal kayıtlarını işle (normal kayıtlardan sonra) ---
+        if cancel_vals_list:
+            new_cancels, cancel_updated, existing_cancels = self._upsert_headers(
+                cancel_vals_list, 'e-arsiv-izibiz', company,
+            )
+            created_count += len(new_cancels)
+            updated += cancel_updated
 
-            return {'created': created, 'updated': updated, 'soap_count': len(invoice_elems)}
+            for new_cancel in new_cancels:
+                self._link_cancellation_to_original(
+                    new_cancel, new_cancel.invoice_id, company,
+                )
+            for existing_cancel in existing_cancels.values():
+                if existing_cancel.is_locked or existing_cancel.cancelled_invoice_id:
+                    continue
+                self._link_cancellation_to_original(
+                    existing_cancel, existing_cancel.invoice_id, company,
+                )
 
-        finally:
-            try:
-                efatura_client.service.Logout(REQUEST_HEADER=request_header)
-            except Exception:
-                pass
+        return {'created': created_count, 'updated': updated, 'soap_count': soap_count}
 
     # ==================================================================
     # UBL XML PARSE
@@ -946,175 +1273,43 @@ class GuvenFatura(models.Model):
     def _parse_ubl_and_update(self, ubl_xml_bytes):
         """UBL XML'i parse et, line/tax/note kayıtlarını oluştur, eksik alanları güncelle."""
         self.ensure_one()
+        self._apply_parsed_ubl(parse_ubl(ubl_xml_bytes))
 
-        ns = {
-            'cac': 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2',
-            'cbc': 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2',
-        }
+    def _apply_parsed_ubl(self, parsed):
+        """``lib.ubl_parser.ParsedInvoice``'ı kayda uygula.
 
-        root = ET.fromstring(ubl_xml_bytes)
-
-        def get_text(elem, xpath):
-            """Namespace-aware XPath, fallback to local name."""
-            if elem is None:
-                return ''
-            found = elem.find(xpath, ns)
-            if found is not None and found.text:
-                return found.text.strip()
-            # Fallback: local name search
-            local = xpath.split(':')[-1] if ':' in xpath else xpath.lstrip('./')
-            for child in elem.iter():
-                tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                if tag == local and child.text:
-                    return child.text.strip()
-            return ''
-
-        def find_elem(parent, local_name):
-            if parent is None:
-                return None
-            for child in parent.iter():
-                tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                if tag == local_name:
-                    return child
-            return None
+        TRY çevrimi (XML'de yoksa kayıttaki döviz/kur ile) burada yapılır;
+        mevcut line/tax/note kayıtları ``_sync_children`` ile fark bazlı
+        eşitlenir (değişmeyen XML yeniden parse edildiğinde yazma yapılmaz).
+        """
+        self.ensure_one()
 
-        def find_all_elems(parent, local_name):
-            result = []
-            if parent is None:
-                return result
-            for child in parent:
-                tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                if tag == local_name:
-                    result.append(child)
-            return result
+        # Öğrenilmiş eşleştirmeler (guven.tax.scheme.map) yerleşik haritanın önüne geçer
+        SchemeMap = self.env['guven.tax.scheme.map']
+        scheme_map = SchemeMap._get_scheme_mapping()
 
-        # TaxScheme ID → tax_type mapping
-        SCHEME_ID_MAP = {
-            '0015': 'kdv',
-            '0003': 'kdv',       # Bazı implementasyonlarda kullanılır
-            '9015': 'withholding',
-            '4071': 'bsmv',
-            '0059': 'konaklama',
-            '0071': 'tuketim',
-        }
-        # TaxScheme Name fallback → tax_type
-        SCHEME_NAME_MAP = {
-            # KDV varyasyonları
-            'KDV': 'kdv',
-            'KDV HESAPLANAN': 'kdv',
-            'KATMA DEGER VERGISI': 'kdv',
-            'KATMA DEĞER VERGISI': 'kdv',
-            'KATMA DEĞER VERGİSİ': 'kdv',
-            'GERÇEK USULDE KATMA DEĞER VERGİSİ': 'kdv',
-            'KDV-SATIŞLAR': 'kdv',
-            'KDV GERÇEK': 'kdv',
-            'KDV GERCEK': 'kdv',
-            'KDV VERGISI': 'kdv',
-            'KDV VERGİSİ': 'kdv',
-            'HESAPLANAN KDV': 'kdv',
-            'SATIŞ VERGISI': 'kdv',
-            'SATIŞ VERGİSİ': 'kdv',
-            'SATIŞ KDV': 'kdv',
-            # Tevkifat
-            'TEVKIFAT': 'withholding',
-            'KDV TEVKİFAT': 'withholding',
-            # BSMV
-            'BSMV': 'bsmv',
-            # Konaklama
-            'KONAKLAMA VERGISI': 'konaklama',
-            'KONAKLAMA VERGİSİ': 'konaklama',
-            # Tüketim
-            'ELK.HAVAGAZ.TÜK.VER.': 'tuketim',
-            'ELEKTRIK HAVAGAZI TUKETIM VERGISI': 'tuketim',
-            # Özel İletişim Vergisi (ÖİV)
-            'ÖZEL ILETISIM VERGISI': 'oiv',
-            'ÖZEL İLETİŞİM VERGİSİ': 'oiv',
-            'ÖİV': 'oiv',
-            'OIV': 'oiv',
-            'ÖZEL İLETIŞIM VERGISI': 'oiv',
-            'Ö.ILETISIM V': 'oiv',
-            # Damga Vergisi
-            'DAMGA VERGISI': 'damga',
-            'DAMGA VERGİSİ': 'damga',
-        }
+        def tax_type_of(tax):
+            if tax.tax_type == 'withholding' or not scheme_map:
+                return tax.tax_type
+            return SchemeMap._resolve(scheme_map, tax.scheme_id, tax.scheme_name) or tax.tax_type
 
-        def resolve_tax_type(subtotal_elem):
-            """TaxSubtotal → tax_type çözümleme (scheme ID + name fallback + fuzzy)."""
-            # TaxScheme elementini bul
-            scheme = find_elem(subtotal_elem, 'TaxScheme')
-            if scheme is None:
-                return False
-
-            # Scheme ID: doğrudan children arasında 'ID' ara
-            scheme_id = ''
-            scheme_name = ''
-            for child in scheme:
-                child_tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                if child_tag == 'ID' and child.text:
-                    scheme_id = child.text.strip()
-                elif child_tag == 'Name' and child.text:
-                    scheme_name = child.text.strip().upper()
-
-            # 1. Scheme ID ile exact match
-            if scheme_id in SCHEME_ID_MAP:
-                return SCHEME_ID_MAP[scheme_id]
-            # 2. Scheme Name ile exact match
-            if scheme_name in SCHEME_NAME_MAP:
-                return SCHEME_NAME_MAP[scheme_name]
-            # 3. Parantez içeriğini kaldırıp tekrar dene
-            cleaned = re.sub(r'\s*\(.*?\)', '', scheme_name).strip()
-            if cleaned and cleaned in SCHEME_NAME_MAP:
-                return SCHEME_NAME_MAP[cleaned]
-            # 4. Oran bilgisini kaldırıp tekrar dene ("%20" gibi)
-            cleaned2 = re.sub(r'\s*%\d+', '', cleaned).strip()
-            if cleaned2 and cleaned2 in SCHEME_NAME_MAP:
-                return SCHEME_NAME_MAP[cleaned2]
-            # 5. İçinde KDV/KATMA geçiyorsa kdv kabul et
-            if 'KDV' in scheme_name or 'KATMA' in scheme_name:
-                return 'kdv'
-
-            if scheme_id or scheme_name:
+        unknown = [
+            scheme for scheme in parsed.unknown_schemes
+            if not SchemeMap._resolve(scheme_map, *scheme)
+        ]
+        if unknown:
+            run_counter = getattr(_parse_run, 'unknown', None)
+            if run_counter is not None:
+                run_counter.update(unknown)
+            else:
                 _logger.warning(
-                    "[GUVEN-PARSE] Bilinmeyen TaxScheme ID=%r Name=%r (fatura: %s)",
-                    scheme_id, scheme_name, self.invoice_id,
+                    "[GUVEN-PARSE] Bilinmeyen TaxScheme'ler (fatura: %s): %s",
+                    self.invoice_id, dict(Counter(unknown)),
                 )
-            return 'diger'
-
-        pf = self._parse_float
-        vals = {}
-
-        # --- Issue Time ---
-        issue_time = get_text(root, './/cbc:IssueTime')
-        if issue_time:
-            vals['issue_time'] = issue_time[:8]  # HH:MM:SS
-
-        # --- Currency ---
-        currency = get_text(root, './/cbc:DocumentCurrencyCode')
-        if currency:
-            vals['currency_code'] = currency
-
-        # --- Exchange Rate (PricingExchangeRate) ---
-        pricing_er = find_elem(root, 'PricingExchangeRate')
-        exchange_rate = 0.0
-        if pricing_er is not None:
-            rate_text = get_text(pricing_er, './/cbc:CalculationRate')
-            if rate_text:
-                exchange_rate = pf(rate_text)
-                if exchange_rate > 0:
-                    vals['exchange_rate'] = exchange_rate
-
-        # --- Toplam Tutarlar ---
-        legal_total = find_elem(root, 'LegalMonetaryTotal')
-        if legal_total is not None:
-            for xml_f, odoo_f in (
-                ('TaxExclusiveAmount', 'tax_exclusive_amount'),
-                ('TaxInclusiveAmount', 'tax_inclusive_amount'),
-                ('PayableAmount', 'payable_amount'),
-                ('AllowanceTotalAmount', 'allowance_total_amount'),
-            ):
-                v = get_text(legal_total, f'.//cbc:{xml_f}')
-                if v:
-                    vals[odoo_f] = pf(v)
+
+        vals = parsed.header.as_vals()
+        currency = vals.get('currency_code')
+        exchange_rate = vals.get('exchange_rate', 0.0)
 
         # --- TRY Hesaplamaları ---
         cur = currency or self.currency_code or 'TRY'
@@ -1131,187 +1326,69 @@ class GuvenFatura(models.Model):
             elif rate > 0:
                 vals[try_f] = amount * rate
 
-        # --- Mevcut child'ları temizle (yeniden oluşturmak için) ---
-        self.tax_ids.unlink()
-        self.line_ids.unlink()
-        self.note_ids.unlink()
+        def to_try(amount):
+            return amount if cur == 'TRY' else amount * rate if rate > 0 else 0.0
 
         # --- Notlar ---
-        note_lines = find_all_elems(root, 'Note')
-        note_vals_list = []
-        for seq, note_elem in enumerate(note_lines, 1):
-            text = note_elem.text.strip() if note_elem.text else ''
-            if text:
-                note_vals_list.append({
-                    'fatura_id': self.id,
-                    'note_type': 'hashtag' if text.startswith('#') else 'free_text',
-                    'value': text,
-                    'sequence': seq * 10,
-                })
-        if note_vals_list:
-            self.env['guven.fatura.note'].create(note_vals_list)
-
-        # --- Fatura Kalemleri ---
-        invoice_lines = find_all_elems(root, 'InvoiceLine')
-        for line_no, line_elem in enumerate(invoice_lines, 1):
-            item = find_elem(line_elem, 'Item')
-            item_name = get_text(item, './/cbc:Name') if item is not None else ''
-            if not item_name and item is not None:
-                item_name = get_text(item, './/cbc:Description')
-
-            qty_elem = find_elem(line_elem, 'InvoicedQuantity')
-            quantity = pf(qty_elem.text) if qty_elem is not None and qty_elem.text else 1.0
-
-            line_ext = pf(get_text(line_elem, './/cbc:LineExtensionAmount'))
-
-            # Satır indirimi (AllowanceCharge)
-            allowance = 0.0
-            ac = find_elem(line_elem, 'AllowanceCharge')
-            if ac is not None:
-                allowance = pf(get_text(ac, './/cbc:Amount'))
-
-            # TRY hesaplama
-            line_ext_try = line_ext if cur == 'TRY' else line_ext * rate if rate > 0 else 0.0
-            allow_try = allowance if cur == 'TRY' else allowance * rate if rate > 0 else 0.0
-
-            line_record = self.env['guven.fatura.line'].create({
+        self._sync_children(self.note_ids, [{
+            'fatura_id': self.id,
+            'note_type': note.note_type,
+            'value': note.value,
+            'sequence': note.sequence,
+        } for note in parsed.notes], ('sequence',))
+
+        def tax_vals(tax, line_id):
+            return {
                 'fatura_id': self.id,
-                'line_no': line_no,
-                'item_name': item_name,
-                'quantity': quantity,
-                'line_extension_amount': line_ext,
-                'allowance_amount': allowance,
+                'line_id': line_id,
+                'tax_type': tax_type_of(tax),
+                'taxable_amount': tax.taxable_amount,
+                'tax_amount': tax.tax_amount,
+                'percent': tax.percent,
                 'currency_code': cur,
-                'line_extension_amount_try': line_ext_try,
-                'allowance_amount_try': allow_try,
-            })
-
-            # --- Satır Seviyesi Vergiler ---
-            tax_total = find_elem(line_elem, 'TaxTotal')
-            if tax_total is not None:
-                for subtotal in find_all_elems(tax_total, 'TaxSubtotal'):
-                    taxable = pf(get_text(subtotal, './/cbc:TaxableAmount'))
-                    tax_amt = pf(get_text(subtotal, './/cbc:TaxAmount'))
-                    percent = pf(get_text(subtotal, './/cbc:Percent'))
-                    tax_type = resolve_tax_type(subtotal)
-
-                    taxable_try = (
-                        taxable if cur == 'TRY'
-                        else taxable * rate if rate > 0 else 0.0
-                    )
-                    tax_amt_try = (
-                        tax_amt if cur == 'TRY'
-                        else tax_amt * rate if rate > 0 else 0.0
-                    )
-
-                    self.env['guven.fatura.tax'].create({
-                        'fatura_id': self.id,
-                        'line_id': line_record.id,
-                        'tax_type': tax_type,
-                        'taxable_amount': taxable,
-                        'tax_amount': tax_amt,
-                        'percent': percent,
-                        'currency_code': cur,
-                        'taxable_amount_try': taxable_try,
-                        'tax_amount_try': tax_amt_try,
-                    })
-
-            # --- Satır Seviyesi Tevkifat (WithholdingTaxTotal) ---
-            wh_tax_total = find_elem(line_elem, 'WithholdingTaxTotal')
-            if wh_tax_total is not None:
-                for subtotal in find_all_elems(wh_tax_total, 'TaxSubtotal'):
-                    taxable = pf(get_text(subtotal, './/cbc:TaxableAmount'))
-                    tax_amt = pf(get_text(subtotal, './/cbc:TaxAmount'))
-                    percent = pf(get_text(subtotal, './/cbc:Percent'))
-
-                    taxable_try = (
-                        taxable if cur == 'TRY'
-                        else taxable * rate if rate > 0 else 0.0
-                    )
-                    tax_amt_try = (
-                        tax_amt if cur == 'TRY'
-                        else tax_amt * rate if rate > 0 else 0.0
-                    )
+                'taxable_amount_try': to_try(tax.taxable_amount),
+                'tax_amount_try': to_try(tax.tax_amount),
+            }
 
-                    self.env['guven.fatura.tax'].create({
-                        'fatura_id': self.id,
-                        'line_id': line_record.id,
-                        'tax_type': 'withholding',
-                        'taxable_amount': taxable,
-                        'tax_amount': tax_amt,
-                        'percent': percent,
-                        'currency_code': cur,
-                        'taxable_amount_try': taxable_try,
-                        'tax_amount_try': tax_amt_try,
-                    })
+        # --- Fatura Kalemleri (satır no ile eşleşir) ---
+        line_records, _stats = self._sync_children(self.line_ids, [{
+            'fatura_id': self.id,
+            'line_no': line.line_no,
+            'item_name': line.item_name,
+            'quantity': line.quantity,
+            'line_extension_amount': line.line_extension_amount,
+            'allowance_amount': line.allowance_amount,
+            'currency_code': cur,
+            'line_extension_amount_try': to_try(line.line_extension_amount),
+            'allowance_amount_try': to_try(line.allowance_amount),
+        } for line in parsed.lines], ('line_no',))
+
+        # --- Satır Seviyesi Vergiler + Tevkifat (WithholdingTaxTotal) ---
+        tax_vals_list = [
+            tax_vals(tax, line_record.id)
+            for line, line_record in zip(parsed.lines, line_records)
+            for tax in line.taxes + line.withholdings
+        ]
 
         # --- Fatura Seviyesi Vergiler (root TaxTotal) ---
-        # Satır-level vergiler zaten oluşturulduysa root-level atla (aynı veriyi tekrarlar)
-        has_line_taxes = self.env['guven.fatura.tax'].search_count([
-            ('fatura_id', '=', self.id), ('line_id', '!=', False),
-        ])
-        if not has_line_taxes:
-            for tax_total in find_all_elems(root, 'TaxTotal'):
-                for subtotal in find_all_elems(tax_total, 'TaxSubtotal'):
-                    taxable = pf(get_text(subtotal, './/cbc:TaxableAmount'))
-                    tax_amt = pf(get_text(subtotal, './/cbc:TaxAmount'))
-                    percent = pf(get_text(subtotal, './/cbc:Percent'))
-                    tax_type = resolve_tax_type(subtotal)
-
-                    taxable_try = (
-                        taxable if cur == 'TRY'
-                        else taxable * rate if rate > 0 else 0.0
-                    )
-                    tax_amt_try = (
-                        tax_amt if cur == 'TRY'
-                        else tax_amt * rate if rate > 0 else 0.0
-                    )
-
-                    self.env['guven.fatura.tax'].create({
-                        'fatura_id': self.id,
-                        'line_id': False,
-                        'tax_type': tax_type,
-                        'taxable_amount': taxable,
-                        'tax_amount': tax_amt,
-                        'percent': percent,
-                        'currency_code': cur,
-                        'taxable_amount_try': taxable_try,
-                        'tax_amount_try': tax_amt_try,
-                    })
+        # Satır-level vergiler varsa root-level atla (aynı veriyi tekrarlar)
+        if not tax_vals_list:
+            tax_vals_list += [tax_vals(tax, False) for tax in parsed.taxes]
 
         # --- Fatura Seviyesi Tevkifat (root WithholdingTaxTotal) ---
-        has_line_wh = self.env['guven.fatura.tax'].search_count([
-            ('fatura_id', '=', self.id),
-            ('line_id', '!=', False),
-            ('tax_type', '=', 'withholding'),
-        ])
+        has_line_wh = any(
+            tax_type_of(tax) == 'withholding'
+            for line in parsed.lines
+            for tax in line.taxes + line.withholdings
+        )
         if not has_line_wh:
-            for wh_total in find_all_elems(root, 'WithholdingTaxTotal'):
-                for subtotal in find_all_elems(wh_total, 'TaxSubtotal'):
-                    taxable = pf(get_text(subtotal, './/cbc:TaxableAmount'))
-                    tax_amt = pf(get_text(subtotal, './/cbc:TaxAmount'))
-                    percent = pf(get_text(subtotal, './/cbc:Percent'))
-
-                    taxable_try = (
-                        taxable if cur == 'TRY'
-                        else taxable * rate if rate > 0 else 0.0
-                    )
-                    tax_amt_try = (
-                        tax_amt if cur == 'TRY'
-                        else tax_amt * rate if rate > 0 else 0.0
-                    )
+            tax_vals_list += [tax_vals(tax, False) for tax in parsed.withholdings]
 
-                    self.env['guven.fatura.tax'].create({
-                        'fatura_id': self.id,
-                        'line_id': False,
-                        'tax_type': 'withholding',
-                        'taxable_amount': taxable,
-                        'tax_amount': tax_amt,
-                        'percent': percent,
-                        'currency_code': cur,
-                        'taxable_amount_try': taxable_try,
-                        'tax_amount_try': tax_amt_try,
-                    })
+        # Silinen satırların vergileri cascade ile gitti; güncel listeyle eşitle
+        self._sync_children(
+            self.env['guven.fatura.tax'].search([('fatura_id', '=', self.id)]),
+            tax_vals_list, ('line_id', 'tax_type', 'percent'),
+        )
 
         self.write(vals)
 
@@ -1319,129 +1396,451 @@ class GuvenFatura(models.Model):
     # XML FETCH + PARSE (tek fatura)
     # ==================================================================
 
-    def _fetch_and_parse_xml(self, client, request_header):
-        """Tek fatura için HEADER_ONLY=N ile XML çek, parse et."""
+    def _apply_content(self, content_text, session=None):
+        """SOAP CONTENT (base64, ZIP olabilir) → UBL parse + details_received."""
         self.ensure_one()
+        try:
+            ubl_bytes = extract_ubl(content_text, session)
+        except ContentError as e:
+            raise UserError(_("Fatura %s: %s") % (self.invoice_id, e))
+        self._apply_ubl(ubl_bytes)
 
-        search_key = {
-            'LIMIT': 1,
-            'UUID': self.uuid,
-            'DIRECTION': self.direction or 'IN',
-            'READ_INCLUDED': 'true',
-        }
+    def _apply_ubl(self, ubl_bytes):
+        """İndirilmiş UBL'i arşivle, parse et ve kaydı detayı alınmış işaretle.
 
-        with client.settings(raw_response=True):
-            raw = client.service.GetInvoice(
-                REQUEST_HEADER=request_header,
-                INVOICE_SEARCH_KEY=search_key,
-                HEADER_ONLY='N',
-            )
+        Arşivleme parse'tan önce yapılır: parse hatası alınsa bile belge
+        yerelde kalır, parser düzeltildikten sonra izibiz'e gitmeden
+        yeniden işlenebilir.
+        """
+        self.ensure_one()
+        with self.env.cr.savepoint():
+            self._store_ubl(ubl_bytes)
+        # Parse hatası yalnızca kendi yazımlarını geri alır, arşiv kalır
+        with self.env.cr.savepoint():
+            self._parse_ubl_and_update(ubl_bytes)
+            self._mark_details_received()
 
-        root = ET.fromstring(raw.content)
-
-        # CONTENT elementini bul (en uzun text'li element)
-        content_text = None
-        max_len = 0
-        for tag in ('CONTENT', 'INVOICE', 'HTML_CONTENT', 'INVOICE_CONTENT', 'DATA'):
-            for elem in root.iter():
-                t = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-                if t == tag and elem.text and len(elem.text.strip()) > max_len:
-                    content_text = elem.text.strip()
-                    max_len = len(content_text)
-
-        if not content_text or max_len < 100:
-            raise UserError(_("Fatura %s için XML içeriği alınamadı.") % self.invoice_id)
-
-        # Base64 decode
-        decoded = base64.b64decode(content_text)
-
-        # ZIP kontrolü
-        if decoded[:4] == b'PK\x03\x04':
-            with zipfile.ZipFile(io.BytesIO(decoded), 'r') as zf:
-                xml_name = next(
-                    (n for n in zf.namelist()
-                     if n.endswith('.xml') and not n.startswith('__')),
-                    zf.namelist()[0] if zf.namelist() else None,
-                )
-                if not xml_name:
-                    raise UserError(
-                        _("Fatura %s ZIP içinde XML bulunamadı.") % self.invoice_id
-                    )
-                ubl_bytes = zf.read(xml_name)
-        else:
-            ubl_bytes = decoded
+    # ==================================================================
+    # UBL ARŞİVİ (filestore, SHA-256 ile içerik adresli)
+    # ==================================================================
+
+    def _store_ubl(self, ubl_bytes):
+        """UBL XML'i gzip'li ir.attachment olarak sakla ve kayda bağla.
+
+        Aynı şirkette aynı SHA-256'ya sahip belge daha önce arşivlendiyse
+        mevcut ek yeniden kullanılır. Ek ilk arşivleyen faturaya bağlanır
+        (``res_id``, ``company_id``); o fatura silinirse ek onu kullanan
+        başka bir faturaya devredilir (bkz. ``unlink``). Artık hiçbir
+        faturanın göstermediği ekler ``_gc_ubl_archives`` ile silinir.
+        """
+        self.ensure_one()
+        sha256 = hashlib.sha256(ubl_bytes).hexdigest()
+        if self.ubl_sha256 == sha256 and self.ubl_attachment_id:
+            return self.ubl_attachment_id
+
+        holder = self.sudo().search([
+            ('ubl_sha256', '=', sha256),
+            ('ubl_attachment_id', '!=', False),
+            ('company_id', '=', self.company_id.id),
+        ], limit=1)
+        attachment = holder.ubl_attachment_id
+        if not attachment:
+            attachment = self.env['ir.attachment'].sudo().create({
+                'name': f'{sha256}.xml.gz',
+                'raw': gzip.compress(ubl_bytes, mtime=0),
+                'mimetype': 'application/gzip',
+                'res_model': self._name,
+                'res_id': self.id,
+                'company_id': self.company_id.id,
+            })
 
-        # NUL karakterlerini temizle
-        ubl_bytes = ubl_bytes.replace(b'\x00', b'')
+        self.write({'ubl_sha256': sha256, 'ubl_attachment_id': attachment.id})
+        return attachment
 
-        # Parse et ve güncelle
-        self._parse_ubl_and_update(ubl_bytes)
-        self.write({'details_received': True})
+    @api.autovacuum
+    def _gc_ubl_archives(self):
+        """Hiçbir faturanın göstermediği UBL arşiv eklerini sil.
 
-    def _fetch_earsiv_xml(self, earsiv_client, request_header):
-        """Tek e-arşiv faturası için ReadFromArchive ile XML çek, parse et."""
+        UBL değişince (yeniden indirme) veya ek devredilemeden fatura
+        silinince eski ek sahipsiz kalır; günlük autovacuum'da temizlenir.
+        """
+        self.env.cr.execute("""
+            SELECT a.id FROM ir_attachment a
+             WHERE a.res_model = %s
+               AND a.mimetype = 'application/gzip'
+               AND a.name LIKE '%%.xml.gz'
+               AND NOT EXISTS (
+                   SELECT 1 FROM guven_fatura f WHERE f.ubl_attachment_id = a.id
+               )
+        """, (self._name,))
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        if ids:
+            self.env['ir.attachment'].sudo().browse(ids).unlink()
+            _logger.info("[GUVEN-PARSE] %d sahipsiz UBL arşivi silindi.", len(ids))
+
+    def _load_ubl(self):
+        """Arşivdeki UBL XML bytes'ını döndür; arşiv yoksa veya boşsa None.
+
+        Raises:
+            OSError, EOFError, zlib.error: arşiv bozuksa (gzip açılamadı)
+        """
         self.ensure_one()
+        attachment = self.sudo().ubl_attachment_id
+        if not attachment:
+            return None
+        raw = attachment.raw
+        if not raw:
+            return None
+        return gzip.decompress(raw)
 
-        with earsiv_client.settings(raw_response=True):
-            raw = earsiv_client.service.ReadFromArchive(
-                REQUEST_HEADER=request_header,
-                INVOICEID=self.uuid,
-                PORTAL_DIRECTION='OUT',
-                PROFILE='XML',
-            )
+    def _drop_unreadable_archive(self):
+        """Okunamayan UBL arşivini bırak; kayıtlar izibiz'den yeniden indirilir.
 
-        root = ET.fromstring(raw.content)
+        Aynı eki gösteren diğer faturaların bağlantısı da kaldırılır, aksi
+        halde ``_store_ubl`` yeni indirilen belge için bozuk eki yeniden
+        kullanırdı. Sahipsiz kalan ek ``_gc_ubl_archives`` ile silinir.
+        """
+        records = self.sudo()
+        records.search([('ubl_attachment_id', 'in', records.ubl_attachment_id.ids)]).write({
+            'ubl_attachment_id': False, 'ubl_sha256': False,
+        })
+        self.filtered('details_received').write({'details_received': False})
 
-        # SOAP hata kontrolü
-        error_code = None
-        for elem in root.iter():
-            t = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-            if t == 'ERROR_CODE' and elem.text:
-                error_code = elem.text.strip()
-            elif t == 'ERROR_SHORT_DES' and elem.text and error_code and error_code != '0':
-                raise UserError(
-                    _("E-Arşiv fatura %s SOAP hatası: [%s] %s")
-                    % (self.invoice_id, error_code, elem.text.strip())
+    def _reparse_from_archive(self, commit_every=None):
+        """Arşivi olan kayıtları izibiz'e gitmeden yerel UBL'den yeniden parse et.
+
+        Kilitli kayıtlar atlanır. Arşivi okunamayan (boş / gzip bozuk)
+        kayıtların arşivi bırakılır (bkz. ``_drop_unreadable_archive``);
+        bunlar detay cron'unun indirme yoluna düşer. Okunan ama parse
+        edilemeyen UBL ise deneme hatası olarak kaydedilir, arşiv kalır.
+
+        Returns:
+            tuple: (başarılı, hata, arşivi okunamayan kayıtlar)
+        """
+        success = errors = 0
+        unreadable = self.browse()
+        todo = self.filtered(lambda r: r.ubl_attachment_id and not r.is_locked)
+        for idx, inv in enumerate(todo, 1):
+            try:
+                ubl_bytes = inv._load_ubl()
+            except (OSError, EOFError, zlib.error) as e:
+                _logger.warning("[GUVEN-PARSE] UBL arşivi bozuk (%s): %s", inv.invoice_id, e)
+                ubl_bytes = None
+            if ubl_bytes is None:
+                unreadable |= inv
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    inv._parse_ubl_and_update(ubl_bytes)
+                    inv._mark_details_received()
+                success += 1
+            except Exception as e:
+                errors += 1
+                inv._record_detail_failure(e)
+                _logger.warning(
+                    "[GUVEN-PARSE] Arşivden parse hatası (%s): %s", inv.invoice_id, e,
                 )
 
-        # CONTENT elementini bul (en uzun text'li element)
-        content_text = None
-        max_len = 0
-        for tag in ('CONTENT', 'INVOICE', 'HTML_CONTENT', 'INVOICE_CONTENT', 'DATA'):
-            for elem in root.iter():
-                t = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-                if t == tag and elem.text and len(elem.text.strip()) > max_len:
-                    content_text = elem.text.strip()
-                    max_len = len(content_text)
-
-        if not content_text or max_len < 100:
-            raise UserError(_("E-Arşiv fatura %s için XML içeriği alınamadı.") % self.invoice_id)
-
-        # Base64 decode
-        decoded = base64.b64decode(content_text)
-
-        # ZIP kontrolü
-        if decoded[:4] == b'PK\x03\x04':
-            with zipfile.ZipFile(io.BytesIO(decoded), 'r') as zf:
-                xml_name = next(
-                    (n for n in zf.namelist()
-                     if n.endswith('.xml') and not n.startswith('__')),
-                    zf.namelist()[0] if zf.namelist() else None,
+            if commit_every and idx % commit_every == 0:
+                self.env.cr.commit()
+
+        if unreadable:
+            unreadable._drop_unreadable_archive()
+            _logger.warning(
+                "[GUVEN-PARSE] %d faturanın UBL arşivi okunamadı, izibiz'den yeniden indirilecek.",
+                len(unreadable),
+            )
+        return success, errors, unreadable
+
+    # ==================================================================
+    # TOPLU YENİDEN PARSE (arşivden, process havuzu)
+    # ==================================================================
+
+    _REPARSE_CHECKPOINT_PARAM = 'guven_fatura_analiz.reparse_checkpoint'
+    _REPARSE_BATCH_SIZE = 500
+
+    @api.model
+    def _reparse_archive(self, domain=None, workers=None, batch_size=None, resume=True):
+        """Arşivdeki UBL'leri process havuzunda parse edip şirket bazında yaz.
+
+        Parse (saf Python, ``lib.ubl_parser``) worker process'lerde, kayıt
+        yazma bu process'te yapılır. Her batch sonunda commit edilir ve
+        şirket başına son işlenen fatura id'si ``ir.config_parameter``'a
+        checkpoint olarak yazılır; ``resume=True`` ile aynı domain için
+        kesilen çalışma kaldığı yerden devam eder. Kilitli kayıtlar atlanır.
+
+        Ara commit ve process fork'u içerdiğinden yalnızca Odoo shell
+        script'inden (``scripts/reparse_archive.py``) çağrılır; arayüzden
+        seçili kayıtlar ``action_reparse_from_archive`` ile işlem içinde
+        yeniden parse edilir.
+
+        Args:
+            domain: ek arama domain'i (varsayılan: arşivi olan tüm faturalar)
+            workers: parse process sayısı (varsayılan: CPU - 1; 1 → havuzsuz)
+            batch_size: commit/checkpoint aralığı (fatura)
+            resume: checkpoint'ten devam et
+
+        Returns:
+            dict: {'total', 'success', 'errors'}
+        """
+        domain = list(domain or [])
+        batch_size = batch_size or self._REPARSE_BATCH_SIZE
+        if workers is None:
+            workers = max(1, (os.cpu_count() or 2) - 1)
+
+        ICP = self.env['ir.config_parameter'].sudo()
+        domain_key = repr(domain)
+        checkpoint = {}
+        if resume:
+            saved = json.loads(ICP.get_param(self._REPARSE_CHECKPOINT_PARAM) or '{}')
+            if saved.get('domain') == domain_key:
+                checkpoint = saved.get('companies', {})
+
+        base_domain = [('ubl_attachment_id', '!=', False), ('is_locked', '=', False)] + domain
+        company_groups = self.sudo()._read_group(
+            base_domain, groupby=['company_id'], aggregates=['__count'],
+        )
+        total = sum(count for _company, count in company_groups)
+        stats = {'total': total, 'success': 0, 'errors': 0}
+        if not total:
+            return stats
+
+        _logger.info(
+            "[GUVEN-PARSE] Toplu yeniden parse başladı: %d fatura, %d worker", total, workers,
+        )
+        t0 = time.time()
+        done = 0
+
+        pool = None
+        if workers > 1:
+            # fork: worker'lar addon modülünü yeniden import etmez
+            pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('fork'),
+            )
+        with self._unknown_scheme_run():
+            try:
+                for company, _count in company_groups:
+                    company_key = str(company.id)
+                    last_id = checkpoint.get(company_key, 0)
+                    inv_ids = self.sudo().search(
+                        base_domain + [('company_id', '=', company.id), ('id', '>', last_id)],
+                        order='id',
+                    ).ids
+
+                    for i in range(0, len(inv_ids), batch_size):
+                        batch = self.sudo().browse(inv_ids[i:i + batch_size])
+                        items = [(inv.id, inv.ubl_attachment_id.raw) for inv in batch]
+                        if pool:
+                            chunksize = max(1, len(items) // (workers * 4))
+                            results = pool.map(parse_ubl_gz, items, chunksize=chunksize)
+                        else:
+                            results = map(parse_ubl_gz, items)
+
+                        for inv_id, parsed, error in results:
+                            inv = self.sudo().browse(inv_id)
+                            if error is None:
+                                try:
+                                    # Yarım kalan yazım batch commit'ine taşınmaz
+                                    with self.env.cr.savepoint():
+                                        inv._apply_parsed_ubl(parsed)
+                                        inv._mark_details_received()
+                                    stats['success'] += 1
+                                    continue
+                                except Exception as e:
+                                    error = str(e)
+                            stats['errors'] += 1
+                            inv._record_detail_failure(error)
+                            _logger.warning(
+                                "[GUVEN-PARSE] Yeniden parse hatası (%s): %s", inv.invoice_id, error,
+                            )
+
+                        checkpoint[company_key] = batch.ids[-1]
+                        ICP.set_param(self._REPARSE_CHECKPOINT_PARAM, json.dumps({
+                            'domain': domain_key, 'companies': checkpoint,
+                        }))
+                        self.env.cr.commit()
+                        self.env.invalidate_all()
+
+                        done += len(batch)
+                        elapsed = time.time() - t0
+                        rate = done / elapsed if elapsed else 0.0
+                        _logger.info(
+                            "[GUVEN-PARSE] %s: %d/%d (%.1f fatura/sn, kalan ~%.0f sn)",
+                            company.name if company else 'Şirketsiz', done, total, rate,
+                            (total - done) / rate if rate else 0.0,
+                        )
+            finally:
+                if pool:
+                    pool.shutdown()
+
+        # Tamamlandı: checkpoint temizlenir
+        ICP.set_param(self._REPARSE_CHECKPOINT_PARAM, False)
+        self.env.cr.commit()
+        _logger.info(
+            "[GUVEN-PARSE] Toplu yeniden parse bitti: %d başarılı, %d hata, %.1f sn",
+            stats['success'], stats['errors'], time.time() - t0,
+        )
+        return stats
+
+    # Arayüzden tek işlemde yeniden parse edilebilecek en fazla fatura;
+    # üstü için toplu script kullanılır
+    _REPARSE_ACTION_LIMIT = 2000
+
+    def action_reparse_from_archive(self):
+        """Seçili faturaları izibiz'e gitmeden arşivdeki UBL'den yeniden parse et.
+
+        HTTP isteği içinde çalışır: process havuzu açılmaz ve ara commit
+        yapılmaz; her fatura kendi savepoint'inde işlenir.
+        """
+        if not self.env.user.has_group('guven_fatura_analiz.group_muhasebe_yoneticisi'):
+            raise UserError(_("Bu işlem için Muhasebe Yöneticisi yetkisi gerekir."))
+        if not self:
+            raise UserError(_("Lütfen en az bir fatura seçin."))
+        if len(self) > self._REPARSE_ACTION_LIMIT:
+            raise UserError(_(
+                "Tek seferde en fazla %s fatura yeniden parse edilebilir. "
+                "Daha büyük seçimler için scripts/reparse_archive.py kullanın."
+            ) % self._REPARSE_ACTION_LIMIT)
+
+        todo = self.sudo().filtered(lambda r: r.ubl_attachment_id and not r.is_locked)
+        with self._unknown_scheme_run():
+            success, errors, unreadable = todo._reparse_from_archive()
+        stats = {'total': len(todo), 'success': success, 'errors': errors}
+        message = _(
+            "Arşivi olan %(total)s faturadan %(success)s başarılı, %(errors)s hata. "
+            "Arşivi olmayan veya kilitli %(missing)s fatura atlandı."
+        ) % dict(stats, missing=len(self) - stats['total'])
+        if unreadable:
+            message += " " + _(
+                "%s faturanın arşivi okunamadı; izibiz'den yeniden indirilecek."
+            ) % len(unreadable)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Yeniden Parse"),
+                'message': message,
+                'type': 'success' if not (errors or unreadable) else 'warning',
+                'sticky': False,
+            },
+        }
+
+    # ==================================================================
+    # XML FETCH + PARSE (toplu, HEADER_ONLY=N gün penceresi)
+    # ==================================================================
+
+    # Aynı gün + yönde en az bu kadar bekleyen fatura varsa toplu indirilir;
+    # altında tek UUID yolu daha ucuz (gün penceresi alınmış faturaları da getirir).
+    _BULK_DETAIL_MIN_GROUP = 5
+    # Toplu GetInvoice sayfa boyutu (CONTENT'li yanıt; fatura başına ~10-500 KB)
+    _BULK_DETAIL_PAGE_SIZE = 200
+    # Sayfa dolarsa pencere ikiye bölünür; bundan kısa pencere bölünmez
+    # (yalnızca START_DATE/END_DATE dateTime ise; aksi halde gün bölünmez)
+    _BULK_DETAIL_MIN_WINDOW = timedelta(minutes=15)
+
+    def _fetch_details_bulk(self, session, deadline=None):
+        """Bekleyen e-fatura kayıtlarının XML'ini gün penceresi başına toplu çek.
+
+        self: tek şirkete ait, details_received=False e-fatura kayıtları.
+        Kayıtlar (yön, fatura tarihi) ile gruplanır; yeterince büyük her grup
+        için HEADER_ONLY=N GetInvoice çağrısı yapılır ve dönen her INVOICE'ın
+        CONTENT'i UUID ile eşleşen kayda yönlendirilir.
+
+        Returns:
+            tuple: (toplu yanıtta gelen kayıtlar, parse hatası sayısı).
+            Toplu yanıtta gelmeyen kayıtlar kümede yer almaz; çağıran
+            bunları tek UUID yoluna düşürür. ``deadline`` geçtiyse yeni
+            pencere çağrısı yapılmaz.
+        """
+        groups = {}
+        for inv in self:
+            if inv.issue_date:
+                key = (inv.direction or 'IN', inv.issue_date)
+                groups.setdefault(key, {})[inv.uuid] = inv
+
+        handled_ids = []
+        errors = 0
+        for (direction, day), pending in sorted(groups.items(), key=lambda kv: kv[0][1], reverse=True):
+            if len(pending) < self._BULK_DETAIL_MIN_GROUP:
+                continue
+            if deadline and time.time() >= deadline:
+                break
+            try:
+                errors += self._fetch_details_window(
+                    session, direction,
+                    datetime.combine(day, datetime.min.time()),
+                    datetime.combine(day, datetime.max.time()),
+                    pending, handled_ids,
                 )
-                if not xml_name:
-                    raise UserError(
-                        _("E-Arşiv fatura %s ZIP içinde XML bulunamadı.") % self.invoice_id
-                    )
-                ubl_bytes = zf.read(xml_name)
-        else:
-            ubl_bytes = decoded
+            except Exception as e:
+                # Pencere çağrısı hatası: kalanlar tek UUID yoluna düşer
+                _logger.warning(
+                    "[GUVEN-EFATURA] Toplu detay hatası (%s, %s): %s", direction, day, e,
+                )
+            self.env.cr.commit()
+
+        return self.browse(handled_ids), errors
+
+    def _fetch_details_window(self, session, direction, start_dt, end_dt, pending, handled_ids):
+        """Tek pencere için HEADER_ONLY=N GetInvoice; CONTENT'leri kayıtlara dağıt.
+
+        ``pending`` ({uuid: kayıt}) yanıtta gelenlerden temizlenir, bunların
+        id'leri (parse hatası alınsa da) ``handled_ids``'e eklenir. Sayfa
+        dolu dönerse (LIMIT'e ulaşıldı) ve bekleyen kalan varsa pencere
+        örtüşmeyen iki yarıya bölünüp (bkz. ``_split_window``) alt pencereler
+        çekilir.
+
+        Returns:
+            int: parse hatası sayısı
+        """
+        search_key = {
+            'LIMIT': self._BULK_DETAIL_PAGE_SIZE,
+            'START_DATE': start_dt,
+            'END_DATE': end_dt,
+            'READ_INCLUDED': 'true',
+            'DIRECTION': direction,
+        }
+        raw = session.call(
+            'GetInvoice', content=True, INVOICE_SEARCH_KEY=search_key, HEADER_ONLY='N',
+        )
 
-        # NUL karakterlerini temizle
-        ubl_bytes = ubl_bytes.replace(b'\x00', b'')
+        returned = errors = 0
+        try:
+            for elem in iter_invoice_elements(open_response_stream(raw)):
+                returned += 1
+                uuid = elem.get('UUID') or header_dict(elem).get('UUID')
+                inv = pending.pop(uuid, None)
+                if inv is None:
+                    continue
+                handled_ids.append(inv.id)
+                try:
+                    inv._apply_content(find_content_text(elem), session)
+                except Exception as e:
+                    errors += 1
+                    inv._record_detail_failure(e)
+                    _logger.warning(
+                        "[GUVEN-EFATURA] Toplu detay parse hatası (%s): %s", inv.invoice_id, e,
+                    )
+        finally:
+            raw.close()
 
-        # Parse et ve güncelle
-        self._parse_ubl_and_update(ubl_bytes)
-        self.write({'details_received': True})
+        if returned < self._BULK_DETAIL_PAGE_SIZE or not pending:
+            return errors
+        halves = self._split_window(
+            start_dt, end_dt, self._sub_day_windows(session), self._BULK_DETAIL_MIN_WINDOW,
+        )
+        if halves is None:
+            _logger.info(
+                "[GUVEN-EFATURA] %s – %s toplu penceresi dolu ve bölünemiyor; "
+                "%d kayıt tek UUID yoluyla çekilecek.", start_dt, end_dt, len(pending),
+            )
+            return errors
+        for sub_start, sub_end in halves:
+            if pending:
+                errors += self._fetch_details_window(
+                    session, direction, sub_start, sub_end, pending, handled_ids,
+                )
+        return errors
 
     # ==================================================================
     # CRON: XML DETAY ÇEKME
@@ -1449,43 +1848,289 @@ class GuvenFatura(models.Model):
 
     # PostgreSQL advisory lock ID'leri (çakışma önleme).
     # Rastgele büyük sabitler — başka modüllerle çakışmaması için.
-    _LOCK_EFATURA_DETAIL = 737001
-    _LOCK_EARSIV_DETAIL = 737002
-    _LOCK_HEADER_SYNC = 737003
+    # (737001 / 737002 detay cron'larınındı; yerini satır kiralama aldı.)
+    _LOCK_HEADER_SYNC = 737003  # (737003, company_id) — şirket başına
+    _LOCK_STATUS_REFRESH = 737005  # (737005, company_id) — şirket başına
+
+    # Detay cron'larında sahiplenilen kayıtların kiralama süresi. Worker
+    # çökerse kayıtlar bu süre sonunda diğer worker'lara açılır.
+    _DETAIL_LEASE = timedelta(minutes=30)
+
+    # Başarısız detay denemeleri: 15 dk, 30 dk, 1 sa, ... (en fazla 1 gün)
+    # beklenir; _DETAIL_MAX_ATTEMPTS denemeden sonra kayıt "detay alınamadı"
+    # (dead-letter) olarak işaretlenir ve cron'lar onu artık seçmez.
+    _DETAIL_RETRY_BASE = timedelta(minutes=15)
+    _DETAIL_RETRY_MAX = timedelta(days=1)
+    _DETAIL_MAX_ATTEMPTS = 8
+    _DETAIL_RETRY_RESET = {
+        'detail_attempts': 0,
+        'detail_next_try': False,
+        'detail_dead': False,
+        'detail_last_error': False,
+    }
+
+    # Detay cron'unun tek çalışmadaki süre bütçesi (sn, sistem parametresi).
+    # Cron aralığı 2 dk; bütçe cron zaman aşımının altında kalmalı.
+    _DETAIL_TIME_BUDGET_PARAM = 'guven_fatura_analiz.detail_cron_time_budget'
+    _DETAIL_TIME_BUDGET = 100
+    # Round-robin'de şirket başına tek seferde sahiplenilen kayıt sayısı
+    _DETAIL_SLICE_SIZE = 200
+    _DETAIL_COMMIT_EVERY = 50
 
     @api.model
-    def _try_advisory_lock(self, lock_id):
+    def _transfer_summary(self, session, before):
+        """``before``'dan bu yana indirilen CONTENT / açılmış UBL özeti (log için).
+
+        Sıkıştırma kazancı (UBL − CONTENT) yalnızca şirkette sıkıştırma
+        açıkken yazılır; kapalıyken fark izibiz'in kendi ZIP'lemesidir.
+        """
+        content, ubl = (now - then for now, then in zip(session.transfer_totals(), before))
+        summary = "CONTENT %.1f KB, UBL %.1f KB" % (content / 1024, ubl / 1024)
+        if not session.compressed:
+            return summary + ", sıkıştırma kapalı"
+        saved = ubl - content
+        return summary + ", sıkıştırma kazancı: %.1f KB (%%%d)" % (
+            saved / 1024, 100 * saved / ubl if ubl else 0,
+        )
+
+    @api.model
+    def _fetch_details_round_robin(self, kaynak, fetch_method):
+        """Bekleyen detayları süre bütçesi içinde şirketler arasında sırayla çek.
+
+        Her turda bütçenin kalanı, turda sırası gelmemiş şirketlere eşit
+        bölünür; her şirket payı kadar süreyle en fazla
+        ``_DETAIL_SLICE_SIZE`` kayıtlık bir dilim işler. Böylece büyük
+        birikimi olan bir şirket diğerlerini bekletmez. Bütçe dolunca
+        işlenmemiş kayıtların kiralaması bırakılır, commit edilir ve
+        çıkılır; sonraki çalışma kaldığı yerden devam eder.
+
+        Args:
+            kaynak: 'e-fatura-izibiz' / 'e-arsiv-izibiz'
+            fetch_method: dilimi işleyen metod adı
+                (``self, company, commit_every, deadline``); ``False``
+                dönerse (örn. login hatası) şirket bu çalışmada bırakılır
+        """
+        log_tag = 'GUVEN-EARSIV' if kaynak == 'e-arsiv-izibiz' else 'GUVEN-EFATURA'
+        budget = float(self.env['ir.config_parameter'].sudo().get_param(
+            self._DETAIL_TIME_BUDGET_PARAM, self._DETAIL_TIME_BUDGET,
+        ) or self._DETAIL_TIME_BUDGET)
+        deadline = time.time() + budget
+
+        # Bekleyen faturası olan şirketleri bul
+        company_groups = self.sudo()._read_group(
+            [('details_received', '=', False), ('kaynak', '=', kaynak),
+             ('detail_dead', '=', False), ('is_locked', '=', False)],
+            groupby=['company_id'],
+            aggregates=['__count'],
+        )
+        active = [company for company, _count in company_groups if company]
+
+        while active:
+            round_companies = list(active)
+            for pos, company in enumerate(round_companies):
+                now = time.time()
+                if now >= deadline:
+                    _logger.info(
+                        "[%s] %.0f sn süre bütçesi doldu, kalanlar sonraki çalışmada.",
+                        log_tag, budget,
+                    )
+                    return
+                share_deadline = now + (deadline - now) / (len(round_companies) - pos)
+
+                # Başka worker'ların sahiplendikleri ve beklemedekiler atlanır
+                inv_set = self._claim_detail_batch(kaynak, company, self._DETAIL_SLICE_SIZE)
+                if not inv_set:
+                    active.remove(company)
+                    continue
+                try:
+                    result = getattr(inv_set, fetch_method)(
+                        company, self._DETAIL_COMMIT_EVERY, share_deadline,
+                    )
+                except Exception:
+                    # Kiralama serbest bırakılabilsin diye yarım transaction geri alınır
+                    self.env.cr.rollback()
+                    raise
+                finally:
+                    inv_set._release_detail_claims()
+                    self.env.cr.commit()
+
+                # Dilim dolmadıysa ve pay bitmeden işlendiyse vadesi gelen kalmadı
+                if result is False or (
+                    len(inv_set) < self._DETAIL_SLICE_SIZE and time.time() < share_deadline
+                ):
+                    active.remove(company)
+
+    @api.model
+    def _claim_detail_batch(self, kaynak, company, limit):
+        """Detayı bekleyen kayıtlardan bir batch'i bu worker için sahiplen.
+
+        ``FOR UPDATE SKIP LOCKED`` ile başka bir worker'ın o anda
+        sahiplendiği satırlar atlanır; seçilenlere ``detail_lease_until``
+        yazılıp hemen commit edilir. Böylece aynı anda çalışan N worker
+        ayrık batch'ler alır, aynı faturayı iki kez indirmez. Bekleme süresi
+        dolmamış, dead-letter'a düşmüş ve kilitli kayıtlar seçilmez.
+
+        Returns:
+            guven.fatura recordset (issue_date DESC)
+        """
+        now = fields.Datetime.now()
+        self.env.cr.execute("""
+            UPDATE guven_fatura SET detail_lease_until = %(until)s
+             WHERE id IN (
+                SELECT id FROM guven_fatura
+                 WHERE details_received IS NOT TRUE
+                   AND kaynak = %(kaynak)s
+                   AND company_id = %(company_id)s
+                   AND is_locked IS NOT TRUE
+                   AND (detail_lease_until IS NULL OR detail_lease_until < %(now)s)
+                   AND detail_dead IS NOT TRUE
+                   AND (detail_next_try IS NULL OR detail_next_try <= %(now)s)
+                 ORDER BY issue_date DESC
+                 LIMIT %(limit)s
+                 FOR UPDATE SKIP LOCKED
+             )
+            RETURNING id
+        """, {
+            'until': now + self._DETAIL_LEASE,
+            'now': now,
+            'kaynak': kaynak,
+            'company_id': company.id,
+            'limit': limit,
+        })
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        self.env.cr.commit()
+        self.invalidate_model(['detail_lease_until'])
+        return self.search([('id', 'in', ids)], order='issue_date DESC')
+
+    def _release_detail_claims(self):
+        """Bu worker'ın sahiplendiği kayıtların kiralamasını bırak."""
+        if not self:
+            return
+        self.env.cr.execute(
+            "UPDATE guven_fatura SET detail_lease_until = NULL WHERE id = ANY(%s)",
+            (self.ids,),
+        )
+        self.invalidate_recordset(['detail_lease_until'])
+
+    def _mark_details_received(self):
+        """Detay alındı; önceki başarısız denemelerin izini temizle."""
+        vals = {'details_received': True}
+        if any(self.mapped('detail_attempts')):
+            vals.update(self._DETAIL_RETRY_RESET)
+        self.write(vals)
+
+    def _record_detail_failure(self, error):
+        """Başarısız detay denemesini kaydet: üstel bekleme veya dead-letter."""
+        now = fields.Datetime.now()
+        message = str(error)[:500]
+        for inv in self:
+            attempts = inv.detail_attempts + 1
+            vals = {'detail_attempts': attempts, 'detail_last_error': message}
+            if attempts >= self._DETAIL_MAX_ATTEMPTS:
+                vals.update(detail_dead=True, detail_next_try=False)
+                _logger.warning(
+                    "[GUVEN-PARSE] %s: %d denemede detay alınamadı, yeniden denenmeyecek (%s)",
+                    inv.invoice_id, attempts, message,
+                )
+            else:
+                delay = min(self._DETAIL_RETRY_BASE * 2 ** (attempts - 1), self._DETAIL_RETRY_MAX)
+                vals['detail_next_try'] = now + delay
+            inv.write(vals)
+
+    def action_retry_details(self):
+        """Seçili faturaların detay bekleme/dead-letter durumunu sıfırla."""
+        if not self.env.user.has_group('guven_fatura_analiz.group_muhasebe_yoneticisi'):
+            raise UserError(_("Bu işlem için Muhasebe Yöneticisi yetkisi gerekir."))
+        self.filtered('detail_attempts').write(self._DETAIL_RETRY_RESET)
+
+    @api.model
+    def _try_advisory_lock(self, lock_id, sub_id=None):
         """PostgreSQL session-level advisory lock almayı dene.
 
         Returns True if lock acquired, False if another session holds it.
-        Lock, DB session kapandığında otomatik serbest kalır.
+        Lock, DB session kapandığında otomatik serbest kalır. ``sub_id``
+        verilirse (örn. company id) iki anahtarlı lock alınır; aynı
+        ``lock_id`` altında her alt anahtar ayrı kilitlenir.
         """
-        self.env.cr.execute("SELECT pg_try_advisory_lock(%s)", (lock_id,))
+        if sub_id is None:
+            self.env.cr.execute("SELECT pg_try_advisory_lock(%s)", (lock_id,))
+        else:
+            self.env.cr.execute("SELECT pg_try_advisory_lock(%s, %s)", (lock_id, sub_id))
         return self.env.cr.fetchone()[0]
 
     @api.model
-    def _release_advisory_lock(self, lock_id):
+    def _release_advisory_lock(self, lock_id, sub_id=None):
         """PostgreSQL session-level advisory lock'u serbest bırak."""
-        self.env.cr.execute("SELECT pg_advisory_unlock(%s)", (lock_id,))
+        if sub_id is None:
+            self.env.cr.execute("SELECT pg_advisory_unlock(%s)", (lock_id,))
+        else:
+            self.env.cr.execute("SELECT pg_advisory_unlock(%s, %s)", (lock_id, sub_id))
+
+    @api.model
+    def _process_downloads(self, download, jobs, company, commit_every, deadline=None):
+        """UBL'leri thread havuzunda indir; parse + yazma bu thread'de.
+
+        Producer/consumer: ``download`` (ORM'siz, bkz. ``lib.izibiz_download``)
+        şirketin eşzamanlılık limiti kadar worker thread'inde çalışır ve
+        base64/ZIP çözülmüş UBL bytes döndürür. Cursor'ın sahibi olan bu
+        thread (consumer) gelen payload'ları sırayla ``_apply_ubl`` ile işler
+        ve her ``commit_every`` faturada bir commit eder.
+
+        Args:
+            download: callable(*args) → UBL bytes
+            jobs: [(fatura id, download args tuple)]
+            company: res.company (eşzamanlılık limiti için)
+            commit_every: kaç faturada bir commit
+            deadline: ``time.time()`` sınırı; aşılınca yeni payload işlenmez,
+                kuyruktaki indirmeler iptal edilir
+
+        Returns:
+            tuple: (başarılı, hata)
+        """
+        workers = min(max(company.efatura_detail_concurrency or 1, 1), HTTP_POOL_SIZE)
+        success = errors = 0
+        for idx, (inv_id, ubl_bytes, exc) in enumerate(
+            iter_concurrent(download, jobs, workers), 1,
+        ):
+            if deadline and time.time() >= deadline:
+                break
+            inv = self.browse(inv_id)
+            if exc is None:
+                try:
+                    inv._apply_ubl(ubl_bytes)
+                    success += 1
+                except Exception as e:
+                    exc = e
+            if exc is not None:
+                errors += 1
+                inv._record_detail_failure(exc)
+
+            if idx % commit_every == 0:
+                self.env.cr.commit()
+        return success, errors
 
     @api.model
     def _cron_fetch_invoice_details(self):
         """details_received=False e-fatura kayıtların XML detayını çek ve parse et."""
-        if not self._try_advisory_lock(self._LOCK_EFATURA_DETAIL):
-            _logger.info("[GUVEN-EFATURA] Önceki çalışma devam ediyor, atlanıyor.")
-            return
-
         _logger.info("[GUVEN-EFATURA] Cron başladı.")
         t0 = time.time()
         try:
-            self._do_fetch_invoice_details()
+            with self._unknown_scheme_run():
+                self._do_fetch_invoice_details()
         finally:
             elapsed = time.time() - t0
             remaining = self.sudo()._read_group(
-                [('details_received', '=', False), ('kaynak', '=', 'e-fatura-izibiz')],
+                [('details_received', '=', False), ('kaynak', '=', 'e-fatura-izibiz'),
+                 ('detail_dead', '=', False)],
                 groupby=['company_id'],
                 aggregates=['__count'],
             )
+            dead = self.sudo().search_count([
+                ('details_received', '=', False), ('kaynak', '=', 'e-fatura-izibiz'),
+                ('detail_dead', '=', True),
+            ])
+            if dead:
+                _logger.warning("[GUVEN-EFATURA] Detayı alınamayan (dead-letter): %d fatura", dead)
             for company, count in remaining:
                 _logger.info(
                     "[GUVEN-EFATURA] Kalan: %d fatura [%s]",
@@ -1494,85 +2139,81 @@ class GuvenFatura(models.Model):
             if not remaining:
                 _logger.info("[GUVEN-EFATURA] Kalan: 0 fatura (tümü tamamlandı)")
             _logger.info("[GUVEN-EFATURA] Cron bitti. Süre: %.1f sn", elapsed)
-            self._release_advisory_lock(self._LOCK_EFATURA_DETAIL)
 
     @api.model
     def _do_fetch_invoice_details(self):
         """E-fatura XML detay çekme iç implementasyonu."""
-        BATCH_SIZE = 1000
-        COMMIT_EVERY = 50
-
-        # Bekleyen faturası olan şirketleri bul
-        company_groups = self.sudo()._read_group(
-            [('details_received', '=', False), ('kaynak', '=', 'e-fatura-izibiz')],
-            groupby=['company_id'],
-            aggregates=['__count'],
-        )
-        company_ids = [company.id for company, _count in company_groups if company]
-        if not company_ids:
+        self._fetch_details_round_robin('e-fatura-izibiz', '_fetch_company_invoice_details')
+
+    def _fetch_company_invoice_details(self, company, commit_every, deadline=None):
+        """Sahiplenilen e-fatura batch'inin detaylarını çek (arşiv → toplu → tekil)."""
+        inv_set = self
+        # UBL'i arşivde olanlar (örn. header değişikliği ile sıfırlananlar)
+        # izibiz'e gitmeden yerelden parse edilir; arşivi okunamayanlar indirilir.
+        archived = inv_set.filtered('ubl_attachment_id')
+        local_ok, local_err, unreadable = archived._reparse_from_archive(commit_every)
+        inv_set -= archived - unreadable
+        if not inv_set:
+            _logger.info(
+                "[GUVEN-EFATURA] %s: %d arşivden parse, %d hata",
+                company.name, local_ok, local_err,
+            )
             return
 
-        companies = self.env['res.company'].sudo().browse(company_ids)
-
-        for company in companies:
-            # Her şirket için ayrı 100'er fatura çek
-            inv_set = self.search([
-                ('details_received', '=', False),
-                ('kaynak', '=', 'e-fatura-izibiz'),
-                ('company_id', '=', company.id),
-            ], order='issue_date DESC', limit=BATCH_SIZE)
-            try:
-                client, session_id, request_header = \
-                    self._get_soap_client_and_login(company)
-            except Exception as e:
-                _logger.error(
-                    "[GUVEN-EFATURA] Login hatası [%s]: %s", company.name, e,
-                )
-                continue
-
-            success = errors = 0
-            try:
-                for idx, inv in enumerate(inv_set, 1):
-                    try:
-                        inv._fetch_and_parse_xml(client, request_header)
-                        success += 1
-                    except Exception:
-                        errors += 1
-                        continue
-
-                    if idx % COMMIT_EVERY == 0:
-                        self.env.cr.commit()
-            finally:
-                try:
-                    client.service.Logout(REQUEST_HEADER=request_header)
-                except Exception:
-                    pass
-
-            _logger.info(
-                "[GUVEN-EFATURA] %s: %d/%d başarılı, %d hata",
-                company.name, success, len(inv_set), errors,
+        try:
+            session = self._get_izibiz_session(company)
+        except Exception as e:
+            _logger.error(
+                "[GUVEN-EFATURA] Login hatası [%s]: %s", company.name, e,
             )
+            return False
+        transfer_before = session.transfer_totals()
+
+        # Önce gün penceresi başına toplu indirme; toplu yanıtta
+        # gelmeyenler (veya küçük gruplar) tek UUID yoluna düşer.
+        bulk_done, errors = inv_set._fetch_details_bulk(session, deadline)
+        success = len(bulk_done) - errors
+        jobs = [
+            (inv.id, (inv.uuid, inv.direction or 'IN'))
+            for inv in inv_set - bulk_done
+        ]
+        ok, err = self._process_downloads(
+            functools.partial(download_efatura_ubl, session),
+            jobs, company, commit_every, deadline,
+        )
+        success += ok
+        errors += err
+
+        _logger.info(
+            "[GUVEN-EFATURA] %s: %d/%d başarılı, %d hata (arşivden: %d başarılı, %d hata) | %s",
+            company.name, success, len(inv_set), errors, local_ok, local_err,
+            self._transfer_summary(session, transfer_before),
+        )
 
         self.env.cr.commit()
 
     @api.model
     def _cron_fetch_earsiv_details(self):
         """details_received=False e-arşiv kayıtların XML detayını çek ve parse et."""
-        if not self._try_advisory_lock(self._LOCK_EARSIV_DETAIL):
-            _logger.info("[GUVEN-EARSIV] Önceki çalışma devam ediyor, atlanıyor.")
-            return
-
         _logger.info("[GUVEN-EARSIV] Cron başladı.")
         t0 = time.time()
         try:
-            self._do_fetch_earsiv_details()
+            with self._unknown_scheme_run():
+                self._do_fetch_earsiv_details()
         finally:
             elapsed = time.time() - t0
             remaining = self.sudo()._read_group(
-                [('details_received', '=', False), ('kaynak', '=', 'e-arsiv-izibiz')],
+                [('details_received', '=', False), ('kaynak', '=', 'e-arsiv-izibiz'),
+                 ('detail_dead', '=', False)],
                 groupby=['company_id'],
                 aggregates=['__count'],
             )
+            dead = self.sudo().search_count([
+                ('details_received', '=', False), ('kaynak', '=', 'e-arsiv-izibiz'),
+                ('detail_dead', '=', True),
+            ])
+            if dead:
+                _logger.warning("[GUVEN-EARSIV] Detayı alınamayan (dead-letter): %d fatura", dead)
             for company, count in remaining:
                 _logger.info(
                     "[GUVEN-EARSIV] Kalan: %d fatura [%s]",
@@ -1581,64 +2222,47 @@ class GuvenFatura(models.Model):
             if not remaining:
                 _logger.info("[GUVEN-EARSIV] Kalan: 0 fatura (tümü tamamlandı)")
             _logger.info("[GUVEN-EARSIV] Cron bitti. Süre: %.1f sn", elapsed)
-            self._release_advisory_lock(self._LOCK_EARSIV_DETAIL)
 
     @api.model
     def _do_fetch_earsiv_details(self):
         """E-arşiv XML detay çekme iç implementasyonu."""
-        BATCH_SIZE = 1000
-        COMMIT_EVERY = 50
-
-        # Bekleyen faturası olan şirketleri bul
-        company_groups = self.sudo()._read_group(
-            [('details_received', '=', False), ('kaynak', '=', 'e-arsiv-izibiz')],
-            groupby=['company_id'],
-            aggregates=['__count'],
-        )
-        company_ids = [company.id for company, _count in company_groups if company]
-        if not company_ids:
+        self._fetch_details_round_robin('e-arsiv-izibiz', '_fetch_company_earsiv_details')
+
+    def _fetch_company_earsiv_details(self, company, commit_every, deadline=None):
+        """Sahiplenilen e-arşiv batch'inin detaylarını çek (arşiv → tekil)."""
+        inv_set = self
+        # UBL'i arşivde olanlar (örn. header değişikliği ile sıfırlananlar)
+        # izibiz'e gitmeden yerelden parse edilir; arşivi okunamayanlar indirilir.
+        archived = inv_set.filtered('ubl_attachment_id')
+        local_ok, local_err, unreadable = archived._reparse_from_archive(commit_every)
+        inv_set -= archived - unreadable
+        if not inv_set:
+            _logger.info(
+                "[GUVEN-EARSIV] %s: %d arşivden parse, %d hata",
+                company.name, local_ok, local_err,
+            )
             return
 
-        companies = self.env['res.company'].sudo().browse(company_ids)
-
-        for company in companies:
-            # Her şirket için ayrı 100'er fatura çek
-            inv_set = self.search([
-                ('details_received', '=', False),
-                ('kaynak', '=', 'e-arsiv-izibiz'),
-                ('company_id', '=', company.id),
-            ], order='issue_date DESC', limit=BATCH_SIZE)
-            try:
-                efatura_client, earsiv_client, session_id, request_header = \
-                    self._get_earsiv_soap_client(company)
-            except Exception as e:
-                _logger.error(
-                    "[GUVEN-EARSIV] Login hatası [%s]: %s", company.name, e,
-                )
-                continue
-
-            success = errors = 0
-            try:
-                for idx, inv in enumerate(inv_set, 1):
-                    try:
-                        inv._fetch_earsiv_xml(earsiv_client, request_header)
-                        success += 1
-                    except Exception:
-                        errors += 1
-                        continue
+        try:
+            session = self._get_izibiz_session(company)
+        except Exception as e:
+            _logger.error(
+                "[GUVEN-EARSIV] Login hatası [%s]: %s", company.name, e,
+            )
+            return False
+        transfer_before = session.transfer_totals()
 
-                    if idx % COMMIT_EVERY == 0:
-                        self.env.cr.commit()
-            finally:
-                try:
-                    efatura_client.service.Logout(REQUEST_HEADER=request_header)
-                except Exception:
-                    pass
+        success, errors = self._process_downloads(
+            functools.partial(download_earsiv_ubl, session),
+            [(inv.id, (inv.uuid,)) for inv in inv_set],
+            company, commit_every, deadline,
+        )
 
-            _logger.info(
-                "[GUVEN-EARSIV] %s: %d/%d başarılı, %d hata",
-                company.name, success, len(inv_set), errors,
-            )
+        _logger.info(
+            "[GUVEN-EARSIV] %s: %d/%d başarılı, %d hata (arşivden: %d başarılı, %d hata) | %s",
+            company.name, success, len(inv_set), errors, local_ok, local_err,
+            self._transfer_summary(session, transfer_before),
+        )
 
         self.env.cr.commit()
 
@@ -1646,70 +2270,217 @@ class GuvenFatura(models.Model):
     # CRON: HEADER SYNC (7 GÜNLÜK BLOKLAR)
     # ==================================================================
 
+    # Header sync cron'unun tek çalışmadaki süre bütçesi (cron aralığı 10 dk)
+    _HEADER_SYNC_TIME_BUDGET = 8 * 60
+    # Tek blokta bütçenin en fazla bu oranı harcanmalı
+    _HEADER_SYNC_BLOCK_TIME_SHARE = 0.5
+    # Tek SOAP çağrısında hedeflenen doluluk (LIMIT'in oranı)
+    _HEADER_SYNC_TARGET_FILL = 0.4
+    _HEADER_SYNC_MAX_BLOCK_DAYS = 31
+    # Aynı çalışmada paralel senkronize edilen şirket sayısı (sistem parametresi).
+    # Varsayılan sıralı (cron cursor'ı); >1 her thread için ayrı DB bağlantısı
+    # ve izibiz oturumu açar, db_maxconn'a göre bilinçli açılmalı.
+    _HEADER_SYNC_WORKERS_PARAM = 'guven_fatura_analiz.header_sync_workers'
+    _HEADER_SYNC_WORKERS = 1
+
     @api.model
-    def _cron_sync_headers(self):
-        """Tüm şirketler için e-fatura/e-arşiv header sync (7 günlük bloklar)."""
-        if not self._try_advisory_lock(self._LOCK_HEADER_SYNC):
-            _logger.warning("[GUVEN-SYNC] Header sync zaten çalışıyor, atlanıyor.")
-            return
+    def _learn_sync_block(self, company, days, soap_max, elapsed):
+        """Biten bloğun hacmi/süresinden şirketin sonraki blok uzunluğunu hesapla.
+
+        Günlük hacim ve gün başına süre hareketli ortalama ile öğrenilir.
+        Blok her adımda en fazla iki katına çıkar; tek çağrının LIMIT'in
+        ``_HEADER_SYNC_TARGET_FILL`` oranını ya da bloğun süre bütçesinin
+        ``_HEADER_SYNC_BLOCK_TIME_SHARE`` oranını aşmayacağı uzunlukla
+        sınırlanır. LIMIT'e yaklaşan/bütçeyi aşan blokta hemen yarıya iner.
+
+        Args:
+            days: biten bloğun gün sayısı
+            soap_max: bloktaki SOAP çağrılarından en büyük soap_count
+            elapsed: bloğun süresi (sn)
 
+        Returns:
+            dict: res.company write vals (öğrenilen alanlar + blok uzunluğu)
+        """
+        def ema(old, new):
+            return (old + new) / 2 if old else new
+
+        volume = ema(company.efatura_sync_daily_volume, soap_max / days)
+        secs = ema(company.efatura_sync_secs_per_day, elapsed / days)
+        block_time = self._HEADER_SYNC_TIME_BUDGET * self._HEADER_SYNC_BLOCK_TIME_SHARE
+
+        block = 2 * max(days, company.efatura_sync_block_days or 1)
+        if volume > 0:
+            block = min(block, int(self._HEADER_SYNC_LIMIT * self._HEADER_SYNC_TARGET_FILL / volume))
+        if secs > 0:
+            block = min(block, int(block_time / secs))
+        if soap_max >= self._HEADER_SYNC_LIMIT * 0.8 or elapsed >= block_time:
+            block = min(block, days // 2)
+
+        return {
+            'efatura_sync_block_days': max(1, min(block, self._HEADER_SYNC_MAX_BLOCK_DAYS)),
+            'efatura_sync_daily_volume': volume,
+            'efatura_sync_secs_per_day': secs,
+        }
+
+    @api.model
+    def _cron_sync_headers(self):
+        """Tüm şirketler için e-fatura/e-arşiv header sync (şirket başına uyarlanan bloklar).
+
+        Her şirket kendi advisory lock'u ``(_LOCK_HEADER_SYNC, company_id)``
+        altında senkronize edilir; böylece birden fazla cron worker'ı (veya
+        aynı çalışmadaki thread havuzu) farklı şirketleri aynı anda işler,
+        yavaş bir izibiz hesabı diğerlerini bekletmez. Varsayılan olarak
+        şirketler sırayla, cron cursor'ı ile işlenir; aynı çalışmada paralel
+        şirket sayısı ``guven_fatura_analiz.header_sync_workers`` sistem
+        parametresiyle açılır (>1 → thread başına ayrı cursor).
+
+        Her şirket başladığında bütçenin kalanından kendi payını alır (kalan
+        süre / başlamamış şirket dalgası). Şirketler en geride kalandan
+        başlayarak sıralanır; bütçe yetmeyen şirket sonraki çalışmada öne
+        geçer.
+        """
         try:
             t0 = time.time()
+            deadline = t0 + self._HEADER_SYNC_TIME_BUDGET
             today = fields.Date.today()
             companies = self.env['res.company'].sudo().search([
                 ('efatura_username', '!=', False),
                 ('efatura_password', '!=', False),
-            ])
+            ], order='efatura_sync_last_completed_date asc nulls first, '
+                     'efatura_sync_cursor_date asc nulls first, id')
+            workers = int(self.env['ir.config_parameter'].sudo().get_param(
+                self._HEADER_SYNC_WORKERS_PARAM, self._HEADER_SYNC_WORKERS,
+            ) or 1)
+            parallel = max(1, min(workers, len(companies)))
+
+            not_started = [len(companies)]
+            share_lock = threading.Lock()
+
+            def next_deadline():
+                """Başlayan şirketin payı: kalan süre / kalan dalga sayısı."""
+                with share_lock:
+                    waves = -(-not_started[0] // parallel)
+                    not_started[0] -= 1
+                now = time.time()
+                return now + max(0.0, deadline - now) / max(1, waves)
 
             total_created = total_updated = 0
+            if parallel <= 1:
+                for company in companies:
+                    created, updated = self._sync_company_headers(
+                        company, today, next_deadline(),
+                    )
+                    total_created += created
+                    total_updated += updated
+            else:
+                # Her thread kendi cursor'ı ile çalışır (bkz. _sync_company_headers_thread)
+                self.env.cr.commit()
+                with ThreadPoolExecutor(
+                    max_workers=parallel, thread_name_prefix='guven-sync',
+                ) as pool:
+                    futures = [
+                        pool.submit(
+                            self._sync_company_headers_thread, company.id, today, next_deadline,
+                        )
+                        for company in companies
+                    ]
+                    for future in futures:
+                        created, updated = future.result()
+                        total_created += created
+                        total_updated += updated
 
-            for company in companies:
-                lookback = company.efatura_sync_lookback_days or 3
-                min_start = today - timedelta(days=lookback)
+            elapsed = time.time() - t0
+            _logger.info(
+                "[GUVEN-SYNC] Cron tamamlandı. %d yeni, %d günc. Süre: %.1f sn",
+                total_created, total_updated, elapsed,
+            )
+        except Exception:
+            _logger.exception("[GUVEN-SYNC] Cron hatası")
 
-                # Bugünün turu zaten tamamlandıysa bu şirketi atla
-                last_completed = company.efatura_sync_last_completed_date
-                if last_completed and last_completed >= today:
-                    continue
+    def _sync_company_headers_thread(self, company_id, today, next_deadline):
+        """``_sync_company_headers``'ı ayrı bir DB cursor'ı ile çalıştır (worker thread).
 
-                # Cursor'ı belirle
-                cursor = company.efatura_sync_cursor_date
-                if not cursor:
-                    # İlk çalışma — lookback başlangıcından başla
-                    cursor = min_start
-                elif last_completed and last_completed < today and cursor >= today:
-                    # Yeni gün, önceki tur tamamlanmıştı — yeni tur başlat
-                    cursor = min_start
-
-                # Cursor zaten bugüne ulaştıysa turu tamamla
-                if cursor >= today:
-                    company.sudo().write({
-                        'efatura_sync_last_completed_date': today,
-                    })
-                    self.env.cr.commit()
-                    continue
+        Şirketin süre payı thread başladığında ``next_deadline()`` ile alınır.
+        """
+        try:
+            deadline = next_deadline()
+            with self.env.registry.cursor() as cr:
+                env = api.Environment(cr, self.env.uid, self.env.context)
+                company = env['res.company'].sudo().browse(company_id)
+                return env[self._name]._sync_company_headers(company, today, deadline)
+        except Exception:
+            _logger.exception("[GUVEN-SYNC] Şirket %s: thread hatası", company_id)
+            return 0, 0
 
-                block_end = min(cursor, today)
+    @api.model
+    def _sync_company_headers(self, company, today, deadline):
+        """Tek şirketin header sync turu (şirket advisory lock'u altında).
+
+        Blok başına commit eder (şirketler arası izolasyon). ``deadline``
+        geçtikten sonra yeni blok başlatılmaz.
+
+        Returns:
+            tuple: (yeni kayıt, güncellenen kayıt)
+        """
+        if not self._try_advisory_lock(self._LOCK_HEADER_SYNC, company.id):
+            _logger.info(
+                "[GUVEN-SYNC] %s: başka bir worker senkronize ediyor, atlanıyor.", company.name,
+            )
+            return 0, 0
+
+        created_total = updated_total = 0
+        try:
+            lookback = company.efatura_sync_lookback_days or 3
+            min_start = today - timedelta(days=lookback)
+
+            # Bugünün turu zaten tamamlandıysa bu şirketi atla
+            last_completed = company.efatura_sync_last_completed_date
+            if last_completed and last_completed >= today:
+                return created_total, updated_total
+
+            # Cursor'ı belirle
+            cursor = company.efatura_sync_cursor_date
+            if not cursor:
+                # İlk çalışma — lookback başlangıcından başla
+                cursor = min_start
+            elif last_completed and last_completed < today and cursor >= today:
+                # Yeni gün, önceki tur tamamlanmıştı — yeni tur başlat
+                cursor = min_start
+
+            # Cursor zaten bugüne ulaştıysa turu tamamla
+            if cursor >= today:
+                company.sudo().write({
+                    'efatura_sync_last_completed_date': today,
+                })
+                self.env.cr.commit()
+                return created_total, updated_total
+
+            # Blok uzunluğu şirket başına öğrenilir; süre bütçesi kaldıkça
+            # aynı çalışmada sonraki bloklara devam edilir.
+            while cursor < today and time.time() < deadline:
+                block_days = max(1, company.efatura_sync_block_days or 1)
+                block_end = min(cursor + timedelta(days=block_days - 1), today)
+                days = (block_end - cursor).days + 1
 
                 try:
-                    created = updated = soap_total = 0
-                    for direction in ('IN', 'OUT'):
-                        r = self._sync_efatura_headers(cursor, block_end, direction, company)
+                    t_block = time.time()
+                    created = updated = soap_total = soap_max = 0
+                    results = self._sync_company_block(company, cursor, block_end)
+                    for r in results.values():
                         created += r['created']
                         updated += r['updated']
                         soap_total += r.get('soap_count', 0)
+                        soap_max = max(soap_max, r.get('soap_count', 0))
 
-                    r = self._sync_earsiv_headers(cursor, block_end, company)
-                    created += r['created']
-                    updated += r['updated']
-                    soap_total += r.get('soap_count', 0)
+                    created_total += created
+                    updated_total += updated
 
-                    total_created += created
-                    total_updated += updated
-
-                    # Cursor'ı ilerlet
+                    # Cursor'ı ilerlet, blok uzunluğunu güncelle
                     next_cursor = block_end + timedelta(days=1)
-                    write_vals = {'efatura_sync_cursor_date': next_cursor}
+                    write_vals = self._learn_sync_block(
+                        company, days, soap_max, time.time() - t_block,
+                    )
+                    write_vals['efatura_sync_cursor_date'] = next_cursor
                     if next_cursor >= today:
                         write_vals['efatura_sync_last_completed_date'] = today
                     company.sudo().write(write_vals)
@@ -1717,9 +2488,12 @@ class GuvenFatura(models.Model):
                     self.env.cr.commit()
 
                     _logger.info(
-                        "[GUVEN-SYNC] %s: %s → %s | %d yeni, %d günc. (SOAP: %d)",
+                        "[GUVEN-SYNC] %s: %s → %s | %d yeni, %d günc. (SOAP: %d) "
+                        "| sonraki blok: %d gün",
                         company.name, cursor, block_end, created, updated, soap_total,
+                        write_vals['efatura_sync_block_days'],
                     )
+                    cursor = next_cursor
                 except Exception:
                     _logger.exception(
                         "[GUVEN-SYNC] %s: Sync hatası, sonraki şirkete geçiliyor",
@@ -1727,17 +2501,173 @@ class GuvenFatura(models.Model):
                     )
                     self.env.cr.rollback()
                     self.env.invalidate_all()
-                    continue
+                    break
+        finally:
+            self._release_advisory_lock(self._LOCK_HEADER_SYNC, company.id)
+        return created_total, updated_total
 
-            elapsed = time.time() - t0
-            _logger.info(
-                "[GUVEN-SYNC] Cron tamamlandı. %d yeni, %d günc. Süre: %.1f sn",
-                total_created, total_updated, elapsed,
+    # ==================================================================
+    # CRON: DURUM GÜNCELLEME (yalnızca status_code)
+    # ==================================================================
+
+    # Bu durumlardan sonra fatura durumu değişmez; sorgulanmaz.
+    #   E-Fatura: geçersiz durumlar (ret/hata) + kabul/başarılı durumlar
+    #             (132 Kabul Edildi, 133 Otomatik Kabul / yanıt süresi doldu).
+    #             Kabul kodları izibiz hesabına göre değişebildiği için sistem
+    #             parametresiyle (virgülle ayrılmış kodlar) değiştirilebilir.
+    #   E-Arşiv: 130 Raporlandı (sonraki iptal ayrı IPTAL kaydı olarak gelir)
+    #            + geçersiz durumlar
+    _EFATURA_FINAL_STATUS = _EFATURA_INVALID_STATUS
+    _EFATURA_ACCEPTED_STATUS = frozenset(('132', '133'))
+    _EFATURA_ACCEPTED_STATUS_PARAM = 'guven_fatura_analiz.efatura_accepted_status_codes'
+    _EARSIV_FINAL_STATUS = _EARSIV_INVALID_STATUS | {'130'}
+    # Bu kadar günden eski e-arşiv faturaları (iptal süresi geçmiş) sorgulanmaz
+    _STATUS_REFRESH_DAYS = 15
+    # E-Fatura: yalnızca TICARIFATURA alıcı yanıtıyla (kabul/ret) değişir ve
+    # yanıt süresi 8 gündür; diğer profiller yalnızca iletim sırasında
+    # (GİB/alıcıya gönderim hatası) değişir.
+    _EFATURA_RESPONSE_DAYS = 8
+    _EFATURA_DELIVERY_DAYS = 2
+    # Tek durum sorgusundaki UUID sayısı
+    _STATUS_REFRESH_BATCH = 100
+    _STATUS_REFRESH_TIME_BUDGET = 4 * 60
+
+    @api.model
+    def _efatura_final_status(self):
+        """Geçersiz durumlar + kabul/başarılı kodlar.
+
+        Sistem parametresi tanımlıysa kabul kodları olarak varsayılanın
+        (``_EFATURA_ACCEPTED_STATUS``) yerine onun kodları kullanılır.
+        """
+        param = self.env['ir.config_parameter'].sudo().get_param(
+            self._EFATURA_ACCEPTED_STATUS_PARAM,
+        )
+        accepted = self._EFATURA_ACCEPTED_STATUS if param is False else {
+            code.strip() for code in param.split(',') if code.strip()
+        }
+        return self._EFATURA_FINAL_STATUS | accepted
+
+    @api.model
+    def _status_refresh_domain(self, kaynak, company, today):
+        """Durumu hâlâ değişebilecek (nihai olmayan, yeni) faturalar."""
+        if kaynak == 'e-arsiv-izibiz':
+            final = self._EARSIV_FINAL_STATUS
+            date_domain = [
+                ('issue_date', '>=', today - timedelta(days=self._STATUS_REFRESH_DAYS)),
+            ]
+        else:
+            final = self._efatura_final_status()
+            date_domain = [
+                '|',
+                '&', ('profile_id', '=', 'TICARIFATURA'),
+                ('issue_date', '>=', today - timedelta(days=self._EFATURA_RESPONSE_DAYS)),
+                ('issue_date', '>=', today - timedelta(days=self._EFATURA_DELIVERY_DAYS)),
+            ]
+        return [
+            ('kaynak', '=', kaynak),
+            ('company_id', '=', company.id),
+            ('is_locked', '=', False),
+            ('is_cancellation', '=', False),
+            *date_domain,
+            '|', ('status_code', '=', False), ('status_code', 'not in', list(final)),
+        ]
+
+    @api.model
+    def _cron_refresh_statuses(self):
+        """Nihai olmayan durumdaki son faturaların yalnızca durumunu güncelle.
+
+        Header sync'in geriye dönük penceresini yeniden indirmeden ret (120),
+        raporlanmadan iptal (150) gibi durum değişikliklerini yakalar. Sadece
+        ``status_code`` / ``status_description`` yazılır; ``gvn_active``
+        bunlardan yeniden hesaplanır, diğer header alanlarına dokunulmaz.
+        Durumu değişen kaydın ``header_hash``'i silinir: sonraki header sync
+        kaydı alan alan karşılaştırıp özeti yeniden yazar.
+        """
+        _logger.info("[GUVEN-SYNC] Durum güncelleme cron başladı.")
+        t0 = time.time()
+        today = fields.Date.today()
+        companies = self.env['res.company'].sudo().search([
+            ('efatura_username', '!=', False),
+            ('efatura_password', '!=', False),
+        ])
+        total_checked = total_changed = 0
+        for company in companies:
+            if time.time() - t0 >= self._STATUS_REFRESH_TIME_BUDGET:
+                _logger.info("[GUVEN-SYNC] Durum güncelleme: süre bütçesi doldu.")
+                break
+            if not self._try_advisory_lock(self._LOCK_STATUS_REFRESH, company.id):
+                continue
+            try:
+                checked, changed = self.sudo()._refresh_company_statuses(company, today, t0)
+                total_checked += checked
+                total_changed += changed
+            except Exception:
+                _logger.exception(
+                    "[GUVEN-SYNC] %s: durum güncelleme hatası, sonraki şirkete geçiliyor",
+                    company.name,
+                )
+                self.env.cr.rollback()
+                self.env.invalidate_all()
+            finally:
+                self._release_advisory_lock(self._LOCK_STATUS_REFRESH, company.id)
+
+        _logger.info(
+            "[GUVEN-SYNC] Durum güncelleme cron bitti: %d sorgulandı, %d değişti. Süre: %.1f sn",
+            total_checked, total_changed, time.time() - t0,
+        )
+
+    def _refresh_company_statuses(self, company, today, t0):
+        """Tek şirketin nihai olmayan faturalarının durumunu batch'ler halinde sorgula.
+
+        Returns:
+            tuple: (sorgulanan, durumu değişen)
+        """
+        session = self._get_izibiz_session(company)
+        checked = changed = 0
+        for kaynak, fetch in (
+            ('e-fatura-izibiz', functools.partial(fetch_efatura_statuses, session)),
+            ('e-arsiv-izibiz', functools.partial(fetch_earsiv_statuses, session)),
+        ):
+            records = self.search_fetch(
+                self._status_refresh_domain(kaynak, company, today),
+                ['uuid', 'status_code', 'status_description'],
+                order='issue_date DESC',
             )
-        except Exception:
-            _logger.exception("[GUVEN-SYNC] Cron hatası")
-        finally:
-            self._release_advisory_lock(self._LOCK_HEADER_SYNC)
+            for i in range(0, len(records), self._STATUS_REFRESH_BATCH):
+                if time.time() - t0 >= self._STATUS_REFRESH_TIME_BUDGET:
+                    return checked, changed
+                batch = records[i:i + self._STATUS_REFRESH_BATCH]
+                by_uuid = {rec.uuid: rec for rec in batch}
+                entries = fetch(list(by_uuid))
+                if not entries:
+                    # Yanıt yapısı iter_status_entries'in beklediğinden farklı
+                    # olabilir; aynı sonuç için diğer batch'ler sorgulanmaz.
+                    _logger.warning(
+                        "[GUVEN-SYNC] %s: %s durum yanıtında %d UUID için hiç kayıt "
+                        "bulunamadı (yanıt yapısı beklenenden farklı olabilir); "
+                        "kalan batch'ler atlanıyor.",
+                        company.name, kaynak, len(by_uuid),
+                    )
+                    break
+                groups = {}
+                for uuid, status, description in entries:
+                    rec = by_uuid.get(uuid)
+                    if rec is None or rec.status_code == status:
+                        continue
+                    # header_hash silinir: özet durum kodunu da kapsar
+                    vals = {'status_code': status, 'header_hash': False}
+                    if description:
+                        vals['status_description'] = description
+                    groups.setdefault(tuple(sorted(vals.items())), []).append(rec.id)
+                    _logger.info(
+                        "[GUVEN-SYNC] %s durum: %s → %s", uuid, rec.status_code, status,
+                    )
+                for vals_items, ids in groups.items():
+                    self.browse(ids).write(dict(vals_items))
+                    changed += len(ids)
+                checked += len(batch)
+                self.env.cr.commit()
+        return checked, changed
 
     # ==================================================================
     # LOGO EŞLEŞTİRME
@@ -1,5 +1,16 @@
 from odoo import fields, models
 
+TAX_TYPE_SELECTION = [
+    ('kdv', 'KDV'),
+    ('withholding', 'Tevkifat'),
+    ('bsmv', 'BSMV'),
+    ('konaklama', 'Konaklama Vergisi'),
+    ('tuketim', 'Tüketim Vergisi'),
+    ('oiv', 'Özel İletişim Vergisi'),
+    ('damga', 'Damga Vergisi'),
+    ('diger', 'Diğer'),
+]
+
 
 class GuvenFaturaTax(models.Model):
     _name = 'guven.fatura.tax'
@@ -15,16 +26,7 @@ class GuvenFaturaTax(models.Model):
         ondelete='cascade',
     )
     tax_type = fields.Selection(
-        [
-            ('kdv', 'KDV'),
-            ('withholding', 'Tevkifat'),
-            ('bsmv', 'BSMV'),
-            ('konaklama', 'Konaklama Vergisi'),
-            ('tuketim', 'Tüketim Vergisi'),
-            ('oiv', 'Özel İletişim Vergisi'),
-            ('damga', 'Damga Vergisi'),
-            ('diger', 'Diğer'),
-        ],
+        TAX_TYPE_SELECTION,
         string='Vergi Tipi',
     )
     taxable_amount = fields.Float(string='Matrah (Döviz)', digits=(16, 8))
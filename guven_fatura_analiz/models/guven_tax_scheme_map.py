@@ -0,0 +1,161 @@
+import logging
+
+import psycopg2
+
+from odoo import api, fields, models, tools
+
+from ..lib.ubl_parser import normalize_scheme_name
+from .guven_fatura_tax import TAX_TYPE_SELECTION
+
+_logger = logging.getLogger(__name__)
+
+
+class GuvenTaxSchemeMap(models.Model):
+    """UBL TaxScheme → vergi tipi eşleştirmeleri (kod deploy'u gerektirmez).
+
+    Parser'ın yerleşik haritası (``lib.ubl_parser.SCHEME_ID_MAP`` /
+    ``SCHEME_NAME_MAP``) tanımadığı scheme'ler detay cron'larında buraya
+    vergi tipi boş olarak eklenir; muhasebe vergi tipini seçtiğinde sonraki
+    parse'larda bu eşleştirme yerleşik haritanın önüne geçer.
+    """
+
+    _name = 'guven.tax.scheme.map'
+    _description = 'Vergi Şeması Eşleştirme'
+    _order = 'tax_type nulls first, seen_count desc, scheme_name'
+
+    scheme_id = fields.Char(
+        string='Scheme ID',
+        help="UBL TaxScheme/ID (örn: 0015). Boşsa yalnızca isimle eşleşir.",
+    )
+    scheme_name = fields.Char(
+        string='Scheme Adı',
+        help="UBL TaxScheme/Name (büyük harfe çevrilip boşlukları "
+             "tekleştirilerek saklanır). Boşsa yalnızca ID ile eşleşir.",
+    )
+    tax_type = fields.Selection(
+        TAX_TYPE_SELECTION,
+        string='Vergi Tipi',
+        help="Boş bırakılan kayıtlar eşleştirmede kullanılmaz "
+             "(henüz sınıflandırılmamış bilinmeyen scheme).",
+    )
+    active = fields.Boolean(default=True)
+    seen_count = fields.Integer(
+        string='Görülme Sayısı',
+        readonly=True,
+        help='Detay cron\'larında eşlenemeden görüldüğü fatura vergi satırı sayısı.',
+    )
+    last_seen = fields.Datetime(string='Son Görülme', readonly=True)
+
+    # Boş ID/Ad NULL saklanır; düz UNIQUE NULL'ları farklı saydığı için
+    # eşsizlik COALESCE üzerinden tanımlanır
+    _unique_scheme = models.UniqueIndex(
+        "(COALESCE(scheme_id, ''), COALESCE(scheme_name, ''))",
+        'Bu Scheme ID / Adı için zaten bir eşleştirme var.',
+    )
+
+    _MAPPING_FIELDS = ('scheme_id', 'scheme_name', 'tax_type', 'active')
+
+    @api.model
+    def _normalize_vals(self, vals):
+        vals = dict(vals)
+        if 'scheme_id' in vals:
+            vals['scheme_id'] = (vals['scheme_id'] or '').strip() or False
+        if 'scheme_name' in vals:
+            vals['scheme_name'] = normalize_scheme_name(vals['scheme_name']) or False
+        return vals
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create([self._normalize_vals(v) for v in vals_list])
+        # Vergi tipi boş kayıtlar (bilinmeyen scheme kaydı) eşleştirmeyi değiştirmez
+        if any(vals.get('tax_type') for vals in vals_list):
+            self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        res = super().write(self._normalize_vals(vals))
+        if any(f in vals for f in self._MAPPING_FIELDS):
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+    # ------------------------------------------------------------------
+    # Eşleştirme
+    # ------------------------------------------------------------------
+
+    @api.model
+    @tools.ormcache()
+    def _get_scheme_mapping(self):
+        """{(scheme_id, scheme_name): tax_type} — worker başına bir kez yüklenir.
+
+        Kayıt eklenince/düzenlenince registry cache'i temizlenir (diğer
+        worker'lara da sinyallenir).
+        """
+        mapping = {}
+        for rec in self.sudo().search_read(
+            [('tax_type', '!=', False)], ['scheme_id', 'scheme_name', 'tax_type'],
+        ):
+            mapping[(rec['scheme_id'] or '', rec['scheme_name'] or '')] = rec['tax_type']
+        return mapping
+
+    @api.model
+    def _resolve(self, mapping, scheme_id, scheme_name):
+        """Öğrenilmiş eşleştirme: ID+Ad → yalnızca Ad → yalnızca ID; yoksa None."""
+        if not mapping:
+            return None
+        return (
+            mapping.get((scheme_id, scheme_name))
+            or (scheme_name and mapping.get(('', scheme_name)))
+            or (scheme_id and mapping.get((scheme_id, '')))
+            or None
+        )
+
+    @api.model
+    def _record_unknown(self, counter):
+        """Çalışma boyunca biriken bilinmeyen scheme sayaçlarını tabloya işle.
+
+        Args:
+            counter: {(scheme_id, scheme_name): adet}
+        """
+        if not counter:
+            return
+        _logger.warning(
+            "[GUVEN-PARSE] Bilinmeyen TaxScheme'ler (%d çeşit, %d vergi satırı): %s",
+            len(counter), sum(counter.values()),
+            ', '.join(f"{sid or '-'}/{name or '-'}×{n}" for (sid, name), n in counter.most_common()),
+        )
+        Map = self.sudo().with_context(active_test=False)
+        now = fields.Datetime.now()
+
+        def existing():
+            return {
+                (rec.scheme_id or '', rec.scheme_name or ''): rec
+                for rec in Map.search([])
+            }
+
+        def bump(rec, count):
+            # Sayaç alanları eşleştirmeyi değiştirmez → cache temizlenmez
+            rec.write({'seen_count': rec.seen_count + count, 'last_seen': now})
+
+        by_key = existing()
+        for (scheme_id, scheme_name), count in counter.items():
+            rec = by_key.get((scheme_id, scheme_name))
+            if rec:
+                bump(rec, count)
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    Map.create({
+                        'scheme_id': scheme_id or False,
+                        'scheme_name': scheme_name or False,
+                        'seen_count': count,
+                        'last_seen': now,
+                    })
+            except psycopg2.errors.UniqueViolation:
+                # Paralel cron aynı scheme'i az önce ekledi
+                by_key = existing()
+                bump(by_key[(scheme_id, scheme_name)], count)
@@ -47,12 +47,35 @@ class ResCompany(models.Model):
         default='https://earsivws.izibiz.com.tr/EIArchiveWS/EFaturaArchive?wsdl',
         help='E-Arşiv SOAP Web Service URL',
     )
+    efatura_session_ttl = fields.Integer(
+        string='izibiz Oturum Süresi (Dk)',
+        default=20,
+        help='izibiz SESSION_ID bu süre boyunca sync, detay çekme ve '
+             'doğrulama işlemleri arasında paylaşılır; süre dolunca veya '
+             'oturum hatası alınınca otomatik yeniden login olunur.',
+    )
+    efatura_detail_concurrency = fields.Integer(
+        string='Paralel XML İndirme',
+        default=4,
+        help="Detay cron'larında izibiz'den aynı anda indirilecek fatura XML "
+             "sayısı (1-10). Parse ve veritabanı yazma her zaman tek "
+             "thread'de yapılır.",
+    )
+    efatura_compressed = fields.Boolean(
+        string='Sıkıştırılmış İndirme',
+        default=False,
+        help="izibiz'den fatura içeriği (CONTENT) sıkıştırılmış (ZIP) istenir "
+             "(REQUEST_HEADER COMPRESSED=Y, yalnızca detay indirme çağrılarında). "
+             "Ağ trafiğini azaltır; kazanılan bayt detay cron loglarına yazılır.",
+    )
     efatura_sync_lookback_days = fields.Integer(
         string='Geriye Dönük Güncelleme (Gün)',
         default=3,
         help='izibiz senkronizasyonunda, bugünden kaç gün geriye gidilerek '
              'mevcut kayıtlar güncellenecek. Örneğin 3 girilirse, '
-             'son 3 günün faturaları her senkronizasyonda kontrol edilir.',
+             'son 3 günün faturaları her senkronizasyonda kontrol edilir. '
+             'Yalnızca durum (ret/iptal) değişiklikleri için "Durum Güncelleme" '
+             'cron\'u yeterlidir; bu pencere kısa tutulabilir.',
     )
 
     # ==================================================================
@@ -132,6 +155,23 @@ class ResCompany(models.Model):
         help='Header sync cron en son bu tarih için tam bir tur tamamladı. '
              'Yeni gün başladığında sıfırlanır. Sistem tarafından otomatik yönetilir.',
     )
+    efatura_sync_block_days = fields.Integer(
+        string='Sync Blok Uzunluğu (Gün)',
+        default=1,
+        help='Header sync cron\'unun tek seferde sorguladığı gün sayısı. '
+             'Önceki blokların fatura hacmi ve süresine göre büyütülüp '
+             'küçültülür. Sistem tarafından otomatik yönetilir.',
+    )
+    efatura_sync_daily_volume = fields.Float(
+        string='Öğrenilen Günlük Fatura Hacmi',
+        help='Header sync\'te tek SOAP çağrısının gün başına döndürdüğü '
+             'fatura sayısı (hareketli ortalama). Sistem tarafından otomatik yönetilir.',
+    )
+    efatura_sync_secs_per_day = fields.Float(
+        string='Öğrenilen Gün Başına Süre (sn)',
+        help='Header sync\'te bir günlük pencerenin işlenme süresi '
+             '(hareketli ortalama). Sistem tarafından otomatik yönetilir.',
+    )
 
     # ==================================================================
     # HELPER METHODS
@@ -177,41 +217,25 @@ class ResCompany(models.Model):
     # CONNECTION TEST BUTTONS
     # ==================================================================
     def action_test_efatura_connection(self):
-        """Test E-Fatura SOAP connection using zeep."""
+        """Test E-Fatura SOAP connection using the shared SOAP transport."""
         self.ensure_one()
         if not self.has_efatura_credentials():
             raise UserError(_("E-Fatura kullanıcı adı ve şifre alanları doldurulmalıdır."))
 
         try:
-            from zeep import Client
-            from zeep.transports import Transport
-            from requests import Session
-
-            session = Session()
-            session.verify = True
-            transport = Transport(session=session, timeout=15)
-            client = Client(self.efatura_ws, transport=transport)
+            # Sync/cron ile aynı process cache'i (WSDL tekrar derlenmez)
+            transport = self.env['guven.fatura']._get_soap_transport(self.efatura_ws)
             # Attempt a login call to verify credentials
-            login_response = client.service.Login(
-                REQUEST_HEADER={
-                    'SESSION_ID': '',
-                    'APPLICATION_NAME': 'Odoo',
-                    'COMPRESSED': 'N',
-                },
-                USER_NAME=self.efatura_username,
-                PASSWORD=self.efatura_password,
+            request_header = {
+                'SESSION_ID': '',
+                'APPLICATION_NAME': 'Odoo',
+                'COMPRESSED': 'N',
+            }
+            session_id = transport.login(
+                request_header, self.efatura_username, self.efatura_password,
             )
-            session_id = ''
-            if hasattr(login_response, 'SESSION_ID'):
-                session_id = login_response.SESSION_ID
             # Logout to clean up session
-            if session_id:
-                try:
-                    client.service.Logout(
-                        REQUEST_HEADER={'SESSION_ID': session_id},
-                    )
-                except Exception:
-                    pass
+            transport.logout(dict(request_header, SESSION_ID=session_id))
 
             return {
                 'type': 'ir.actions.client',
@@ -223,11 +247,6 @@ class ResCompany(models.Model):
                     'sticky': False,
                 },
             }
-        except ImportError:
-            raise UserError(_(
-                "zeep kütüphanesi yüklü değil. "
-                "Lütfen 'pip install zeep' komutuyla yükleyin."
-            ))
         except Exception as e:
             raise UserError(_("E-Fatura bağlantı hatası: %s") % str(e))
 
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+UBL Parser Benchmark
+====================
+Sentetik eczane faturası (çok satırlı, satır başına KDV + bazılarında
+tevkifat/iskonto) üretip ``lib.ubl_parser.parse_ubl`` süresini ölçer.
+Satır sayısı ikiye katlandıkça sürenin de ~ikiye katlanması (lineer
+ölçeklenme) beklenir; ``ms/satır`` sütunu sabit kalmalıdır.
+
+Kullanım (Odoo gerektirmez):
+    python3 scripts/bench_ubl_parser.py            # 250 → 4000 satır
+    python3 scripts/bench_ubl_parser.py 2000       # tek boyut
+"""
+import importlib.util
+import os
+import sys
+import time
+import types
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CAC = 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2'
+CBC = 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2'
+
+
+def _load_parser():
+    """lib.ubl_parser'ı addon paketini (ve Odoo'yu) import etmeden yükle."""
+    pkg_name = '_guven_bench'
+    for name, path in ((pkg_name, ADDON_DIR), (f'{pkg_name}.lib', os.path.join(ADDON_DIR, 'lib'))):
+        module = types.ModuleType(name)
+        module.__path__ = [path]
+        sys.modules[name] = module
+    spec = importlib.util.spec_from_file_location(
+        f'{pkg_name}.lib.ubl_parser', os.path.join(ADDON_DIR, 'lib', 'ubl_parser.py'),
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_pharmacy_invoice(n_lines):
+    """n_lines kalemli sentetik UBL-TR eczane faturası (bytes)."""
+    parts = [
+        f'<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2" '
+        f'xmlns:cac="{CAC}" xmlns:cbc="{CBC}">',
+        '<cbc:UBLVersionID>2.1</cbc:UBLVersionID>',
+        '<cbc:ProfileID>TICARIFATURA</cbc:ProfileID>',
+        '<cbc:ID>ECZ2025000000001</cbc:ID>',
+        '<cbc:IssueDate>2025-01-15</cbc:IssueDate>',
+        '<cbc:IssueTime>14:30:00.0000000+03:00</cbc:IssueTime>',
+        '<cbc:Note>#SIPARIS-123456</cbc:Note>',
+        '<cbc:Note>Yalnız yüz bin Türk Lirası</cbc:Note>',
+        '<cbc:DocumentCurrencyCode>TRY</cbc:DocumentCurrencyCode>',
+        '<cac:AccountingSupplierParty><cac:Party>'
+        '<cac:PartyIdentification><cbc:ID schemeID="VKN">1234567890</cbc:ID></cac:PartyIdentification>'
+        '<cac:PartyName><cbc:Name>ÖRNEK ECZA DEPOSU A.Ş.</cbc:Name></cac:PartyName>'
+        '<cac:PostalAddress><cbc:StreetName>Atatürk Cad.</cbc:StreetName>'
+        '<cbc:CityName>ANKARA</cbc:CityName></cac:PostalAddress>'
+        '</cac:Party></cac:AccountingSupplierParty>',
+        '<cac:AccountingCustomerParty><cac:Party>'
+        '<cac:PartyIdentification><cbc:ID schemeID="VKN">9876543210</cbc:ID></cac:PartyIdentification>'
+        '<cac:PartyName><cbc:Name>GÜVEN HASTANESİ</cbc:Name></cac:PartyName>'
+        '</cac:Party></cac:AccountingCustomerParty>',
+    ]
+
+    total_base = total_tax = 0.0
+    for i in range(1, n_lines + 1):
+        qty = (i % 7) + 1
+        price = 12.5 + (i % 50)
+        base = qty * price
+        percent = 10 if i % 3 else 20
+        tax = round(base * percent / 100, 2)
+        total_base += base
+        total_tax += tax
+        allowance = (
+            f'<cac:AllowanceCharge><cbc:ChargeIndicator>false</cbc:ChargeIndicator>'
+            f'<cbc:Amount currencyID="TRY">{base * 0.05:.2f}</cbc:Amount></cac:AllowanceCharge>'
+            if i % 4 == 0 else ''
+        )
+        withholding = (
+            f'<cac:WithholdingTaxTotal><cbc:TaxAmount currencyID="TRY">{tax / 2:.2f}</cbc:TaxAmount>'
+            f'<cac:TaxSubtotal><cbc:TaxableAmount currencyID="TRY">{tax:.2f}</cbc:TaxableAmount>'
+            f'<cbc:TaxAmount currencyID="TRY">{tax / 2:.2f}</cbc:TaxAmount><cbc:Percent>50</cbc:Percent>'
+            f'<cac:TaxCategory><cac:TaxScheme><cbc:Name>KDV TEVKİFAT</cbc:Name>'
+            f'<cbc:TaxTypeCode>601</cbc:TaxTypeCode></cac:TaxScheme></cac:TaxCategory>'
+            f'</cac:TaxSubtotal></cac:WithholdingTaxTotal>'
+            if i % 25 == 0 else ''
+        )
+        parts.append(
+            f'<cac:InvoiceLine>'
+            f'<cbc:ID>{i}</cbc:ID>'
+            f'<cbc:Note>Parti: LOT{i:06d} SKT: 2027-12</cbc:Note>'
+            f'<cbc:InvoicedQuantity unitCode="C62">{qty}</cbc:InvoicedQuantity>'
+            f'<cbc:LineExtensionAmount currencyID="TRY">{base:.2f}</cbc:LineExtensionAmount>'
+            f'{allowance}'
+            f'<cac:TaxTotal><cbc:TaxAmount currencyID="TRY">{tax:.2f}</cbc:TaxAmount>'
+            f'<cac:TaxSubtotal><cbc:TaxableAmount currencyID="TRY">{base:.2f}</cbc:TaxableAmount>'
+            f'<cbc:TaxAmount currencyID="TRY">{tax:.2f}</cbc:TaxAmount><cbc:Percent>{percent}</cbc:Percent>'
+            f'<cac:TaxCategory><cac:TaxScheme><cbc:ID>0015</cbc:ID><cbc:Name>KDV</cbc:Name>'
+            f'</cac:TaxScheme></cac:TaxCategory></cac:TaxSubtotal></cac:TaxTotal>'
+            f'{withholding}'
+            f'<cac:Item><cbc:Description>Kutu 20 tablet</cbc:Description>'
+            f'<cbc:Name>PARASETAMOL 500 MG TABLET {i}</cbc:Name>'
+            f'<cac:SellersItemIdentification><cbc:ID>869{i:010d}</cbc:ID></cac:SellersItemIdentification>'
+            f'<cac:AdditionalItemIdentification><cbc:ID schemeID="KAREKOD">0108699{i:07d}</cbc:ID>'
+            f'</cac:AdditionalItemIdentification></cac:Item>'
+            f'<cac:Price><cbc:PriceAmount currencyID="TRY">{price:.2f}</cbc:PriceAmount></cac:Price>'
+            f'</cac:InvoiceLine>'
+        )
+
+    parts.insert(9, (
+        f'<cac:TaxTotal><cbc:TaxAmount currencyID="TRY">{total_tax:.2f}</cbc:TaxAmount>'
+        f'<cac:TaxSubtotal><cbc:TaxableAmount currencyID="TRY">{total_base:.2f}</cbc:TaxableAmount>'
+        f'<cbc:TaxAmount currencyID="TRY">{total_tax:.2f}</cbc:TaxAmount>'
+        f'<cac:TaxCategory><cac:TaxScheme><cbc:ID>0015</cbc:ID><cbc:Name>KDV</cbc:Name>'
+        f'</cac:TaxScheme></cac:TaxCategory></cac:TaxSubtotal></cac:TaxTotal>'
+        f'<cac:LegalMonetaryTotal>'
+        f'<cbc:LineExtensionAmount currencyID="TRY">{total_base:.2f}</cbc:LineExtensionAmount>'
+        f'<cbc:TaxExclusiveAmount currencyID="TRY">{total_base:.2f}</cbc:TaxExclusiveAmount>'
+        f'<cbc:TaxInclusiveAmount currencyID="TRY">{total_base + total_tax:.2f}</cbc:TaxInclusiveAmount>'
+        f'<cbc:PayableAmount currencyID="TRY">{total_base + total_tax:.2f}</cbc:PayableAmount>'
+        f'</cac:LegalMonetaryTotal>'
+    ))
+    parts.append('</Invoice>')
+    return ''.join(parts).encode('utf-8')
+
+
+def bench(parser, n_lines, repeat=3):
+    """En iyi ``repeat`` ölçümün süresi (sn) ve parse sonucu."""
+    data = build_pharmacy_invoice(n_lines)
+    best = float('inf')
+    parsed = None
+    for _i in range(repeat):
+        t0 = time.perf_counter()
+        parsed = parser.parse_ubl(data)
+        best = min(best, time.perf_counter() - t0)
+    return best, len(data), parsed
+
+
+def main(argv):
+    parser = _load_parser()
+    sizes = [int(a) for a in argv] or [250, 500, 1000, 2000, 4000]
+
+    print(f"{'satır':>6} {'boyut (KB)':>11} {'süre (ms)':>10} {'ms/satır':>9}")
+    for n in sizes:
+        elapsed, size, parsed = bench(parser, n)
+        assert len(parsed.lines) == n, (len(parsed.lines), n)
+        print(f"{n:>6} {size / 1024:>11.0f} {elapsed * 1000:>10.1f} {elapsed * 1000 / n:>9.3f}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
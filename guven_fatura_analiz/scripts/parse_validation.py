@@ -11,16 +11,17 @@ Her şirketten rastgele e-fatura ve e-arşiv faturaları çekip:
 Kullanım: Odoo shell içinden çalıştırılır.
 """
 
-import base64
-import io
 import logging
 import random
-import re
 import time
-import zipfile
 from collections import defaultdict
 from datetime import datetime
-from xml.etree import ElementTree as ET
+
+from odoo.addons.guven_fatura_analiz.lib.izibiz_download import (
+    download_earsiv_ubl,
+    download_efatura_ubl,
+)
+from odoo.addons.guven_fatura_analiz.lib.ubl_parser import parse_ubl
 
 _logger = logging.getLogger(__name__)
 
@@ -111,33 +112,21 @@ def run(env):
             rpt(f"#### {kaynak.upper()} - {sample_size} fatura seçildi")
             rpt("")
 
-            # SOAP bağlantısı
+            # SOAP bağlantısı (sync/cron ile paylaşılan oturum havuzu)
             try:
-                if kaynak == 'e-fatura-izibiz':
-                    client, session_id, req_header = Fatura._get_soap_client_and_login(company)
-                    soap_logout_client = client
-                else:
-                    ef_client, ea_client, session_id, req_header = Fatura._get_earsiv_soap_client(company)
-                    client = ea_client
-                    soap_logout_client = ef_client
+                session = Fatura._get_izibiz_session(company)
             except Exception as e:
                 rpt(f"> SOAP bağlantı hatası: {e}")
                 rpt("")
                 continue
 
-            try:
-                for inv in sample:
-                    result = _validate_single_invoice(
-                        env, inv, client, req_header, kaynak, company,
-                    )
-                    fetched_invoices.append(result)
-                    all_issues.extend(result.get('issues', []))
-                    all_tax_findings.extend(result.get('tax_findings', []))
-            finally:
-                try:
-                    soap_logout_client.service.Logout(REQUEST_HEADER=req_header)
-                except Exception:
-                    pass
+            for inv in sample:
+                result = _validate_single_invoice(
+                    env, inv, session, kaynak, company,
+                )
+                fetched_invoices.append(result)
+                all_issues.extend(result.get('issues', []))
+                all_tax_findings.extend(result.get('tax_findings', []))
 
         company_fetch_results[company.id] = fetched_invoices
 
@@ -295,7 +284,7 @@ def run(env):
     return report_text
 
 
-def _validate_single_invoice(env, inv, client, req_header, kaynak, company):
+def _validate_single_invoice(env, inv, session, kaynak, company):
     """Tek bir faturayı SOAP'tan çekip DB ile karşılaştır."""
     result = {
         'invoice_id': inv.invoice_id,
@@ -310,7 +299,7 @@ def _validate_single_invoice(env, inv, client, req_header, kaynak, company):
     }
 
     try:
-        ubl_bytes = _fetch_raw_xml(inv, client, req_header, kaynak)
+        ubl_bytes = _fetch_raw_xml(inv, session, kaynak)
     except Exception as e:
         result['issues'].append(f"XML çekme hatası: {e}")
         return result
@@ -320,217 +309,54 @@ def _validate_single_invoice(env, inv, client, req_header, kaynak, company):
         return result
 
     try:
-        _compare_header_fields(inv, ubl_bytes, result)
-        _compare_tax_fields(env, inv, ubl_bytes, result)
+        parsed = parse_ubl(ubl_bytes)
+        _compare_header_fields(inv, parsed, result)
+        _compare_tax_fields(env, inv, parsed, result)
     except Exception as e:
         result['issues'].append(f"Karşılaştırma hatası: {e}")
 
     return result
 
 
-def _fetch_raw_xml(inv, client, req_header, kaynak):
-    """SOAP'tan raw UBL XML'i çek."""
-    if kaynak == 'e-fatura-izibiz':
-        search_key = {
-            'LIMIT': 1,
-            'UUID': inv.uuid,
-            'DIRECTION': inv.direction or 'IN',
-            'READ_INCLUDED': 'true',
-        }
-        with client.settings(raw_response=True):
-            raw = client.service.GetInvoice(
-                REQUEST_HEADER=req_header,
-                INVOICE_SEARCH_KEY=search_key,
-                HEADER_ONLY='N',
-            )
-    else:
-        with client.settings(raw_response=True):
-            raw = client.service.ReadFromArchive(
-                REQUEST_HEADER=req_header,
-                INVOICEID=inv.uuid,
-                PORTAL_DIRECTION='OUT',
-                PROFILE='XML',
-            )
-
-    root = ET.fromstring(raw.content)
-
-    # CONTENT elementini bul
-    content_text = None
-    max_len = 0
-    for tag in ('CONTENT', 'INVOICE', 'HTML_CONTENT', 'INVOICE_CONTENT', 'DATA'):
-        for elem in root.iter():
-            t = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-            if t == tag and elem.text and len(elem.text.strip()) > max_len:
-                content_text = elem.text.strip()
-                max_len = len(content_text)
-
-    if not content_text or max_len < 100:
-        return None
-
-    decoded = base64.b64decode(content_text)
-
-    if decoded[:4] == b'PK\x03\x04':
-        with zipfile.ZipFile(io.BytesIO(decoded), 'r') as zf:
-            xml_name = next(
-                (n for n in zf.namelist()
-                 if n.endswith('.xml') and not n.startswith('__')),
-                zf.namelist()[0] if zf.namelist() else None,
-            )
-            if not xml_name:
-                return None
-            ubl_bytes = zf.read(xml_name)
-    else:
-        ubl_bytes = decoded
-
-    return ubl_bytes.replace(b'\x00', b'')
-
-
-def _parse_float(value):
-    """Finansal string → float."""
-    if not value:
-        return 0.0
-    s = str(value).strip()
-    if ',' in s and '.' in s:
-        s = s.replace('.', '').replace(',', '.')
-    elif ',' in s:
-        s = s.replace(',', '.')
-    s = s.replace('₺', '').replace('TL', '').replace('$', '').strip()
-    try:
-        return float(s)
-    except (ValueError, TypeError):
-        return 0.0
-
+def _fetch_raw_xml(inv, session, kaynak):
+    """Raw UBL XML'i getir: önce yerel arşivden, yoksa SOAP'tan."""
+    ubl_bytes = inv._load_ubl()
+    if ubl_bytes is not None:
+        return ubl_bytes
 
-def _find_elem(parent, local_name):
-    if parent is None:
-        return None
-    for child in parent.iter():
-        tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-        if tag == local_name:
-            return child
-    return None
-
-
-def _find_all_direct(parent, local_name):
-    result = []
-    if parent is None:
-        return result
-    for child in parent:
-        tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-        if tag == local_name:
-            result.append(child)
-    return result
+    # İçerik/SOAP hataları ContentError olarak çağırana ("XML çekme hatası") gider
+    if kaynak == 'e-fatura-izibiz':
+        return download_efatura_ubl(session, inv.uuid, inv.direction or 'IN')
+    return download_earsiv_ubl(session, inv.uuid)
 
 
-def _get_text(elem, local_name):
-    found = _find_elem(elem, local_name)
-    if found is not None and found.text:
-        return found.text.strip()
-    return ''
-
-
-# TaxScheme mapping (aynı modeldeki gibi)
-SCHEME_ID_MAP = {
-    '0015': 'kdv',
-    '0003': 'kdv',
-    '9015': 'withholding',
-    '4071': 'bsmv',
-    '0059': 'konaklama',
-    '0071': 'tuketim',
-}
-
-SCHEME_NAME_MAP = {
-    'KDV': 'kdv',
-    'KDV HESAPLANAN': 'kdv',
-    'KATMA DEGER VERGISI': 'kdv',
-    'KATMA DEĞER VERGISI': 'kdv',
-    'KATMA DEĞER VERGİSİ': 'kdv',
-    'GERÇEK USULDE KATMA DEĞER VERGİSİ': 'kdv',
-    'KDV-SATIŞLAR': 'kdv',
-    'KDV GERÇEK': 'kdv',
-    'KDV GERCEK': 'kdv',
-    'KDV VERGISI': 'kdv',
-    'KDV VERGİSİ': 'kdv',
-    'HESAPLANAN KDV': 'kdv',
-    'SATIŞ VERGISI': 'kdv',
-    'SATIŞ VERGİSİ': 'kdv',
-    'SATIŞ KDV': 'kdv',
-    'TEVKIFAT': 'withholding',
-    'KDV TEVKİFAT': 'withholding',
-    'BSMV': 'bsmv',
-    'KONAKLAMA VERGISI': 'konaklama',
-    'KONAKLAMA VERGİSİ': 'konaklama',
-    'ELK.HAVAGAZ.TÜK.VER.': 'tuketim',
-    'ELEKTRIK HAVAGAZI TUKETIM VERGISI': 'tuketim',
-}
-
-
-def _resolve_tax_type_from_xml(subtotal_elem):
-    """XML'den tax_type çözümle (modeldeki resolve_tax_type'ın kopyası)."""
-    scheme = _find_elem(subtotal_elem, 'TaxScheme')
-    if scheme is None:
-        return None, '', ''
-
-    scheme_id = ''
-    scheme_name = ''
-    for child in scheme:
-        child_tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-        if child_tag == 'ID' and child.text:
-            scheme_id = child.text.strip()
-        elif child_tag == 'Name' and child.text:
-            scheme_name = child.text.strip().upper()
-
-    # 1. Scheme ID ile exact match
-    if scheme_id in SCHEME_ID_MAP:
-        return SCHEME_ID_MAP[scheme_id], scheme_id, scheme_name
-    # 2. Scheme Name ile exact match
-    if scheme_name in SCHEME_NAME_MAP:
-        return SCHEME_NAME_MAP[scheme_name], scheme_id, scheme_name
-    # 3. Parantez kaldır
-    cleaned = re.sub(r'\s*\(.*?\)', '', scheme_name).strip()
-    if cleaned and cleaned in SCHEME_NAME_MAP:
-        return SCHEME_NAME_MAP[cleaned], scheme_id, scheme_name
-    # 4. Oran kaldır
-    cleaned2 = re.sub(r'\s*%\d+', '', cleaned).strip()
-    if cleaned2 and cleaned2 in SCHEME_NAME_MAP:
-        return SCHEME_NAME_MAP[cleaned2], scheme_id, scheme_name
-    # 5. KDV/KATMA fallback
-    if 'KDV' in scheme_name or 'KATMA' in scheme_name:
-        return 'kdv', scheme_id, scheme_name
-
-    return 'diger', scheme_id, scheme_name
-
-
-def _compare_header_fields(inv, ubl_bytes, result):
-    """UBL XML header alanlarını DB ile karşılaştır."""
-    root = ET.fromstring(ubl_bytes)
-    pf = _parse_float
+def _compare_header_fields(inv, parsed, result):
+    """UBL header alanlarını (ParsedInvoice) DB ile karşılaştır."""
+    header = parsed.header
     issues = result['issues']
     mismatches = 0
     checks = 0
 
     # LegalMonetaryTotal
-    legal = _find_elem(root, 'LegalMonetaryTotal')
-    if legal is not None:
-        field_map = {
-            'TaxExclusiveAmount': ('tax_exclusive_amount', 'Vergisiz Toplam'),
-            'TaxInclusiveAmount': ('tax_inclusive_amount', 'Vergili Toplam'),
-            'PayableAmount': ('payable_amount', 'Ödenecek Tutar'),
-            'AllowanceTotalAmount': ('allowance_total_amount', 'İndirim Toplamı'),
-        }
-        for xml_tag, (db_field, label) in field_map.items():
-            xml_val = pf(_get_text(legal, xml_tag))
-            db_val = getattr(inv, db_field, 0.0) or 0.0
-            if xml_val > 0:
-                checks += 1
-                if abs(xml_val - db_val) > 0.01:
-                    mismatches += 1
-                    issues.append(
-                        f"{label}: XML={xml_val:.2f} DB={db_val:.2f}"
-                    )
+    field_map = {
+        'tax_exclusive_amount': 'Vergisiz Toplam',
+        'tax_inclusive_amount': 'Vergili Toplam',
+        'payable_amount': 'Ödenecek Tutar',
+        'allowance_total_amount': 'İndirim Toplamı',
+    }
+    for db_field, label in field_map.items():
+        xml_val = getattr(header, db_field) or 0.0
+        db_val = getattr(inv, db_field, 0.0) or 0.0
+        if xml_val > 0:
+            checks += 1
+            if abs(xml_val - db_val) > 0.01:
+                mismatches += 1
+                issues.append(
+                    f"{label}: XML={xml_val:.2f} DB={db_val:.2f}"
+                )
 
     # Currency
-    xml_currency = _get_text(root, 'DocumentCurrencyCode')
+    xml_currency = header.currency_code
     if xml_currency and inv.currency_code:
         checks += 1
         if xml_currency != inv.currency_code:
@@ -538,22 +364,18 @@ def _compare_header_fields(inv, ubl_bytes, result):
             issues.append(f"Para birimi: XML={xml_currency} DB={inv.currency_code}")
 
     # Exchange rate
-    pricing_er = _find_elem(root, 'PricingExchangeRate')
-    if pricing_er is not None:
-        xml_rate = pf(_get_text(pricing_er, 'CalculationRate'))
-        if xml_rate > 0 and inv.exchange_rate:
-            checks += 1
-            if abs(xml_rate - inv.exchange_rate) > 0.0001:
-                mismatches += 1
-                issues.append(f"Kur: XML={xml_rate:.4f} DB={inv.exchange_rate:.4f}")
+    xml_rate = header.exchange_rate
+    if xml_rate and inv.exchange_rate:
+        checks += 1
+        if abs(xml_rate - inv.exchange_rate) > 0.0001:
+            mismatches += 1
+            issues.append(f"Kur: XML={xml_rate:.4f} DB={inv.exchange_rate:.4f}")
 
     result['header_match'] = f"{checks - mismatches}/{checks}" if checks > 0 else "N/A"
 
 
-def _compare_tax_fields(env, inv, ubl_bytes, result):
-    """UBL XML vergi kayıtlarını DB ile karşılaştır."""
-    root = ET.fromstring(ubl_bytes)
-    pf = _parse_float
+def _compare_tax_fields(env, inv, parsed, result):
+    """UBL vergi kayıtlarını (ParsedInvoice) DB ile karşılaştır."""
     issues = result['issues']
     tax_findings = result['tax_findings']
 
@@ -562,48 +384,19 @@ def _compare_tax_fields(env, inv, ubl_bytes, result):
         ('fatura_id', '=', inv.id),
     ])
 
-    # XML'den vergi bilgilerini topla (tüm TaxTotal/TaxSubtotal)
-    xml_taxes = []
-
-    # Önce satır seviyesindeki vergileri topla
-    invoice_lines = _find_all_direct(root, 'InvoiceLine')
-    has_line_taxes = False
-    for line_elem in invoice_lines:
-        tax_total = _find_elem(line_elem, 'TaxTotal')
-        if tax_total is not None:
-            for subtotal in _find_all_direct(tax_total, 'TaxSubtotal'):
-                taxable = pf(_get_text(subtotal, 'TaxableAmount'))
-                tax_amt = pf(_get_text(subtotal, 'TaxAmount'))
-                percent = pf(_get_text(subtotal, 'Percent'))
-                resolved, sid, sname = _resolve_tax_type_from_xml(subtotal)
-                xml_taxes.append({
-                    'taxable': taxable,
-                    'tax_amount': tax_amt,
-                    'percent': percent,
-                    'tax_type': resolved,
-                    'scheme_id': sid,
-                    'scheme_name': sname,
-                    'level': 'line',
-                })
-                has_line_taxes = True
-
-    # Satır seviyesinde vergi yoksa root seviyesini kullan
-    if not has_line_taxes:
-        for tax_total in _find_all_direct(root, 'TaxTotal'):
-            for subtotal in _find_all_direct(tax_total, 'TaxSubtotal'):
-                taxable = pf(_get_text(subtotal, 'TaxableAmount'))
-                tax_amt = pf(_get_text(subtotal, 'TaxAmount'))
-                percent = pf(_get_text(subtotal, 'Percent'))
-                resolved, sid, sname = _resolve_tax_type_from_xml(subtotal)
-                xml_taxes.append({
-                    'taxable': taxable,
-                    'tax_amount': tax_amt,
-                    'percent': percent,
-                    'tax_type': resolved,
-                    'scheme_id': sid,
-                    'scheme_name': sname,
-                    'level': 'root',
-                })
+    # Satır seviyesinde vergi varsa onlar, yoksa root seviyesi kullanılır
+    line_taxes = parsed.line_taxes
+    level = 'line' if line_taxes else 'root'
+    xml_taxes = [{
+        'taxable': tax.taxable_amount,
+        'tax_amount': tax.tax_amount,
+        'percent': tax.percent,
+        # TaxScheme'siz subtotal: beklenen tip yok
+        'tax_type': tax.tax_type or None,
+        'scheme_id': tax.scheme_id,
+        'scheme_name': tax.scheme_name,
+        'level': level,
+    } for tax in (line_taxes or parsed.taxes)]
 
     # Adet karşılaştırma
     if len(xml_taxes) != len(db_taxes):
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Arşivden Toplu Yeniden Parse
+============================
+Parse kuralları (SCHEME_NAME_MAP, parser düzeltmeleri) değiştiğinde arşivde
+UBL'i olan tüm faturaların line/tax/note kayıtlarını izibiz'e gitmeden
+yeniden oluşturur. Parse bir process havuzunda yapılır; ilerleme loglanır
+ve kesilirse aynı domain ile tekrar çalıştırıldığında kaldığı yerden devam
+eder (checkpoint: ir.config_parameter).
+
+Kullanım (Odoo shell):
+    exec(open('/mnt/extra-addons/guven_fatura_analiz/scripts/reparse_archive.py').read())
+    run(env)                                        # tümü
+    run(env, domain=[('company_id', '=', 2)])       # tek şirket
+    run(env, workers=4, resume=False)               # baştan, 4 process
+"""
+
+
+def run(env, domain=None, workers=None, batch_size=None, resume=True):
+    """Toplu yeniden parse'ı çalıştır, özet istatistiği döndür."""
+    stats = env['guven.fatura'].sudo()._reparse_archive(
+        domain=domain, workers=workers, batch_size=batch_size, resume=resume,
+    )
+    print(
+        f"Yeniden parse: {stats['success']}/{stats['total']} başarılı, "
+        f"{stats['errors']} hata"
+    )
+    return stats
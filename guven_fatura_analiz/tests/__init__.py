@@ -0,0 +1,6 @@
+from . import test_sync_children
+from . import test_upsert_headers
+from . import test_detail_claim
+from . import test_sync_windows
+from . import test_ubl_archive
+from . import test_status_refresh
@@ -0,0 +1,20 @@
+from odoo.tests import TransactionCase
+
+
+class GuvenFaturaCase(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Fatura = cls.env['guven.fatura']
+        cls.company = cls.env.company
+
+    def make_invoice(self, number='GVN2025000000001', **vals):
+        return self.Fatura.create({
+            'invoice_id': number,
+            'uuid': f'uuid-{number}',
+            'company_id': self.company.id,
+            'kaynak': 'e-fatura-izibiz',
+            'direction': 'IN',
+            **vals,
+        })
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+
+from .common import GuvenFaturaCase
+
+
+@tagged('post_install', '-at_install')
+class TestDetailClaim(GuvenFaturaCase):
+
+    def setUp(self):
+        super().setUp()
+        # Sahiplenme kendi commit'ini yapar; test transaction'ı korunur
+        self.patch(self.env.cr, 'commit', lambda: None)
+        self.pending = self.make_invoice('GVN2025000000201', issue_date='2025-03-02')
+        self.older = self.make_invoice('GVN2025000000202', issue_date='2025-03-01')
+
+    def _claim(self, limit=10):
+        return self.Fatura._claim_detail_batch('e-fatura-izibiz', self.company, limit)
+
+    def test_claim_skips_leased_locked_waiting_and_dead(self):
+        now = fields.Datetime.now()
+        self.make_invoice('GVN2025000000203', details_received=True)
+        self.make_invoice('GVN2025000000204', is_locked=True)
+        self.make_invoice('GVN2025000000205', detail_next_try=now + timedelta(hours=1))
+        self.make_invoice('GVN2025000000206', detail_dead=True)
+
+        claimed = self._claim()
+        self.assertEqual(claimed, self.pending | self.older)
+        self.assertEqual(claimed.ids, [self.pending.id, self.older.id])  # issue_date DESC
+        self.assertFalse(self._claim(), "kiralanmış kayıtlar yeniden sahiplenilmemeli")
+
+        claimed._release_detail_claims()
+        self.assertEqual(self._claim(limit=1), self.pending)
+
+    def test_expired_lease_is_reclaimed(self):
+        self._claim()
+        (self.pending | self.older).write({
+            'detail_lease_until': fields.Datetime.now() - timedelta(minutes=1),
+        })
+        self.assertEqual(self._claim(), self.pending | self.older)
+
+    def test_failure_backoff_and_dead_letter(self):
+        before = fields.Datetime.now()
+        self.pending._record_detail_failure(ValueError('bozuk UBL'))
+        self.assertEqual(self.pending.detail_attempts, 1)
+        self.assertEqual(self.pending.detail_last_error, 'bozuk UBL')
+        self.assertGreaterEqual(self.pending.detail_next_try, before + self.Fatura._DETAIL_RETRY_BASE)
+
+        self.pending.detail_attempts = 5
+        self.pending._record_detail_failure('zaman aşımı')
+        self.assertGreaterEqual(
+            self.pending.detail_next_try, before + self.Fatura._DETAIL_RETRY_BASE * 2 ** 5,
+        )
+
+        self.pending.detail_attempts = self.Fatura._DETAIL_MAX_ATTEMPTS - 1
+        self.pending._record_detail_failure('zaman aşımı')
+        self.assertTrue(self.pending.detail_dead)
+        self.assertFalse(self.pending.detail_next_try)
+        self.assertNotIn(self.pending, self._claim())
+
+        self.pending._mark_details_received()
+        self.assertEqual(self.pending.detail_attempts, 0)
+        self.assertFalse(self.pending.detail_dead)
+
+    def test_locked_record_accepts_detail_bookkeeping_only(self):
+        self.pending.write({'is_locked': True})
+        self.pending._record_detail_failure('kilitli')
+        self.pending._release_detail_claims()
+        self.assertEqual(self.pending.detail_attempts, 1)
+        with self.assertRaises(UserError):
+            self.pending.write({'sender_name': 'Değişiklik'})
@@ -0,0 +1,54 @@
+import time
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import GuvenFaturaCase
+
+MODULE = 'odoo.addons.guven_fatura_analiz.models.guven_fatura'
+
+
+@tagged('post_install', '-at_install')
+class TestStatusRefresh(GuvenFaturaCase):
+
+    def setUp(self):
+        super().setUp()
+        self.patch(self.env.cr, 'commit', lambda: None)
+        self.patch(type(self.Fatura), '_get_izibiz_session', lambda self, company=None: object())
+        self.invoice = self.make_invoice(
+            'GVN2025000000401', issue_date=fields.Date.today(), status_code='112',
+            header_hash='eski-ozet',
+        )
+
+    def _refresh(self, efatura_entries, earsiv_entries=()):
+        with patch(f'{MODULE}.fetch_efatura_statuses', return_value=list(efatura_entries)), \
+                patch(f'{MODULE}.fetch_earsiv_statuses', return_value=list(earsiv_entries)):
+            return self.Fatura._refresh_company_statuses(self.company, fields.Date.today(), time.time())
+
+    def test_final_status_defaults_and_override(self):
+        final = self.Fatura._efatura_final_status()
+        self.assertTrue(self.Fatura._EFATURA_ACCEPTED_STATUS <= final)
+        self.assertTrue(self.Fatura._EFATURA_INVALID_STATUS <= final)
+
+        self.env['ir.config_parameter'].sudo().set_param(
+            self.Fatura._EFATURA_ACCEPTED_STATUS_PARAM, ' 900, 901 ',
+        )
+        self.assertEqual(
+            self.Fatura._efatura_final_status(),
+            self.Fatura._EFATURA_INVALID_STATUS | {'900', '901'},
+        )
+
+    def test_changed_status_clears_header_hash(self):
+        checked, changed = self._refresh([(self.invoice.uuid, '120', 'Belge Ret Edildi')])
+        self.assertEqual((checked, changed), (1, 1))
+        self.assertEqual(self.invoice.status_code, '120')
+        self.assertEqual(self.invoice.status_description, 'Belge Ret Edildi')
+        self.assertFalse(self.invoice.header_hash)
+        self.assertFalse(self.invoice.gvn_active)
+
+    def test_empty_response_is_reported(self):
+        with self.assertLogs(MODULE, 'WARNING'):
+            checked, changed = self._refresh([])
+        self.assertEqual((checked, changed), (0, 0))
+        self.assertEqual(self.invoice.header_hash, 'eski-ozet')
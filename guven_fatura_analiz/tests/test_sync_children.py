@@ -0,0 +1,64 @@
+from odoo.tests import tagged
+
+from .common import GuvenFaturaCase
+
+
+@tagged('post_install', '-at_install')
+class TestSyncChildren(GuvenFaturaCase):
+
+    def setUp(self):
+        super().setUp()
+        self.invoice = self.make_invoice()
+        self.Note = self.env['guven.fatura.note']
+        self.Tax = self.env['guven.fatura.tax']
+
+    def _notes(self, *values):
+        return [{
+            'fatura_id': self.invoice.id, 'note_type': 'free_text',
+            'value': value, 'sequence': seq,
+        } for seq, value in enumerate(values, 1)]
+
+    def _taxes(self, *items):
+        return [{
+            'fatura_id': self.invoice.id, 'line_id': False, 'tax_type': tax_type,
+            'percent': percent, 'tax_amount': amount,
+        } for tax_type, percent, amount in items]
+
+    def test_unchanged_children_are_not_written(self):
+        first, stats = self.Fatura._sync_children(self.Note, self._notes('a', 'b'), ('sequence',))
+        self.assertEqual(stats, {'created': 2, 'updated': 0, 'deleted': 0})
+
+        again, stats = self.Fatura._sync_children(first, self._notes('a', 'b'), ('sequence',))
+        self.assertEqual(stats, {'created': 0, 'updated': 0, 'deleted': 0})
+        self.assertEqual(again.ids, first.ids)
+
+    def test_diff_create_delete_and_order(self):
+        first, _stats = self.Fatura._sync_children(self.Note, self._notes('a', 'b', 'c'), ('sequence',))
+
+        # 1 değişir, 2 aynı kalır, 3 silinir → sonuç vals_list sırasında
+        vals_list = self._notes('x', 'b')[::-1]
+        result, stats = self.Fatura._sync_children(first, vals_list, ('sequence',))
+        self.assertEqual(stats, {'created': 0, 'updated': 1, 'deleted': 1})
+        self.assertEqual(result.ids, [first[1].id, first[0].id])
+        self.assertEqual(result.mapped('value'), ['b', 'x'])
+        self.assertFalse(first[2].exists())
+
+    def test_duplicate_keys_match_in_order(self):
+        vals_list = self._taxes(('kdv', 10.0, 1.0), ('kdv', 10.0, 2.0))
+        first, _stats = self.Fatura._sync_children(self.Tax, vals_list, ('line_id', 'tax_type', 'percent'))
+
+        vals_list = self._taxes(('kdv', 10.0, 1.0), ('kdv', 10.0, 5.0), ('kdv', 10.0, 3.0))
+        result, stats = self.Fatura._sync_children(first, vals_list, ('line_id', 'tax_type', 'percent'))
+        self.assertEqual(stats, {'created': 1, 'updated': 1, 'deleted': 0})
+        self.assertEqual(result[:2].ids, first.ids)
+        self.assertEqual(result.mapped('tax_amount'), [1.0, 5.0, 3.0])
+
+    def test_float_keys_are_rounded(self):
+        first, _stats = self.Fatura._sync_children(
+            self.Tax, self._taxes(('kdv', 18.0, 1.0)), ('line_id', 'tax_type', 'percent'),
+        )
+        result, stats = self.Fatura._sync_children(
+            first, self._taxes(('kdv', 18.001, 1.0)), ('line_id', 'tax_type', 'percent'),
+        )
+        self.assertEqual(result, first)
+        self.assertEqual(stats, {'created': 0, 'updated': 0, 'deleted': 0})
@@ -0,0 +1,53 @@
+from datetime import date, datetime, timedelta
+
+from odoo.tests import tagged
+
+from .common import GuvenFaturaCase
+
+
+@tagged('post_install', '-at_install')
+class TestSyncWindows(GuvenFaturaCase):
+
+    def _day(self, day):
+        return datetime.combine(day, datetime.min.time()), datetime.combine(day, datetime.max.time())
+
+    def test_date_fields_split_on_whole_days(self):
+        start, _ = self._day(date(2025, 3, 1))
+        _, end = self._day(date(2025, 3, 3))
+        first, second = self.Fatura._split_window(start, end, False, timedelta(minutes=1))
+        self.assertEqual(first, self._day(date(2025, 3, 1)))
+        self.assertEqual(second, (self._day(date(2025, 3, 2))[0], end))
+
+        self.assertIsNone(self.Fatura._split_window(*self._day(date(2025, 3, 1)), False, timedelta(minutes=1)))
+
+    def test_datetime_fields_split_without_overlap(self):
+        start, end = self._day(date(2025, 3, 1))
+        first, second = self.Fatura._split_window(start, end, True, timedelta(minutes=1))
+        self.assertEqual(first, (start, datetime(2025, 3, 1, 11, 59, 59, 999999)))
+        self.assertEqual(second, (datetime(2025, 3, 1, 12), end))
+        self.assertLess(first[1], second[0])
+
+        self.assertIsNone(self.Fatura._split_window(
+            start, start + timedelta(seconds=30), True, timedelta(minutes=1),
+        ))
+
+    def test_bisect_stops_at_one_day_for_date_fields(self):
+        limit = self.Fatura._HEADER_SYNC_LIMIT
+        windows = []
+
+        class Source:
+            def close(self):
+                pass
+
+        def fetch(start_dt, end_dt):
+            windows.append((start_dt, end_dt))
+            return Source()
+
+        def apply(_source):
+            return {'created': 0, 'updated': 0, 'soap_count': limit}
+
+        start, _ = self._day(date(2025, 3, 1))
+        _, end = self._day(date(2025, 3, 2))
+        with self.assertLogs('odoo.addons.guven_fatura_analiz.models.guven_fatura', 'WARNING'):
+            self.Fatura._sync_headers_bisect(fetch, apply, start, end, 'TEST')
+        self.assertEqual(windows, [self._day(date(2025, 3, 1)), self._day(date(2025, 3, 2))])
@@ -0,0 +1,45 @@
+import gzip
+
+from odoo.tests import tagged
+
+from .common import GuvenFaturaCase
+
+
+@tagged('post_install', '-at_install')
+class TestUblArchive(GuvenFaturaCase):
+
+    def _archive(self, invoice, raw, sha256='0' * 64):
+        attachment = self.env['ir.attachment'].create({
+            'name': f'{sha256}.xml.gz',
+            'raw': raw,
+            'mimetype': 'application/gzip',
+            'res_model': 'guven.fatura',
+            'res_id': invoice.id,
+            'company_id': self.company.id,
+        })
+        invoice.write({'ubl_attachment_id': attachment.id, 'ubl_sha256': sha256})
+        return attachment
+
+    def test_unreadable_archive_is_dropped_for_download(self):
+        broken = self.make_invoice('GVN2025000000301')
+        sharer = self.make_invoice('GVN2025000000302', details_received=True)
+        attachment = self._archive(broken, b'gzip degil')
+        sharer.write({'ubl_attachment_id': attachment.id, 'ubl_sha256': '0' * 64})
+
+        success, errors, unreadable = broken._reparse_from_archive()
+        self.assertEqual((success, errors, unreadable), (0, 0, broken))
+        self.assertFalse(broken.ubl_attachment_id or broken.ubl_sha256)
+        self.assertEqual(broken.detail_attempts, 0)
+        # Bozuk ek yeniden kullanılmasın diye paylaşan faturadan da ayrılır
+        self.assertFalse(sharer.ubl_attachment_id)
+        self.assertTrue(sharer.details_received)
+
+    def test_unparsable_archive_is_kept(self):
+        invoice = self.make_invoice('GVN2025000000303')
+        attachment = self._archive(invoice, gzip.compress(b'<Invoice><kapanmayan>'))
+
+        success, errors, unreadable = invoice._reparse_from_archive()
+        self.assertEqual((success, errors), (0, 1))
+        self.assertFalse(unreadable)
+        self.assertEqual(invoice.ubl_attachment_id, attachment)
+        self.assertEqual(invoice.detail_attempts, 1)
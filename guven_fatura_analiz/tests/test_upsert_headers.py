@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from .common import GuvenFaturaCase
+
+
+@tagged('post_install', '-at_install')
+class TestUpsertHeaders(GuvenFaturaCase):
+
+    def _vals(self, **overrides):
+        return {
+            'uuid': 'uuid-upsert-1',
+            'invoice_id': 'GVN2025000000101',
+            'company_id': self.company.id,
+            'kaynak': 'e-fatura-izibiz',
+            'direction': 'IN',
+            'sender_name': 'Tedarikçi A.Ş.',
+            'issue_date': '2025-03-01',
+            'tax_inclusive_amount': 118.0,
+            **overrides,
+        }
+
+    def _upsert(self, vals):
+        return self.Fatura._upsert_headers([vals], 'e-fatura-izibiz', self.company)
+
+    def test_create_stores_hash(self):
+        created, updated, _existing = self._upsert(self._vals())
+        self.assertEqual(updated, 0)
+        self.assertEqual(created.header_hash, self.Fatura._header_hash(self._vals()))
+        self.assertFalse(created.details_received)
+
+    def test_same_hash_skips_comparison(self):
+        created, _updated, _existing = self._upsert(self._vals())
+        with patch.object(type(self.Fatura), '_diff_header', side_effect=AssertionError):
+            new, updated, existing = self._upsert(self._vals())
+        self.assertFalse(new)
+        self.assertEqual(updated, 0)
+        self.assertEqual(existing['uuid-upsert-1'], created)
+
+    def test_changed_header_resets_details(self):
+        created, _updated, _existing = self._upsert(self._vals())
+        created.write({'details_received': True, 'detail_attempts': 3})
+
+        _new, updated, _existing = self._upsert(self._vals(tax_inclusive_amount=120.0))
+        self.assertEqual(updated, 1)
+        self.assertEqual(created.tax_inclusive_amount, 120.0)
+        self.assertFalse(created.details_received)
+        self.assertEqual(created.detail_attempts, 0)
+        self.assertEqual(created.header_hash, self.Fatura._header_hash(self._vals(tax_inclusive_amount=120.0)))
+
+    def test_tolerance_only_change_updates_hash(self):
+        created, _updated, _existing = self._upsert(self._vals())
+        created.write({'details_received': True})
+
+        vals = self._vals(tax_inclusive_amount=118.001)
+        _new, updated, _existing = self._upsert(vals)
+        self.assertEqual(updated, 0)
+        self.assertTrue(created.details_received)
+        self.assertEqual(created.header_hash, self.Fatura._header_hash(vals))
+
+    def test_locked_record_is_skipped(self):
+        created, _updated, _existing = self._upsert(self._vals())
+        created.write({'is_locked': True})
+
+        _new, updated, _existing = self._upsert(self._vals(sender_name='Başka'))
+        self.assertEqual(updated, 0)
+        self.assertEqual(created.sender_name, 'Tedarikçi A.Ş.')
@@ -57,10 +57,11 @@ class GuvenFaturaSyncWizard(models.TransientModel):
         for company in self.company_ids:
             log_lines.append(f"--- {company.name} ---")
 
+            # IN / OUT / E-Arşiv eşzamanlı indirilir, sırayla kaydedilir
+            results = Fatura._sync_company_block(company, self.date_from, self.date_to)
+
             # E-Fatura Gelen (IN)
-            result_in = Fatura._sync_efatura_headers(
-                self.date_from, self.date_to, 'IN', company,
-            )
+            result_in = results['IN']
             totals['efatura_in_created'] += result_in['created']
             totals['efatura_in_updated'] += result_in['updated']
             log_lines.append(
@@ -69,9 +70,7 @@ class GuvenFaturaSyncWizard(models.TransientModel):
             )
 
             # E-Fatura Giden (OUT)
-            result_out = Fatura._sync_efatura_headers(
-                self.date_from, self.date_to, 'OUT', company,
-            )
+            result_out = results['OUT']
             totals['efatura_out_created'] += result_out['created']
             totals['efatura_out_updated'] += result_out['updated']
             log_lines.append(
@@ -80,9 +79,7 @@ class GuvenFaturaSyncWizard(models.TransientModel):
             )
 
             # E-Arşiv (always OUT)
-            result_earsiv = Fatura._sync_earsiv_headers(
-                self.date_from, self.date_to, company,
-            )
+            result_earsiv = results['earsiv']
             totals['earsiv_created'] += result_earsiv['created']
             totals['earsiv_updated'] += result_earsiv['updated']
             log_lines.append(
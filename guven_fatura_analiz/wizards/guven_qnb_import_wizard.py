@@ -415,20 +415,22 @@ class GuvenQnbImportWizard(models.TransientModel):
         return vals
 
     def _sync_tax_records(self, fatura, row_data):
-        """Create/replace guven.fatura.tax records for a fatura."""
-        Tax = self.env['guven.fatura.tax']
+        """Reconcile guven.fatura.tax records of a fatura with row_data taxes.
+
+        Rows are matched by (tax_type, percent); only differing rows are
+        written, missing ones created and extra ones deleted.
+        """
         currency = (row_data['currency_code'] or 'TRY').upper()
         is_try = currency == 'TRY'
         exchange_rate = row_data.get('exchange_rate', 1.0) or 1.0
 
-        # Remove existing tax records, then recreate
-        fatura.tax_ids.unlink()
-
+        vals_list = []
         for td in row_data.get('taxes', []):
             taxable = td['taxable_amount']
             amount = td['tax_amount']
             vals = {
                 'fatura_id': fatura.id,
+                'line_id': False,
                 'tax_type': td['tax_type'],
                 'percent': td['percent'],
                 'taxable_amount': taxable,
@@ -441,7 +443,11 @@ class GuvenQnbImportWizard(models.TransientModel):
             else:
                 vals['taxable_amount_try'] = taxable * exchange_rate
                 vals['tax_amount_try'] = amount * exchange_rate
-            Tax.create(vals)
+            vals_list.append(vals)
+
+        self.env['guven.fatura']._sync_children(
+            fatura.tax_ids, vals_list, ('line_id', 'tax_type', 'percent'),
+        )
 
     # ================================================================
     # Change detection